@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Control de admisión de los scrapes que piden las peticiones
+Como mucho `max_en_vuelo` scrapes a la vez y una cola FIFO acotada de los
+que esperan hueco. Cuando no hay hueco ni sitio en la cola (o la espera se
+agota) el scrape no se hace, en lugar de acumular descargas y parseos sin
+límite mientras la latencia se dispara para todos
+"""
+
+import asyncio
+import math
+from collections import deque
+
+
+class Saturado(Exception):
+    """No se admite el scrape; `reintentar_en` son los segundos sugeridos (Retry-After)"""
+
+    def __init__(self, reintentar_en: int):
+        super().__init__(f'Servidor saturado, reintentar en {reintentar_en} s')
+        self.reintentar_en = reintentar_en
+
+
+class ControlAdmision:
+    """Huecos para scrapes en curso con cola de espera acotada
+
+    Al salir, el hueco pasa directamente al primero de la cola. Se lleva la
+    duración media de los scrapes admitidos para estimar cuándo volverá a
+    haber sitio.
+    """
+
+    def __init__(self, max_en_vuelo: int, max_cola: int, espera_max: float):
+        self.max_en_vuelo = max_en_vuelo
+        self.max_cola = max_cola
+        self.espera_max = espera_max
+        self.en_vuelo = 0
+        self._cola = deque()
+        self.admitidas = 0
+        self.encoladas = 0
+        self.rechazadas = 0
+        self.esperas_agotadas = 0
+        # Media móvil exponencial de lo que dura un scrape admitido (segundos)
+        self.duracion_media = None
+
+    @property
+    def en_cola(self) -> int:
+        return len(self._cola)
+
+    async def entrar(self, esperar: bool = True) -> bool:
+        """Ocupa un hueco, esperando en la cola si `esperar`; False si no se admite"""
+        if self.en_vuelo < self.max_en_vuelo and not self._cola:
+            self.en_vuelo += 1
+            self.admitidas += 1
+            return True
+        if not esperar or len(self._cola) >= self.max_cola:
+            self.rechazadas += 1
+            return False
+
+        turno = asyncio.get_running_loop().create_future()
+        self._cola.append(turno)
+        self.encoladas += 1
+        try:
+            await asyncio.wait_for(turno, self.espera_max)
+        except asyncio.TimeoutError:
+            self._quitar(turno)
+            self.esperas_agotadas += 1
+            self.rechazadas += 1
+            return False
+        except asyncio.CancelledError:
+            self._quitar(turno)
+            # Si el hueco ya se había pasado a esta espera, se pasa al siguiente
+            if turno.done() and not turno.cancelled():
+                self.salir()
+            raise
+        self.admitidas += 1
+        return True
+
+    def _quitar(self, turno):
+        try:
+            self._cola.remove(turno)
+        except ValueError:
+            pass
+
+    def salir(self, segundos: float = None):
+        """Libera un hueco (y registra cuánto ha durado el scrape)"""
+        if segundos is not None:
+            self.duracion_media = segundos if self.duracion_media is None else \
+                0.9 * self.duracion_media + 0.1 * segundos
+        while self._cola:
+            turno = self._cola.popleft()
+            if not turno.done():
+                turno.set_result(None)
+                return
+        self.en_vuelo -= 1
+
+    def reintentar_en(self) -> int:
+        """Segundos hasta que probablemente haya hueco: la cola por la duración media"""
+        duracion = self.duracion_media if self.duracion_media is not None else 1.0
+        return max(1, math.ceil(duracion * (len(self._cola) + 1) / self.max_en_vuelo))
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'en_vuelo': self.en_vuelo,
+            'max_en_vuelo': self.max_en_vuelo,
+            'en_cola': len(self._cola),
+            'max_cola': self.max_cola,
+            'admitidas': self.admitidas,
+            'encoladas': self.encoladas,
+            'rechazadas': self.rechazadas,
+            'esperas_agotadas': self.esperas_agotadas,
+            'duracion_media_ms': round(self.duracion_media * 1000, 1) if self.duracion_media is not None else None
+        }
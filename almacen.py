@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén persistente de la última instantánea de cada estación
+SQLite en modo WAL; se lee entero al arrancar y se escribe por lotes
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+
+class AlmacenInstantaneas:
+    """Último resultado correcto de cada estación guardado en SQLite"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS instantaneas (
+                slug TEXT PRIMARY KEY,
+                datos TEXT NOT NULL,
+                guardado REAL NOT NULL
+            )
+        """)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS historico (
+                slug TEXT NOT NULL,
+                tiempo REAL NOT NULL,
+                remontes_abiertos REAL,
+                remontes_total REAL,
+                kilometros_abiertos REAL,
+                kilometros_total REAL,
+                nieve REAL
+            )
+        """)
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS historico_slug_tiempo ON historico (slug, tiempo)")
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS historico_tiempo ON historico (tiempo)")
+        self._conexion.commit()
+
+        self.lotes_escritos = 0
+        self.filas_escritas = 0
+
+    def cargar(self, desde: float = None) -> list:
+        """Lee las instantáneas de una vez, de la más antigua a la más reciente
+
+        Devuelve una lista de (slug, datos, guardado) con `guardado` en
+        segundos epoch. Con `desde`, solo las guardadas después.
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT slug, datos, guardado FROM instantaneas WHERE guardado > ? ORDER BY guardado",
+                (desde if desde is not None else float('-inf'),)
+            ).fetchall()
+        return [(slug, json.loads(datos), guardado) for slug, datos, guardado in filas]
+
+    def cargar_historico(self, desde: float) -> dict:
+        """Lee los puntos del histórico posteriores a `desde` (epoch)
+
+        Devuelve {slug: [(tiempo, *valores), ...]} con cada lista ordenada por tiempo.
+        """
+        series = {}
+        with self._lock:
+            cursor = self._conexion.execute("""
+                SELECT slug, tiempo, remontes_abiertos, remontes_total,
+                       kilometros_abiertos, kilometros_total, nieve
+                FROM historico WHERE tiempo >= ? ORDER BY slug, tiempo
+            """, (desde,))
+            for fila in cursor:
+                series.setdefault(fila[0], []).append(fila[1:])
+        return series
+
+    def guardar_lote(self, lote: dict, puntos: list = (), retencion_desde: float = None):
+        """Guarda en una sola transacción un lote de instantáneas y puntos del histórico
+
+        `lote` es {slug: (datos, guardado)} y `puntos` una lista de
+        (slug, tiempo, *valores). Con `retencion_desde` se borran además los
+        puntos anteriores a ese instante (epoch).
+        """
+        if not lote and not puntos:
+            return
+        filas = [
+            (slug, json.dumps(datos, ensure_ascii=False), guardado)
+            for slug, (datos, guardado) in lote.items()
+        ]
+        # NaN -> NULL
+        puntos = [tuple(None if v != v else v for v in punto) for punto in puntos]
+        with self._lock:
+            with self._conexion:
+                self._conexion.executemany("""
+                    INSERT INTO instantaneas (slug, datos, guardado) VALUES (?, ?, ?)
+                    ON CONFLICT(slug) DO UPDATE SET datos = excluded.datos, guardado = excluded.guardado
+                """, filas)
+                self._conexion.executemany(
+                    "INSERT INTO historico VALUES (?, ?, ?, ?, ?, ?, ?)", puntos
+                )
+                if retencion_desde is not None:
+                    self._conexion.execute("DELETE FROM historico WHERE tiempo < ?", (retencion_desde,))
+            self.lotes_escritos += 1
+            self.filas_escritas += len(filas) + len(puntos)
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del control de admisión ante un pico de peticiones en frío
+
+Arranca la API (un proceso uvicorn por configuración) contra el stub con
+latencia y lanza a la vez N peticiones a /estacion/{slug} de estaciones que
+no están en caché, mientras otro cliente pide en bucle una estación que sí
+lo está. Sin control de admisión todas se encolan; con él solo se admiten
+ADMISION_MAX_SCRAPES en curso más ADMISION_COLA esperando y el resto recibe
+un 503 al momento. Se mide:
+- respuestas 200 y 503, y su latencia (p50 / p99)
+- p99 de la estación en caché durante el pico
+- pico de memoria residente del proceso de la API (VmHWM)
+
+Ejecutar: python benchmarks/bench_admision.py --peticiones 400 --latencia 0.5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from comun import RAIZ, percentil, puerto_libre
+from stub_infonieve import iniciar_stub
+
+
+def _memoria_pico_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith('VmHWM:'):
+                return int(linea.split()[1])
+    return 0
+
+
+def _arrancar(entorno: dict) -> tuple:
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(puerto), '--log-level', 'warning'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    while True:
+        try:
+            requests.get(f"{url}/status", timeout=1)
+            return proceso, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+
+
+def medir(entorno: dict, peticiones: int) -> dict:
+    proceso, url = _arrancar(entorno)
+    try:
+        requests.get(f"{url}/estacion/caliente", timeout=60)
+        respuestas = {200: [], 503: []}
+        caliente = []
+        lock = threading.Lock()
+        fin = threading.Event()
+
+        def pedir(i):
+            inicio = time.perf_counter()
+            codigo = requests.get(f"{url}/estacion/pico-{i}", timeout=120).status_code
+            with lock:
+                respuestas.setdefault(codigo, []).append(time.perf_counter() - inicio)
+
+        def pedir_caliente():
+            with requests.Session() as sesion:
+                while not fin.is_set():
+                    inicio = time.perf_counter()
+                    sesion.get(f"{url}/estacion/caliente", timeout=60)
+                    caliente.append(time.perf_counter() - inicio)
+                    time.sleep(0.02)
+
+        observador = threading.Thread(target=pedir_caliente)
+        observador.start()
+        hilos = [threading.Thread(target=pedir, args=(i,)) for i in range(peticiones)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+        fin.set()
+        observador.join()
+        return {
+            'respuestas': respuestas,
+            'caliente_p99': percentil(caliente, 99),
+            'segundos': total,
+            'memoria_pico_kib': _memoria_pico_kib(proceso.pid),
+            'admision': requests.get(f"{url}/status", timeout=10).json()['admision']
+        }
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=400, help="Peticiones en frío lanzadas a la vez")
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latencia del stub (s)")
+    parser.add_argument("--max-scrapes", type=int, default=16)
+    parser.add_argument("--cola", type=int, default=64)
+    args = parser.parse_args()
+
+    _, base_url = iniciar_stub(latencia=args.latencia, validadores=False)
+    base = dict(os.environ, INFONIEVE_BASE_URL=base_url, ALMACEN_RUTA='', CATALOGO_URL='', INTERVALO_REFRESCO='0',
+                LIMITE_PETICIONES='1000000', RAFAGA_PETICIONES='1000000', FALLOS_CIRCUITO='1000000000',
+                TIMEOUT_ESTACION='120', LOG_NIVEL='off')
+    configuraciones = (
+        ("sin control", dict(base, ADMISION_MAX_SCRAPES='1000000', ADMISION_COLA='1000000')),
+        ("con control", dict(base, ADMISION_MAX_SCRAPES=str(args.max_scrapes), ADMISION_COLA=str(args.cola))),
+    )
+
+    print(f"{args.peticiones} peticiones en frío a la vez, stub con {args.latencia * 1000:.0f} ms de latencia")
+    for nombre, entorno in configuraciones:
+        r = medir(entorno, args.peticiones)
+        correctas, rechazadas = r['respuestas'][200], r['respuestas'][503]
+        print(f"  {nombre}: {len(correctas)} x 200 (p50 {percentil(correctas, 50) * 1000:.0f} ms, "
+              f"p99 {percentil(correctas, 99) * 1000:.0f} ms), {len(rechazadas)} x 503 "
+              f"(p99 {percentil(rechazadas, 99) * 1000:.0f} ms), todo en {r['segundos']:.1f} s")
+        print(f"    estación en caché durante el pico: p99 {r['caliente_p99'] * 1000:.0f} ms; "
+              f"memoria pico {r['memoria_pico_kib'] / 1024:.1f} MiB")
+        print(f"    /status admision: {r['admision']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del arranque de la API: tiempo hasta el primer 200 y memoria
+
+Por cada modo (normal y SOLO_LECTURA=1) y en N arranques:
+1. `import main` en un intérprete nuevo: tiempo, RSS y si quedan cargados
+   los módulos del scraping (requests, html.parser, multiprocessing)
+2. Proceso uvicorn desde cero: tiempo hasta que /status responde 200, RSS
+   en ese momento y tras unos segundos en reposo (en modo normal ya ha
+   hecho el primer refresco de las estaciones vigiladas contra el stub)
+
+Se muestra la mediana de los arranques. Para ver qué cuesta cada módulo:
+python -X importtime -c "import main" 2> importtime.txt
+
+Ejecutar: python benchmarks/bench_arranque.py --arranques 5 --reposo 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from comun import RAIZ, puerto_libre
+from stub_infonieve import iniciar_stub
+
+_IMPORTAR = """
+import resource, sys, time
+inicio = time.perf_counter()
+import main
+print(__import__('json').dumps({
+    'ms': (time.perf_counter() - inicio) * 1000,
+    'rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'scraping': sorted(m for m in ('requests', 'html.parser', 'multiprocessing') if m in sys.modules)
+}))
+"""
+
+
+def _rss_kib(pid: int) -> int:
+    """Memoria residente actual de un proceso (VmRSS, Linux)"""
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith('VmRSS:'):
+                return int(linea.split()[1])
+    return 0
+
+
+def _importar(entorno: dict) -> dict:
+    salida = subprocess.run([sys.executable, '-c', _IMPORTAR], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def _arrancar(entorno: dict, reposo: float) -> dict:
+    """Segundos hasta el primer 200 de /status y RSS entonces y tras el reposo"""
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(puerto), '--log-level', 'warning'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                if requests.get(f"http://127.0.0.1:{puerto}/status", timeout=1).status_code == 200:
+                    break
+            except requests.exceptions.ConnectionError:
+                pass
+            time.sleep(0.005)
+        primer_200 = time.perf_counter() - inicio
+        rss_inicial = _rss_kib(proceso.pid)
+        time.sleep(reposo)
+        return {'primer_200': primer_200, 'rss_inicial': rss_inicial, 'rss_reposo': _rss_kib(proceso.pid)}
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arranques", type=int, default=5)
+    parser.add_argument("--reposo", type=float, default=3.0, help="Segundos en reposo antes de medir otra vez la RSS")
+    args = parser.parse_args()
+
+    _, base_url = iniciar_stub()
+    base = dict(os.environ, INFONIEVE_BASE_URL=base_url, ALMACEN_RUTA='', CATALOGO_URL='', LOG_NIVEL='off')
+    modos = (("normal", base), ("solo lectura", dict(base, SOLO_LECTURA='1')))
+
+    print(f"Mediana de {args.arranques} arranques")
+    print(f"  {'modo':<13} {'import ms':>9} {'import MiB':>10}  {'1er 200 ms':>10} {'RSS MiB':>8} "
+          f"{'reposo MiB':>10}  módulos del scraping tras importar")
+    for nombre, entorno in modos:
+        importaciones = [_importar(entorno) for _ in range(args.arranques)]
+        arranques = [_arrancar(entorno, args.reposo) for _ in range(args.arranques)]
+        print(f"  {nombre:<13} {statistics.median(i['ms'] for i in importaciones):9.0f} "
+              f"{statistics.median(i['rss_kib'] for i in importaciones) / 1024:10.1f}  "
+              f"{statistics.median(a['primer_200'] for a in arranques) * 1000:10.0f} "
+              f"{statistics.median(a['rss_inicial'] for a in arranques) / 1024:8.1f} "
+              f"{statistics.median(a['rss_reposo'] for a in arranques) / 1024:10.1f}  "
+              f"{', '.join(importaciones[0]['scraping']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
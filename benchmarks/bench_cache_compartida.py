@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la caché compartida entre procesos (CACHE_BACKEND)
+
+Arranca varios procesos uvicorn de la API contra el mismo stub y les pide a
+la vez /estaciones con N estaciones en frío. Con la caché en memoria cada
+proceso scrapea todas las estaciones; con la caché SQLite compartida solo el
+que consigue el bloqueo de cada estación la descarga y los demás esperan su
+resultado. Se cuentan las peticiones que recibe el stub y se mide el tiempo
+hasta que responden todos los procesos.
+
+Ejecutar: python benchmarks/bench_cache_compartida.py --procesos 4 --estaciones 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from comun import RAIZ, puerto_libre
+from stub_infonieve import iniciar_stub
+
+
+def arrancar_procesos(n: int, base_url: str, backend: str, ruta: str) -> tuple:
+    """Lanza n procesos de la API y espera a que respondan"""
+    entorno = dict(os.environ, INFONIEVE_BASE_URL=base_url, ALMACEN_RUTA='', CATALOGO_URL='',
+                   INTERVALO_REFRESCO='0', LIMITE_PETICIONES='1000000', RAFAGA_PETICIONES='1000000', FALLOS_CIRCUITO='1000000000',
+                   CACHE_BACKEND=backend, CACHE_RUTA=ruta)
+    procesos, urls = [], []
+    for _ in range(n):
+        puerto = puerto_libre()
+        procesos.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(puerto), '--log-level', 'warning'],
+            cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL
+        ))
+        urls.append(f"http://127.0.0.1:{puerto}")
+
+    for url in urls:
+        while True:
+            try:
+                requests.get(f"{url}/status", timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.1)
+    return procesos, urls
+
+
+def medir(stub, urls: list, estaciones: int, ronda: int) -> dict:
+    """Pide las mismas estaciones en frío a todos los procesos a la vez"""
+    slugs = ','.join(f"compartida-{ronda}-{i}" for i in range(estaciones))
+    correctas = []
+    lock = threading.Lock()
+
+    def pedir(url):
+        datos = requests.get(f"{url}/estaciones", params={'estaciones': slugs}, timeout=120).json()
+        with lock:
+            correctas.append(sum(1 for e in datos['estaciones'] if e['estado'] == 'success'))
+
+    stub.reiniciar_contadores()
+    hilos = [threading.Thread(target=pedir, args=(url,)) for url in urls]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return {
+        'segundos': time.perf_counter() - inicio,
+        'peticiones_origen': stub.peticiones,
+        'correctas': sum(correctas)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--estaciones", type=int, default=20)
+    parser.add_argument("--latencia", type=float, default=0.2, help="Latencia del stub (s)")
+    args = parser.parse_args()
+
+    stub, base_url = iniciar_stub(latencia=args.latencia, validadores=False)
+    print(f"/estaciones con {args.estaciones} estaciones en frío pedido a la vez a {args.procesos} procesos")
+    with tempfile.TemporaryDirectory() as directorio:
+        for ronda, backend in enumerate(('memoria', 'sqlite')):
+            procesos, urls = arrancar_procesos(args.procesos, base_url, backend,
+                                               os.path.join(directorio, 'cache.db'))
+            try:
+                r = medir(stub, urls, args.estaciones, ronda)
+            finally:
+                for proceso in procesos:
+                    proceso.terminate()
+                for proceso in procesos:
+                    proceso.wait()
+            print(f"  CACHE_BACKEND={backend:<8} peticiones al origen {r['peticiones_origen']:5d}  "
+                  f"({r['peticiones_origen'] / args.estaciones:.1f} por estación)  "
+                  f"correctas {r['correctas']}/{args.estaciones * args.procesos}  {r['segundos'] * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del coste por campo de la especificación de extracción
+
+Añade a la especificación campos sintéticos (y a cada página del corpus su
+<span> con el dato) y, según crece el número de campos, mide:
+- la comprobación del texto de un <span> sin dato (la mayoría): con la
+  especificación compilada (una búsqueda con todas las etiquetas en una
+  expresión regular) y campo a campo con `in`, como hacía el extractor antes
+- la extracción por página con una y otra forma
+- la extracción con los campos nuevos ausentes de la página (sin todos los
+  campos no se puede cortar el parseo antes del final)
+
+Ejecutar: python benchmarks/bench_campos.py --campos 3,6,12,24,48 --repeticiones 50
+"""
+
+import argparse
+import re
+import time
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from extractor import ESPECIFICACION, Campo, Especificacion, _ExtractorSpans, _Completo, decodificar
+from stub_infonieve import PAGINAS
+
+_BODY = re.compile(rb'<body[^>]*>')
+
+
+class _ExtractorPorCampo(_ExtractorSpans):
+    """Evaluación sin compilar: cada etiqueta de cada campo con `in`"""
+
+    def _evaluar(self, marco):
+        if marco.strong is None or marco.em is None:
+            return
+        texto = ''.join(marco.texto)
+        for i, campo in enumerate(self.especificacion.campos):
+            if any(etiqueta in texto for etiqueta in campo.etiquetas):
+                previo = self.encontrados.get(i)
+                if previo is None or previo[1] < marco.orden:
+                    self.encontrados[i] = (0, marco.orden, campo.valor(''.join(marco.strong).strip(),
+                                                                        ''.join(marco.em).strip()))
+                    if previo is None:
+                        self._principales += 1
+                return
+
+
+def _extraer(clase, contenido: bytes, especificacion: Especificacion) -> dict:
+    parser = clase(especificacion)
+    try:
+        parser.feed(decodificar(contenido))
+        parser.close()
+    except _Completo:
+        pass
+    return parser.encontrados
+
+
+def _con_campos(extra: int) -> tuple:
+    """Especificación con `extra` campos más y el HTML de sus datos"""
+    campos = tuple(Campo(f"extra{i}", (f"Extra{i:03d}",)) for i in range(extra))
+    html = ''.join(
+        f'<span class="dato"><span class="etiqueta">Extra{i:03d}</span>'
+        f'<strong class="fuentemega">{i}</strong><em>/99</em></span>'
+        for i in range(extra)
+    ).encode('utf-8')
+    return Especificacion(version=0, campos=ESPECIFICACION.campos + campos), html
+
+
+def _mejor(funcion, repeticiones: int, n: int = 1) -> float:
+    """Microsegundos por llamada (mejor de 5 tandas), dividido entre n"""
+    tandas = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        tandas.append((time.perf_counter() - inicio) / (repeticiones * n) * 1e6)
+    return min(tandas)
+
+
+def _paginas(clase, paginas: list, especificacion: Especificacion):
+    def extraer_todas():
+        for contenido in paginas:
+            _extraer(clase, contenido, especificacion)
+    return extraer_todas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campos", default="3,6,12,24,48", help="Número total de campos, separados por coma")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    base = len(ESPECIFICACION.campos)
+    n = len(PAGINAS)
+    texto = 'Día 1 mañana 2500 m -8 ºC'
+    print(f"µs por <span> sin dato y por página (media del corpus, {n} páginas)")
+    print(f"  {'':>6}  {'--- por <span> ---':>22}  {'------------ por página ------------':>36}")
+    print(f"  {'campos':>6}  {'compilada':>10}  {'por campo':>10}  {'compilada':>10}  {'por campo':>10}  {'ausentes':>12}")
+    for total in (int(valor) for valor in args.campos.split(',')):
+        especificacion, html = _con_campos(max(0, total - base))
+        etiquetas = [campo.etiquetas for campo in especificacion.campos]
+        # Los datos nuevos van al principio del <body>
+        paginas = [_BODY.sub(lambda m: m.group() + html, contenido, count=1) for contenido in PAGINAS.values()]
+        span_compilada = _mejor(lambda: especificacion.patron.findall(texto), 1000 * args.repeticiones)
+        span_por_campo = _mejor(lambda: any(any(e in texto for e in campo) for campo in etiquetas),
+                                1000 * args.repeticiones)
+        compilada = _mejor(_paginas(_ExtractorSpans, paginas, especificacion), args.repeticiones, n)
+        por_campo = _mejor(_paginas(_ExtractorPorCampo, paginas, especificacion), args.repeticiones, n)
+        ausentes = _mejor(_paginas(_ExtractorSpans, list(PAGINAS.values()), especificacion), args.repeticiones, n)
+        print(f"  {total:6d}  {span_compilada:10.2f}  {span_por_campo:10.2f}  "
+              f"{compilada:10.1f}  {por_campo:10.1f}  {ausentes:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del catálogo de estaciones
+
+Mide la extracción del listado del corpus, la construcción del índice y el
+tiempo por búsqueda (por prefijo, aproximada con erratas y sin resultados)
+con el catálogo real y con uno sintético de N estaciones, y compara el
+rechazo de un slug desconocido con lo que cuesta ir a buscarlo al origen.
+
+Ejecutar: python benchmarks/bench_catalogo.py --estaciones 5000 --repeticiones 20000
+"""
+
+import argparse
+import random
+import time
+
+import requests
+
+from comun import iniciar_api
+from catalogo import Catalogo, EstacionCatalogo
+from extractor import extraer_catalogo
+from stub_infonieve import LISTADO, iniciar_stub
+
+CONSULTAS = {
+    'prefijo': ['sierra', 'baq', 'la', 'valdes', 'font'],
+    'aproximada': ['candanchi', 'formigla', 'baqueria', 'navaceradda', 'grandvalria'],
+    'sin resultados': ['xyzzy', 'qwerty', 'zzzz', 'kkkk', 'wxyz'],
+}
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def _sintetico(estaciones: list, n: int) -> list:
+    """Catálogo de n estaciones con nombres combinados a partir de los reales"""
+    aleatorio = random.Random(0)
+    palabras = sorted({palabra for estacion in estaciones for palabra in estacion.nombre.split()})
+    resultado = list(estaciones)
+    while len(resultado) < n:
+        nombre = ' '.join(aleatorio.sample(palabras, 2))
+        slug = f"{nombre.lower().replace(' ', '-')}-{len(resultado)}"
+        base = aleatorio.choice(estaciones)
+        resultado.append(EstacionCatalogo(slug, nombre, base.region, base.pais))
+    return resultado
+
+
+def medir_busquedas(catalogo: Catalogo, repeticiones: int):
+    for tipo, consultas in CONSULTAS.items():
+        microsegundos = sum(_medir(lambda: catalogo.buscar(q, 10), repeticiones) for q in consultas) / len(consultas)
+        print(f"    {tipo:<16} {microsegundos:7.2f} µs/búsqueda")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=5000, help="Tamaño del catálogo sintético")
+    parser.add_argument("--repeticiones", type=int, default=20000)
+    parser.add_argument("--latencia", type=float, default=0.3, help="Latencia del stub (s)")
+    args = parser.parse_args()
+
+    microsegundos = _medir(lambda: extraer_catalogo(LISTADO), 200)
+    estaciones = extraer_catalogo(LISTADO)
+    print(f"Listado del corpus: {len(estaciones)} estaciones, extracción {microsegundos / 1000:.2f} ms")
+
+    for nombre, lista in (("corpus", estaciones), ("sintético", _sintetico(estaciones, args.estaciones))):
+        catalogo = Catalogo()
+        inicio = time.perf_counter()
+        catalogo.actualizar(lista)
+        print(f"  Catálogo {nombre} ({len(lista)} estaciones): índice en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        medir_busquedas(catalogo, args.repeticiones // 10 if len(lista) > 1000 else args.repeticiones)
+
+    # Slug con errata: ida y vuelta al origen frente a rechazo local (el stub
+    # responde a cualquier slug; infonieve.es devolvería un 404)
+    stub, base_url = iniciar_stub(latencia=args.latencia, validadores=False)
+    _, api_url = iniciar_api(base_url, INTERVALO_REFRESCO=0, CACHE_TTL=0)
+    import main as api
+    sesion = requests.Session()
+    for slug, con_catalogo in (('candanchi', False), ('formigla', True)):
+        if con_catalogo:
+            api.catalogo.actualizar(estaciones)
+        stub.reiniciar_contadores()
+        inicio = time.perf_counter()
+        respuesta = sesion.get(f"{api_url}/estacion/{slug}")
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        print(f"  /estacion/{slug} {'con' if con_catalogo else 'sin'} catálogo: {respuesta.status_code} en "
+              f"{milisegundos:.1f} ms, {stub.peticiones} peticiones al origen")
+
+
+if __name__ == "__main__":
+    main()
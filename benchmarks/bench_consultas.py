@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las consultas de /estaciones (orden, mínimos, límite y campos)
+
+Con una tabla de N estaciones sintéticas mide, por consulta:
+- la consulta recién cambiada la tabla (hay que volver a ordenar)
+- la consulta con el orden ya calculado (otra combinación de filtros)
+- la alternativa en el cliente: recibir el JSON de todas las estaciones,
+  decodificarlo, filtrar, ordenar y recortar
+y el tamaño de la respuesta completa frente a la proyectada.
+
+Ejecutar: python benchmarks/bench_consultas.py --estaciones 300 --repeticiones 5000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from consultas import TablaEstaciones, leer_campos
+from modelos import RegistroEstacion
+
+
+def _sinteticas(n: int) -> list:
+    aleatorio = random.Random(0)
+    registros = []
+    for i in range(n):
+        total = aleatorio.randint(5, 40)
+        kilometros = round(aleatorio.uniform(10, 150), 1)
+        registros.append(RegistroEstacion(
+            slug=f"estacion-{i}", nombre=f"Estación {i}", timestamp=f"2025-01-{1 + i % 28:02d}T10:00:00",
+            remontes_abiertos=aleatorio.randint(0, total), remontes_total=total,
+            kilometros_abiertos=round(aleatorio.uniform(0, kilometros), 1), kilometros_total=kilometros,
+            # Una de cada diez sin dato de nieve
+            nieve_espesor=None if i % 10 == 0 else aleatorio.randint(0, 250),
+            nieve_unidad=None if i % 10 == 0 else 'cm'
+        ))
+    return registros
+
+
+def _respuesta(tabla: TablaEstaciones, orden, minimos, limite, campos) -> bytes:
+    """Lo que hace el endpoint al construir la respuesta"""
+    filas, coincidencias = tabla.consultar(orden, minimos, limite)
+    return b''.join((
+        b'{"estaciones":[', b','.join(tabla.json_fila(i, campos) for i in filas),
+        b'],"total":', str(len(filas)).encode(), b',"coincidencias":', str(coincidencias).encode(),
+        b',"ultima_actualizacion":', json.dumps(tabla.ultima_actualizacion(filas)).encode(), b'}'
+    ))
+
+
+def _en_cliente(cuerpo: bytes, minimo: float, limite: int) -> list:
+    """Filtrado y orden en el cliente a partir de la respuesta completa"""
+    estaciones = [
+        estacion for estacion in json.loads(cuerpo)['estaciones']
+        if estacion['remontes'] and estacion['remontes']['abiertos'] >= minimo
+    ]
+    estaciones.sort(key=lambda estacion: -(estacion['nieve'] or {}).get('espesor', -1))
+    return [{'nombre': estacion['nombre'], 'nieve': estacion['nieve']} for estacion in estaciones[:limite]]
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=300)
+    parser.add_argument("--repeticiones", type=int, default=5000)
+    args = parser.parse_args()
+    n = args.repeticiones
+
+    registros = _sinteticas(args.estaciones)
+    tabla = TablaEstaciones(max_filas=args.estaciones)
+    for registro in registros:
+        tabla.actualizar(registro)
+    campos = leer_campos('nombre,nieve')
+    minimos = {'remontes_abiertos': 10}
+
+    def recien_cambiada():
+        # Cada vuelta sustituye un registro, lo que invalida los órdenes
+        registro = registros[random.randrange(len(registros))]
+        tabla.actualizar(registro.con_timestamp(registro.timestamp))
+        _respuesta(tabla, 'nieve', minimos, 5, campos)
+
+    completa = b'{"estaciones":[' + b','.join(registro.a_json() for registro in registros) + b']}'
+    proyectada = _respuesta(tabla, 'nieve', minimos, None, campos)
+
+    print(f"Consulta orden=nieve&min_remontes_abiertos=10&limite=5&campos=nombre,nieve "
+          f"sobre {args.estaciones} estaciones")
+    for nombre, funcion in (
+        ("tabla recién cambiada (reordena)", recien_cambiada),
+        ("orden ya calculado", lambda: _respuesta(tabla, 'nieve', minimos, 5, campos)),
+        ("orden ya calculado, sin límite", lambda: _respuesta(tabla, 'nieve', minimos, None, campos)),
+        ("en el cliente (JSON completo)", lambda: _en_cliente(completa, 10, 5)),
+    ):
+        print(f"  {nombre:<34} {_medir(funcion, n):9.1f} µs/consulta")
+
+    print(f"  Respuesta completa {len(completa) / 1024:.1f} KiB, "
+          f"proyectada (nombre,nieve, sin límite) {len(proyectada) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
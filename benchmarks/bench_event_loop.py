@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de carga: latencia de /status mientras hay muchos scrapes en curso
+
+Si el scraping bloquease el event loop, el p99 de /status crecería hasta la
+latencia del upstream. Con el pool de hilos debe mantenerse plano.
+
+Ejecutar: python benchmarks/bench_event_loop.py --scrapes 50 --latencia 1.0
+"""
+
+import argparse
+import threading
+import time
+
+import requests
+
+from comun import iniciar_api, percentil
+from stub_infonieve import iniciar_stub
+
+
+def medir_status(api_url: str, n: int) -> list:
+    """Mide n peticiones secuenciales a /status (ms)"""
+    sesion = requests.Session()
+    tiempos = []
+    for _ in range(n):
+        inicio = time.perf_counter()
+        sesion.get(f"{api_url}/status", timeout=30).raise_for_status()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def resumen(nombre: str, tiempos: list):
+    print(f"  {nombre:<28} p50={percentil(tiempos, 50):7.2f} ms  "
+          f"p99={percentil(tiempos, 99):7.2f} ms  max={max(tiempos):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scrapes", type=int, default=50, help="Scrapes simultáneos en curso")
+    parser.add_argument("--latencia", type=float, default=1.0, help="Latencia del upstream (s)")
+    parser.add_argument("--muestras", type=int, default=200, help="Peticiones a /status por fase")
+    args = parser.parse_args()
+
+    _, base_url = iniciar_stub(latencia=args.latencia)
+    _, api_url = iniciar_api(base_url)
+
+    print("=" * 60)
+    print(f"  /status con {args.scrapes} scrapes en curso (upstream {args.latencia:g} s)")
+    print("=" * 60)
+
+    resumen("Sin carga", medir_status(api_url, args.muestras))
+
+    parar = threading.Event()
+
+    def cliente(i):
+        sesion = requests.Session()
+        while not parar.is_set():
+            sesion.get(f"{api_url}/estacion/estacion-{i}", timeout=60)
+
+    hilos = [threading.Thread(target=cliente, args=(i,), daemon=True) for i in range(args.scrapes)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(args.latencia / 2)
+
+    resumen("Con scrapes en curso", medir_status(api_url, args.muestras))
+    parar.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del extractor frente al scraper original con BeautifulSoup
+
+Para cada página del corpus (benchmarks/fixtures) comprueba que ambos
+extractores devuelven lo mismo y mide tiempo de parseo y memoria pico.
+
+Ejecutar: python benchmarks/bench_extractor.py --repeticiones 50
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from extractor import extraer_datos
+from stub_infonieve import cargar_paginas
+
+
+def extraer_bs4(contenido: bytes) -> dict:
+    """Extracción original: html.parser completo y recorrido de todos los <span>"""
+    soup = BeautifulSoup(contenido, 'html.parser')
+    datos = {'remontes': None, 'kilometros': None, 'nieve': None}
+
+    for span in soup.find_all('span'):
+        if 'Remontes' in span.text:
+            strong = span.find('strong', class_='fuentemega')
+            em = span.find('em')
+            if strong and em:
+                datos['remontes'] = f"{strong.text.strip()}/{em.text.strip().replace('/', '')}"
+        elif 'Kilómetros' in span.text:
+            strong = span.find('strong', class_='fuentemega')
+            em = span.find('em')
+            if strong and em:
+                datos['kilometros'] = f"{strong.text.strip()}/{em.text.strip().replace('/', '')}"
+        elif 'Nieve' in span.text:
+            strong = span.find('strong', class_='fuentemega')
+            em = span.find('em')
+            if strong and em:
+                datos['nieve'] = f"{strong.text.strip()} {em.text.strip()}"
+
+    return datos
+
+
+def medir_tiempo(funcion, contenido: bytes, repeticiones: int) -> float:
+    """Tiempo medio por página en ms"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(contenido)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def medir_memoria(funcion, contenido: bytes) -> int:
+    """Memoria pico (bytes) de una extracción"""
+    tracemalloc.start()
+    funcion(contenido)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = cargar_paginas()
+    diferencias = 0
+
+    print("=" * 88)
+    print(f"  {'Página':<16} {'KB':>6} {'bs4 ms':>9} {'nuevo ms':>9} {'x':>6} {'bs4 KB pico':>12} {'nuevo KB pico':>14}")
+    print("=" * 88)
+
+    for nombre, contenido in corpus.items():
+        esperado = extraer_bs4(contenido)
+        obtenido = extraer_datos(contenido)
+        if esperado != obtenido:
+            diferencias += 1
+            print(f"  ✗ {nombre}: bs4={esperado} nuevo={obtenido}")
+            continue
+
+        t_bs4 = medir_tiempo(extraer_bs4, contenido, args.repeticiones)
+        t_nuevo = medir_tiempo(extraer_datos, contenido, args.repeticiones)
+        m_bs4 = medir_memoria(extraer_bs4, contenido)
+        m_nuevo = medir_memoria(extraer_datos, contenido)
+        print(f"  {nombre:<16} {len(contenido) / 1024:6.1f} {t_bs4:9.3f} {t_nuevo:9.3f} {t_bs4 / t_nuevo:6.1f} "
+              f"{m_bs4 / 1024:12.1f} {m_nuevo / 1024:14.1f}")
+
+    print()
+    if diferencias:
+        print(f"✗ {diferencias} páginas con resultados distintos")
+        sys.exit(1)
+    print(f"✓ Resultados idénticos en las {len(corpus)} páginas del corpus")
+
+
+if __name__ == "__main__":
+    main()
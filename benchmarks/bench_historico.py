@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del histórico: consultas de una temporada completa
+
+Genera una temporada de puntos (uno cada 30 minutos) para N estaciones y
+mide el tiempo de las consultas por rango con y sin resolución.
+
+Ejecutar: python benchmarks/bench_historico.py --estaciones 30 --dias 150
+"""
+
+import argparse
+import random
+import time
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from historico import Historico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=30)
+    parser.add_argument("--dias", type=int, default=150)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    ahora = time.time()
+    inicio_temporada = ahora - args.dias * 86400
+    # Sin compactación para medir el peor caso (todos los puntos en detalle)
+    historico = Historico(retencion=(args.dias + 1) * 86400, detalle=(args.dias + 1) * 86400, resolucion_antigua=0)
+
+    t0 = time.perf_counter()
+    slugs = [f"estacion-{i}" for i in range(args.estaciones)]
+    for slug in slugs:
+        filas = []
+        t = inicio_temporada
+        while t < ahora:
+            total = 22
+            filas.append((t, random.randint(0, total), total, random.uniform(0, 100), 105, random.randint(0, 300)))
+            t += 1800
+        historico.cargar(slug, filas, ahora)
+    print(f"Carga: {len(historico)} puntos en {(time.perf_counter() - t0) * 1000:.1f} ms "
+          f"({historico.estadisticas()['bytes'] / 1024:.0f} KB)")
+
+    consultas = [
+        ("Temporada, todos los puntos", dict(desde=inicio_temporada, hasta=ahora)),
+        ("Temporada, 1 punto/día", dict(desde=inicio_temporada, hasta=ahora, resolucion=86400)),
+        ("Última semana, 1 punto/hora", dict(desde=ahora - 7 * 86400, hasta=ahora, resolucion=3600)),
+        ("Último día, todos", dict(desde=ahora - 86400, hasta=ahora)),
+    ]
+    for nombre, parametros in consultas:
+        t0 = time.perf_counter()
+        for _ in range(args.repeticiones):
+            for slug in slugs:
+                resultado = historico.consultar(slug, **parametros)
+        ms = (time.perf_counter() - t0) / args.repeticiones * 1000
+        print(f"  {nombre:<30} {len(resultado['tiempos']):6d} puntos/estación  "
+              f"{ms:8.2f} ms las {args.estaciones} estaciones  ({ms / args.estaciones:.3f} ms/estación)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del cliente HTTP: conexiones y bytes ahorrados
+
+Compara `requests.get` sin sesión (una conexión nueva por petición y la
+página completa cada vez) con ClienteInfonieve (keep-alive + compresión +
+peticiones condicionales) contra el stub local. En el stub cada conexión
+nueva equivale a un handshake TCP (y TLS, contra el sitio real).
+
+Ejecutar: python benchmarks/bench_http.py --estaciones 20 --rondas 10
+"""
+
+import argparse
+import time
+
+import requests
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from cliente_http import ClienteInfonieve, USER_AGENT
+from stub_infonieve import iniciar_stub
+
+
+def ronda_sin_sesion(base_url: str, slugs: list):
+    for slug in slugs:
+        response = requests.get(f"{base_url}{slug}/", headers={'User-Agent': USER_AGENT,
+                                                                'Accept-Encoding': 'identity'}, timeout=15)
+        response.raise_for_status()
+
+
+def ronda_cliente(cliente: ClienteInfonieve, base_url: str, slugs: list):
+    for slug in slugs:
+        contenido, validadores, _ = cliente.descargar(slug, f"{base_url}{slug}/")
+        if contenido is not None:
+            cliente.recordar(slug, validadores, {'slug': slug})
+
+
+def medir(nombre: str, servidor, funcion, rondas: int):
+    servidor.reiniciar_contadores()
+    inicio = time.perf_counter()
+    for _ in range(rondas):
+        funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"  {nombre:<22} {duracion * 1000:9.1f} ms  conexiones={servidor.conexiones:5d}  "
+          f"peticiones={servidor.peticiones:5d}  304={servidor.respuestas_304:5d}  "
+          f"bytes={servidor.bytes_enviados:9d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=20)
+    parser.add_argument("--rondas", type=int, default=10)
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_stub()
+    slugs = [f"estacion-{i}" for i in range(args.estaciones)]
+
+    print("=" * 60)
+    print(f"  {args.rondas} rondas x {args.estaciones} estaciones")
+    print("=" * 60)
+
+    medir("Sin sesión", servidor, lambda: ronda_sin_sesion(base_url, slugs), args.rondas)
+
+    cliente = ClienteInfonieve(pool_size=4, timeout=15)
+    medir("ClienteInfonieve", servidor, lambda: ronda_cliente(cliente, base_url, slugs), args.rondas)
+    print(f"\n  Estadísticas del cliente: {cliente.estadisticas()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la detección de páginas sin cambios (huellas del bloque de datos)
+
+1. Por página del corpus: parsear y construir el registro frente a calcular
+   la huella del bloque de datos y buscarla. También se cuentan las páginas
+   que se reconocerían como iguales si cambia lo que rodea a los datos (una
+   fecha al pie) con la huella del bloque y con una huella de la página entera.
+2. De extremo a extremo: rondas de POST /refresh de N estaciones contra el
+   stub sin ETag ni Last-Modified (siempre 200 con la misma página). Se mide
+   la CPU del proceso por ronda y al final se muestran las estadísticas de
+   /status (ratio de páginas sin cambios y CPU ahorrada estimada).
+
+Ejecutar: python benchmarks/bench_huellas.py --repeticiones 200 --estaciones 50 --rondas 5
+"""
+
+import argparse
+import hashlib
+import time
+from datetime import datetime
+
+import requests
+
+from comun import iniciar_api
+from extractor import extraer_datos
+from huellas import HuellasPaginas, huella
+from modelos import RegistroEstacion
+from stub_infonieve import PAGINAS, iniciar_stub
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def bench_paginas(repeticiones: int):
+    huellas = HuellasPaginas()
+    print("Por página (µs): parsear + registro / huella + búsqueda")
+    for slug, contenido in PAGINAS.items():
+        huellas.recordar(slug, huella(contenido), None)
+
+        def parsear():
+            RegistroEstacion.desde_extraccion(slug, extraer_datos(contenido), datetime.now().isoformat())
+
+        parseo = _medir(parsear, repeticiones)
+        comprobacion = _medir(lambda: huellas.previo(slug, huella(contenido), 0.0), repeticiones)
+        print(f"  {slug:<16} {len(contenido) / 1024:5.1f} KiB  {parseo:8.1f} / {comprobacion:6.1f}  "
+              f"(x{parseo / comprobacion:.0f})")
+
+    # La misma página con otra fecha al pie: cambia el documento pero no los datos
+    iguales_bloque = iguales_pagina = 0
+    for contenido in PAGINAS.values():
+        otra = contenido.replace(b'</body>', f'<p>Actualizado {time.time()}</p></body>'.encode())
+        iguales_bloque += huella(otra) == huella(contenido)
+        iguales_pagina += (hashlib.blake2b(otra, digest_size=16).digest()
+                           == hashlib.blake2b(contenido, digest_size=16).digest())
+    print(f"  Con otra fecha al pie, reconocidas como iguales: bloque {iguales_bloque}/{len(PAGINAS)}, "
+          f"página entera {iguales_pagina}/{len(PAGINAS)}")
+
+
+def bench_refresco(estaciones: int, rondas: int):
+    _, base_url = iniciar_stub(validadores=False)
+    _, api = iniciar_api(base_url, INTERVALO_REFRESCO=0, CACHE_MAX_ENTRADAS=2 * estaciones)
+    slugs = ','.join(f"huella-{i}" for i in range(estaciones))
+    print(f"Refresco de {estaciones} estaciones, páginas siempre iguales y sin validadores (200)")
+    for ronda in range(rondas):
+        cpu = time.process_time()
+        inicio = time.perf_counter()
+        requests.post(f"{api}/refresh", params={'estaciones': slugs}, timeout=300)
+        print(f"  ronda {ronda + 1}: CPU {(time.process_time() - cpu) * 1000:7.1f} ms  "
+              f"tiempo {(time.perf_counter() - inicio) * 1000:7.1f} ms{'  (parsea todo)' if ronda == 0 else ''}")
+    print(f"  /status huellas: {requests.get(f'{api}/status').json()['huellas']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--estaciones", type=int, default=50)
+    parser.add_argument("--rondas", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_paginas(args.repeticiones)
+    bench_refresco(args.estaciones, args.rondas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de POST /estaciones/lote frente a GET /estaciones?estaciones=...
+
+Para lotes de N estaciones mide:
+- en frío (todas se scrapean contra el stub con latencia): tiempo hasta el
+  primer resultado y hasta el último
+- en caliente (todas en caché): pico de memoria reservada por la API al
+  atender la petición (tracemalloc, la API corre en este mismo proceso)
+
+Con GET el primer byte llega cuando ha terminado la última estación y la
+respuesta entera se construye en memoria; el lote envía cada estación al
+terminar y solo tiene en memoria las que están en curso.
+
+Ejecutar: python benchmarks/bench_lote.py --estaciones 50,200,800 --latencia 0.2
+"""
+
+import argparse
+import itertools
+import time
+import tracemalloc
+
+import requests
+
+from comun import iniciar_api
+from stub_infonieve import iniciar_stub
+
+_rondas = itertools.count()
+
+
+def _get(api: str, slugs: list) -> tuple:
+    """(segundos hasta el primer resultado, segundos hasta el último)"""
+    inicio = time.perf_counter()
+    respuesta = requests.get(f"{api}/estaciones", params={'estaciones': ','.join(slugs)}, stream=True, timeout=300)
+    primero = None
+    for _ in respuesta.iter_content(chunk_size=None):
+        if primero is None:
+            primero = time.perf_counter() - inicio
+    return primero, time.perf_counter() - inicio
+
+
+def _lote(api: str, slugs: list, concurrencia: int) -> tuple:
+    """(segundos hasta la primera línea, segundos hasta la última)"""
+    inicio = time.perf_counter()
+    respuesta = requests.post(f"{api}/estaciones/lote", json={'estaciones': slugs, 'concurrencia': concurrencia},
+                              stream=True, timeout=300)
+    primero = None
+    for _ in respuesta.iter_lines():
+        if primero is None:
+            primero = time.perf_counter() - inicio
+    return primero, time.perf_counter() - inicio
+
+
+def _pico_memoria(funcion) -> int:
+    """Bytes de pico reservados mientras se ejecuta la función"""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    funcion()
+    return tracemalloc.get_traced_memory()[1] - base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", default="50,200,800", help="Tamaños de lote separados por coma")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Latencia del stub (s)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    args = parser.parse_args()
+    tamanos = [int(n) for n in args.estaciones.split(',')]
+
+    _, base_url = iniciar_stub(latencia=args.latencia, validadores=False)
+    _, api = iniciar_api(base_url, INTERVALO_REFRESCO=0, MAX_CONCURRENCIA=args.concurrencia,
+                         CACHE_MAX_ENTRADAS=2 * max(tamanos) + 10)
+
+    print(f"En frío (stub con {args.latencia * 1000:.0f} ms de latencia, concurrencia {args.concurrencia})")
+    for n in tamanos:
+        for nombre, pedir in (("GET ", lambda slugs: _get(api, slugs)),
+                              ("lote", lambda slugs: _lote(api, slugs, args.concurrencia))):
+            ronda = next(_rondas)
+            primero, ultimo = pedir([f"l{ronda}-{i}" for i in range(n)])
+            print(f"  {n:4d} estaciones {nombre}  primer resultado {primero * 1000:8.0f} ms  "
+                  f"último {ultimo * 1000:8.0f} ms")
+
+    print("En caliente (todas en caché): pico de memoria de la API por petición")
+    tracemalloc.start()
+    for n in tamanos:
+        slugs = [f"caliente-{n}-{i}" for i in range(n)]
+        _lote(api, slugs, args.concurrencia)
+        get = _pico_memoria(lambda: _get(api, slugs))
+        lote = _pico_memoria(lambda: _lote(api, slugs, args.concurrencia))
+        print(f"  {n:4d} estaciones  GET {get / 1024:8.0f} KiB  lote {lote / 1024:8.0f} KiB")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del coste de la instrumentación
+
+Mide, por llamada:
+- print con fecha (lo que se hacía antes en cada scrape y en cada /estaciones)
+- log.debug con el nivel en INFO (el camino habitual: no se escribe nada)
+- log.info encolado al hilo de logs (texto y JSON), con la salida a /dev/null
+- una observación de un histograma y un incremento de un contador
+y el tiempo de generar /metrics con N slugs.
+
+Ejecutar: python benchmarks/bench_metricas.py --repeticiones 100000 --slugs 200
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from logs import NOMBRE, configurar_logs
+from metricas import Metricas
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Nanosegundos por llamada"""
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(i)
+    return (time.perf_counter() - inicio) / repeticiones * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=100000)
+    parser.add_argument("--slugs", type=int, default=200)
+    args = parser.parse_args()
+    n = args.repeticiones
+
+    log = logging.getLogger(NOMBRE)
+    metricas = Metricas(prefijo='bench_')
+    histograma = metricas.histograma('segundos', 'Histograma de prueba', ('endpoint', 'slug'))
+    contador = metricas.contador('total', 'Contador de prueba', ('tipo', 'endpoint', 'slug'))
+
+    resultados = []
+    with open(os.devnull, 'w') as nulo:
+        with contextlib.redirect_stdout(nulo):
+            resultados.append(("print con fecha", _medir(lambda i: print(f"[{datetime.now()}] Scrapeando s{i}..."), n)))
+
+            oyente = configurar_logs('INFO', 'texto')
+            resultados.append(("log.debug (nivel INFO)", _medir(lambda i: log.debug("Scrapeando", extra={'slug': i}), n)))
+            resultados.append(("log.info encolado (texto)", _medir(lambda i: log.info("Scrapeando", extra={'slug': i}), n)))
+            oyente.stop()
+
+            oyente = configurar_logs('INFO', 'json')
+            resultados.append(("log.info encolado (json)", _medir(lambda i: log.info("Scrapeando", extra={'slug': i}), n)))
+            oyente.stop()
+
+            configurar_logs('off')
+            resultados.append(("log.info con LOG_NIVEL=off", _medir(lambda i: log.info("Scrapeando", extra={'slug': i}), n)))
+
+    slugs = [f"estacion-{i}" for i in range(args.slugs)]
+    resultados.append(("Histograma.observar", _medir(lambda i: histograma.observar(0.01, '/estaciones', slugs[i % len(slugs)]), n)))
+    resultados.append(("Contador.inc", _medir(lambda i: contador.inc('http', '/estaciones', slugs[i % len(slugs)]), n)))
+
+    for nombre, ns in resultados:
+        print(f"  {nombre:<30} {ns / 1000:8.2f} µs/llamada")
+
+    inicio = time.perf_counter()
+    cuerpo = metricas.exponer()
+    print(f"  /metrics con {args.slugs} slugs: {(time.perf_counter() - inicio) * 1000:.1f} ms, {len(cuerpo) / 1024:.0f} KiB",
+          file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del parseo en procesos (PARSE_WORKERS)
+
+Lanza el stub en un proceso aparte y, para cada número de procesos de
+parseo, arranca la API en un subproceso nuevo y mide un POST /refresh de N
+estaciones en frío (todas se descargan y se parsean). Con 0 se parsea en los
+hilos de scraping, como por defecto. El rendimiento solo puede escalar hasta
+el número de núcleos de la máquina.
+
+Ejecutar: python benchmarks/bench_parseo_procesos.py --estaciones 200 --workers 0,1,2,4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+from comun import iniciar_api, puerto_libre
+
+SCRIPT = os.path.abspath(__file__)
+STUB = os.path.join(os.path.dirname(SCRIPT), 'stub_infonieve.py')
+
+
+def medir_refresco(base_url: str, workers: int, estaciones: int, rondas: int) -> dict:
+    """En el subproceso: estaciones por segundo de /refresh con `workers` procesos"""
+    _, api_url = iniciar_api(base_url, INTERVALO_REFRESCO=0, PARSE_WORKERS=workers, SCRAPE_WORKERS=32,
+                             POOL_HTTP=32, CONCURRENCIA_REFRESCO=32, CACHE_MAX_ENTRADAS=100000)
+    mejores = []
+    for ronda in range(rondas):
+        slugs = ','.join(f"parseo-{ronda}-{i}" for i in range(estaciones))
+        inicio = time.perf_counter()
+        resultado = requests.post(f"{api_url}/refresh", params={'estaciones': slugs}, timeout=300).json()
+        segundos = time.perf_counter() - inicio
+        correctas = sum(1 for r in resultado['estaciones'] if r['estado'] == 'success')
+        mejores.append(correctas / segundos)
+    return {'workers': workers, 'estaciones_por_segundo': round(max(mejores), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=200)
+    parser.add_argument("--workers", default=f"0,1,2,{os.cpu_count()}", help="Procesos de parseo separados por coma")
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--interno", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno is not None:
+        print(json.dumps(medir_refresco(args.base_url, args.interno, args.estaciones, args.rondas)))
+        return
+
+    puerto = puerto_libre()
+    stub = subprocess.Popen([sys.executable, STUB, '--puerto', str(puerto)], stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{puerto}/estacion-esqui/"
+    try:
+        while True:
+            try:
+                requests.get(base_url, timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.1)
+
+        print(f"POST /refresh de {args.estaciones} estaciones en frío ({os.cpu_count()} núcleos)")
+        base = None
+        for workers in sorted({int(w) for w in args.workers.split(',')}):
+            salida = subprocess.run(
+                [sys.executable, SCRIPT, '--interno', str(workers), '--base-url', base_url,
+                 '--estaciones', str(args.estaciones), '--rondas', str(args.rondas)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            resultado = json.loads(salida.strip().splitlines()[-1])
+            base = base or resultado['estaciones_por_segundo']
+            print(f"  PARSE_WORKERS={workers:<3} {resultado['estaciones_por_segundo']:8.1f} estaciones/s  "
+                  f"(x{resultado['estaciones_por_segundo'] / base:.2f})")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de reintentos y cobertura (hedging) de las descargas
+
+El stub responde con una cola larga (una fracción de peticiones tarda mucho
+más) y algunos 503. Se mide /estacion/{slug} en frío con:
+- sin reintentos ni cobertura
+- con reintentos (5xx y errores de conexión, backoff exponencial con jitter)
+- con reintentos y cobertura al percentil 95
+
+Ejecutar: python benchmarks/bench_reintentos.py --peticiones 300 --lentas 0.03 --errores 0.1
+"""
+
+import argparse
+import itertools
+import threading
+import time
+
+import requests
+
+from comun import iniciar_api, percentil
+from stub_infonieve import iniciar_stub
+
+_contador_slugs = itertools.count()
+
+
+def medir(api_url: str, peticiones: int, concurrencia: int) -> dict:
+    latencias = []
+    correctas = 0
+    lock = threading.Lock()
+    pendientes = itertools.count()
+
+    def cliente():
+        nonlocal correctas
+        sesion = requests.Session()
+        while next(pendientes) < peticiones:
+            inicio = time.perf_counter()
+            datos = sesion.get(f"{api_url}/estacion/hedge-{next(_contador_slugs)}", timeout=60).json()
+            with lock:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                correctas += datos['estado'] == 'success'
+
+    hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    return {
+        'correctas': correctas / len(latencias),
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95),
+        'p99': percentil(latencias, 99)
+    }
+
+
+def totales(api) -> tuple:
+    contadores = api.contadores_scrape.values()
+    return (sum(c['reintentos'] for c in contadores),
+            sum(c['coberturas'] for c in contadores),
+            sum(c['coberturas_ganadas'] for c in contadores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=300)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latencia base del stub (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Latencia extra aleatoria del stub (s)")
+    parser.add_argument("--lentas", type=float, default=0.03, help="Fracción de peticiones lentas")
+    parser.add_argument("--latencia-lenta", type=float, default=1.0, help="Espera extra de las lentas (s)")
+    parser.add_argument("--errores", type=float, default=0.1, help="Fracción de 503 del stub")
+    args = parser.parse_args()
+
+    _, base_url = iniciar_stub(latencia=args.latencia, jitter=args.jitter, tasa_error=args.errores,
+                               tasa_lentas=args.lentas, latencia_lenta=args.latencia_lenta, validadores=False)
+    _, api_url = iniciar_api(base_url, INTERVALO_REFRESCO=0, CACHE_MAX_ENTRADAS=100000)
+    import main as api
+
+    # La configuración se lee en cada scrape, así que se puede cambiar en caliente
+    modos = [
+        ("sin reintentos ni cobertura", dict(REINTENTOS=0, COBERTURA_PERCENTIL=0)),
+        ("reintentos", dict(REINTENTOS=2, COBERTURA_PERCENTIL=0)),
+        ("reintentos + cobertura p95", dict(REINTENTOS=2, COBERTURA_PERCENTIL=95)),
+    ]
+    print(f"/estacion/{{slug}} en frío: {args.peticiones} peticiones, concurrencia {args.concurrencia}, "
+          f"{args.lentas:.0%} lentas (+{args.latencia_lenta:g} s), {args.errores:.0%} de 503")
+    for nombre, config in modos:
+        for clave, valor in config.items():
+            setattr(api, clave, valor)
+        antes = totales(api)
+        r = medir(api_url, args.peticiones, args.concurrencia)
+        reintentos, coberturas, ganadas = (d - a for d, a in zip(totales(api), antes))
+        print(f"  {nombre:<28} correctas {r['correctas']:6.1%}  p50 {r['p50']:7.1f}  p95 {r['p95']:7.1f}  "
+              f"p99 {r['p99']:7.1f} ms  reintentos {reintentos:4d}  coberturas {coberturas:4d} ({ganadas} ganadas)")
+
+
+if __name__ == "__main__":
+    main()
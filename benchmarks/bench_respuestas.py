@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las respuestas precalculadas de /estaciones
+
+Con las estaciones ya en caché, compara para el mismo conjunto de slugs:
+- CPU de codificación por petición: componer el JSON y comprimirlo en cada
+  petición (como haría GZipMiddleware) frente a servir los bytes guardados
+- Bytes enviados y peticiones/segundo de extremo a extremo contra la API:
+  sin compresión, con gzip y con revalidación (If-None-Match -> 304)
+
+Ejecutar: python benchmarks/bench_respuestas.py --estaciones 5 --peticiones 500
+"""
+
+import argparse
+import gzip
+import time
+
+import requests
+
+from comun import iniciar_api
+from respuestas import CacheRespuestas
+from stub_infonieve import iniciar_stub
+
+
+def bench_codificacion(registros: tuple, repeticiones: int):
+    """Microsegundos por petición componiendo y comprimiendo frente a reutilizar"""
+    def construir():
+        return b''.join((
+            b'{"estaciones":[', b','.join(registro.a_json() for registro in registros),
+            b'],"total":', str(len(registros)).encode(), b',"ultima_actualizacion":null}'
+        ))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        gzip.compress(construir(), compresslevel=9)
+    us_cada_vez = (time.perf_counter() - inicio) / repeticiones * 1e6
+
+    respuestas = CacheRespuestas(max_entradas=8)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        entrada = respuestas.obtener('bench', registros, construir)
+        respuestas.variante(entrada, 'gzip')
+    us_precalculada = (time.perf_counter() - inicio) / repeticiones * 1e6
+
+    print(f"Codificación por petición ({len(registros)} estaciones)")
+    print(f"  componer + gzip en cada petición {us_cada_vez:9.1f} µs")
+    print(f"  respuesta precalculada           {us_precalculada:9.1f} µs  (x{us_cada_vez / us_precalculada:.0f})")
+
+
+def bench_http(api_url: str, slugs: str, peticiones: int):
+    """Bytes por petición y peticiones/segundo según lo que envía el cliente"""
+    sesion = requests.Session()
+    base = sesion.get(f"{api_url}/estaciones", params={'estaciones': slugs}, headers={'Accept-Encoding': 'identity'})
+    etag = base.headers['ETag']
+
+    escenarios = [
+        ("sin compresión", {'Accept-Encoding': 'identity'}),
+        ("gzip", {'Accept-Encoding': 'gzip'}),
+        ("If-None-Match (304)", {'Accept-Encoding': 'identity', 'If-None-Match': etag}),
+    ]
+    print(f"/estaciones de extremo a extremo ({peticiones} peticiones)")
+    for nombre, cabeceras in escenarios:
+        recibidos = 0
+        inicio = time.perf_counter()
+        for _ in range(peticiones):
+            respuesta = sesion.get(f"{api_url}/estaciones", params={'estaciones': slugs},
+                                   headers=cabeceras, stream=True)
+            recibidos += len(respuesta.raw.read(decode_content=False))
+        segundos = time.perf_counter() - inicio
+        print(f"  {nombre:<22} {recibidos / peticiones:8.0f} bytes/petición  {peticiones / segundos:8.1f} req/s  "
+              f"(estado {respuesta.status_code})")
+
+    print(f"  /status respuestas: {sesion.get(f'{api_url}/status').json()['respuestas']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=5)
+    parser.add_argument("--peticiones", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=5000)
+    args = parser.parse_args()
+
+    _, base_url = iniciar_stub(latencia=0.0)
+    _, api_url = iniciar_api(base_url, INTERVALO_REFRESCO=0)
+
+    import main as api
+    slugs = [f"estacion-{i}" for i in range(args.estaciones)]
+    requests.get(f"{api_url}/estaciones", params={'estaciones': ','.join(slugs)}, timeout=60).raise_for_status()
+
+    bench_codificacion(tuple(api.cache.ver(slug) for slug in slugs), args.repeticiones)
+    bench_http(api_url, ','.join(slugs), args.peticiones)
+
+
+if __name__ == "__main__":
+    main()
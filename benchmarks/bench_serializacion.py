@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de serialización de /estaciones
+
+Compara, para N estaciones en caché:
+- dict: el camino anterior (dicts con textos -> jsonable_encoder -> json.dumps,
+  como hace JSONResponse de FastAPI en cada petición)
+- registros: el JSON ya codificado de cada RegistroEstacion unido en bytes
+
+Mide también la memoria de la caché con cada representación.
+
+Ejecutar: python benchmarks/bench_serializacion.py --estaciones 50
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from extractor import extraer_datos
+from modelos import RegistroEstacion
+from stub_infonieve import PAGINAS
+
+
+def _datos_antiguos(slug: str, extraidos: dict, timestamp: str) -> dict:
+    """Resultado de un scrape tal y como se guardaba antes (dict con textos)"""
+    return {
+        'slug': slug,
+        'nombre': slug.replace('-', ' ').title(),
+        **extraidos,
+        'timestamp': timestamp,
+        'estado': 'success'
+    }
+
+
+def serializar_dicts(estaciones: list) -> bytes:
+    contenido = jsonable_encoder({
+        "estaciones": estaciones,
+        "total": len(estaciones),
+        "ultima_actualizacion": None
+    })
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def serializar_registros(registros: list) -> bytes:
+    return b''.join((
+        b'{"estaciones":[',
+        b','.join(registro.a_json() for registro in registros),
+        b'],"total":', str(len(registros)).encode(),
+        b',"ultima_actualizacion":null}'
+    ))
+
+
+def _medir(funcion, argumento, repeticiones: int) -> float:
+    """Microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(argumento)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def _memoria(construir) -> float:
+    """KB asignados al construir una colección"""
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    coleccion = construir()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del coleccion
+    return (actual - base) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    paginas = list(PAGINAS.values())
+    extraidos = [extraer_datos(paginas[i % len(paginas)]) for i in range(args.estaciones)]
+    timestamp = datetime.now().isoformat()
+    slugs = [f"estacion-{i}" for i in range(args.estaciones)]
+
+    def construir_dicts():
+        return [_datos_antiguos(slug, datos, timestamp) for slug, datos in zip(slugs, extraidos)]
+
+    def construir_registros():
+        registros = [RegistroEstacion.desde_extraccion(slug, datos, timestamp) for slug, datos in zip(slugs, extraidos)]
+        for registro in registros:
+            registro.a_json()
+        return registros
+
+    dicts = construir_dicts()
+    registros = construir_registros()
+
+    us_dicts = _medir(serializar_dicts, dicts, args.repeticiones)
+    us_registros = _medir(serializar_registros, registros, args.repeticiones)
+    print(f"/estaciones con {args.estaciones} estaciones ({len(serializar_registros(registros))} bytes)")
+    print(f"  dict + jsonable_encoder   {us_dicts:9.1f} µs/petición")
+    print(f"  registros (JSON en caché) {us_registros:9.1f} µs/petición  (x{us_dicts / us_registros:.1f})")
+
+    print(f"Memoria de la caché con {args.estaciones} estaciones")
+    print(f"  dicts con textos          {_memoria(construir_dicts):9.1f} KB")
+    print(f"  registros + JSON          {_memoria(construir_registros):9.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
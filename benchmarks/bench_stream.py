@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del flujo de cambios (SSE): memoria por suscriptor y fan-out
+
+Crea N suscriptores que consumen el mismo generador que usa /stream (sin la
+capa HTTP), publica cambios y mide:
+- memoria asignada por suscriptor (tracemalloc)
+- tiempo hasta que todos los suscriptores han recibido cada cambio
+- comportamiento con clientes lentos (buffer acotado y eventos descartados)
+
+Ejecutar: python benchmarks/bench_stream.py --suscriptores 10000 --eventos 20
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from comun import RAIZ  # noqa: F401 - añade la raíz del proyecto al path
+from difusion import Difusor, eventos_sse
+
+
+class Contador:
+    """Cuenta las entregas de un evento a los suscriptores rápidos"""
+
+    def __init__(self):
+        self.pendientes = 0
+        self.completo = asyncio.Event()
+
+    def entregado(self):
+        self.pendientes -= 1
+        if self.pendientes == 0:
+            self.completo.set()
+
+
+async def consumidor(difusor, slugs, contador: Contador, pausa: float):
+    async for mensaje in eventos_sse(difusor, slugs, latido=60):
+        if mensaje.startswith(b"event: cambio"):
+            if pausa:
+                await asyncio.sleep(pausa)
+            else:
+                contador.entregado()
+
+
+async def ejecutar(n: int, eventos: int, buffer: int, lentos: float):
+    difusor = Difusor(max_buffer=buffer)
+    contador = Contador()
+    n_lentos = int(n * lentos)
+
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tareas = [
+        asyncio.create_task(consumidor(difusor, ['sierra-nevada'], contador, 1.0 if i < n_lentos else 0))
+        for i in range(n)
+    ]
+    await asyncio.sleep(0.1)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  Memoria: {(actual - base) / n:.0f} bytes por suscriptor ({(actual - base) / 1e6:.1f} MB en total)")
+
+    fanout, publicar = [], []
+    for e in range(eventos):
+        contador.pendientes = n - n_lentos
+        contador.completo.clear()
+        inicio = time.perf_counter()
+        difusor.publicar('sierra-nevada', {'remontes': {'antes': f"{e}/22", 'ahora': f"{e + 1}/22"}}, '')
+        publicar.append((time.perf_counter() - inicio) * 1000)
+        await contador.completo.wait()
+        fanout.append((time.perf_counter() - inicio) * 1000)
+
+    fanout.sort()
+    publicar.sort()
+    print(f"  Publicar (codificar + encolar a {n}): mediana {publicar[len(publicar) // 2]:.2f} ms")
+    print(f"  Entrega a todos los suscriptores rápidos: mediana {fanout[len(fanout) // 2]:.2f} ms, "
+          f"máx {fanout[-1]:.2f} ms")
+    print(f"  Estadísticas: {difusor.estadisticas()}")
+
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suscriptores", type=int, default=10000)
+    parser.add_argument("--eventos", type=int, default=20)
+    parser.add_argument("--buffer", type=int, default=64, help="Eventos en buffer por suscriptor")
+    parser.add_argument("--lentos", type=float, default=0.01, help="Fracción de suscriptores lentos")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"  {args.suscriptores} suscriptores, {args.eventos} cambios, buffer {args.buffer}")
+    print("=" * 60)
+    asyncio.run(ejecutar(args.suscriptores, args.eventos, args.buffer, args.lentos))
+
+
+if __name__ == "__main__":
+    main()
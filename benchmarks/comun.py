@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades compartidas por los benchmarks
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def puerto_libre() -> int:
+    """Devuelve un puerto TCP libre en localhost"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api(base_url: str, **entorno):
+    """Arranca main.app con uvicorn en un hilo apuntando al stub indicado
+
+    Devuelve (servidor, url_api). Las variables de entorno extra se aplican
+    antes de importar main. Salvo que se indique, no se usa el almacén
+    persistente para que cada ejecución empiece en frío, no hay catálogo
+    (los benchmarks piden slugs inventados), el limitador y el circuito
+    del origen no actúan (el stub es local y aguanta la carga) y el control
+    de admisión no rechaza scrapes (cola y espera sin límite práctico).
+    """
+    os.environ["INFONIEVE_BASE_URL"] = base_url
+    os.environ.setdefault("ALMACEN_RUTA", "")
+    os.environ.setdefault("CATALOGO_URL", "")
+    os.environ.setdefault("LIMITE_PETICIONES", "1000000")
+    os.environ.setdefault("RAFAGA_PETICIONES", "1000000")
+    os.environ.setdefault("FALLOS_CIRCUITO", "1000000000")
+    os.environ.setdefault("ADMISION_COLA", "1000000")
+    os.environ.setdefault("ADMISION_ESPERA", "1000000")
+    for clave, valor in entorno.items():
+        os.environ[clave] = str(valor)
+
+    import uvicorn
+    import main
+
+    puerto = puerto_libre()
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=puerto, log_level="warning")
+    servidor = uvicorn.Server(config)
+    threading.Thread(target=servidor.run, daemon=True).start()
+
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, f"http://127.0.0.1:{puerto}"
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil p (0-100) por el método del rango más cercano"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
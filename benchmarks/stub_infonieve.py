@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor HTTP local que imita las páginas de estación de infonieve.es
+Permite medir el backend sin depender del sitio real
+
+Sirve las páginas del corpus de benchmarks/fixtures: los slugs del corpus
+devuelven su propia página y cualquier otro slug una del corpus elegida de
+forma estable. En /estaciones-esqui/ sirve el listado de estaciones del
+catálogo. La latencia y la tasa de errores son configurables.
+
+Ejecutar: python benchmarks/stub_infonieve.py --latencia 0.5 --errores 0.05
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def cargar_paginas() -> dict:
+    """Devuelve {slug: bytes} con las páginas del corpus"""
+    paginas = {}
+    for ruta in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(ruta, 'rb') as f:
+            paginas[os.path.splitext(os.path.basename(ruta))[0]] = f.read()
+    return paginas
+
+
+PAGINAS = cargar_paginas()
+with open(os.path.join(FIXTURES, 'catalogo', 'estaciones-esqui.html'), 'rb') as _f:
+    LISTADO = _f.read()
+_LISTA_PAGINAS = list(PAGINAS.values())
+
+
+_PRIMER_DATO = re.compile(rb'(class="fuentemega">)(\d+)')
+
+
+def pagina_para(slug: str, variacion: float = 0.0) -> bytes:
+    """Página del corpus correspondiente a un slug
+
+    Con `variacion` el primer dato de la página (los remontes abiertos)
+    cambia cada `variacion` segundos, para simular cambios de estado.
+    """
+    if slug in PAGINAS:
+        pagina = PAGINAS[slug]
+    else:
+        pagina = _LISTA_PAGINAS[zlib.crc32(slug.encode('utf-8')) % len(_LISTA_PAGINAS)]
+    if variacion:
+        paso = int(time.time() // variacion)
+        pagina = _PRIMER_DATO.sub(lambda m: m.group(1) + str((int(m.group(2)) + paso) % 100).encode(), pagina, count=1)
+    return pagina
+
+
+# Fecha fija de "última modificación" de todas las páginas del stub
+LAST_MODIFIED = formatdate(time.time(), usegmt=True)
+
+
+class StubServer(ThreadingHTTPServer):
+    """Servidor con contadores de conexiones, respuestas y bytes enviados"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.conexiones = 0
+        self.peticiones = 0
+        self.respuestas_304 = 0
+        self.errores = 0
+        self.bytes_enviados = 0
+
+    def contar(self, **incrementos):
+        with self._lock:
+            for campo, valor in incrementos.items():
+                setattr(self, campo, getattr(self, campo) + valor)
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.conexiones = self.peticiones = self.respuestas_304 = self.errores = self.bytes_enviados = 0
+
+
+def crear_handler(latencia: float = 0.0, validadores: bool = True,
+                  jitter: float = 0.0, tasa_error: float = 0.0, variacion: float = 0.0,
+                  tasa_lentas: float = 0.0, latencia_lenta: float = 0.0):
+    """Crea la clase handler con la latencia configurada
+
+    Cada petición espera `latencia` más un extra aleatorio de hasta `jitter`
+    segundos, y una fracción `tasa_error` de ellas responde 503. Una fracción
+    `tasa_lentas` tarda además `latencia_lenta` segundos (cola larga). Con
+    `variacion` los remontes abiertos cambian cada `variacion` segundos. Con
+    `validadores` las páginas llevan ETag y Last-Modified y se responde 304
+    a las peticiones condicionales que coinciden.
+    """
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            self.server.contar(conexiones=1)
+
+        def do_GET(self):
+            self.server.contar(peticiones=1)
+            espera = latencia + random.uniform(0, jitter)
+            if tasa_lentas and random.random() < tasa_lentas:
+                espera += latencia_lenta
+            if espera:
+                time.sleep(espera)
+
+            partes = [p for p in self.path.split('/') if p]
+            if partes == ['estaciones-esqui']:
+                cuerpo = LISTADO
+            elif len(partes) != 2 or partes[0] != 'estacion-esqui':
+                self.send_error(404)
+                return
+            else:
+                cuerpo = None
+
+            if tasa_error and random.random() < tasa_error:
+                self.server.contar(errores=1)
+                self.send_error(503)
+                return
+
+            if cuerpo is None:
+                cuerpo = pagina_para(partes[1], variacion)
+            etag = '"' + hashlib.md5(cuerpo).hexdigest() + '"'
+
+            if validadores and self.headers.get('If-None-Match') == etag:
+                self.server.contar(respuestas_304=1)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                cuerpo = gzip.compress(cuerpo)
+                codificacion = 'gzip'
+            else:
+                codificacion = None
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            if codificacion:
+                self.send_header("Content-Encoding", codificacion)
+            if validadores:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            self.server.contar(bytes_enviados=len(cuerpo))
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def iniciar_stub(latencia: float = 0.0, puerto: int = 0, validadores: bool = True,
+                 jitter: float = 0.0, tasa_error: float = 0.0, variacion: float = 0.0,
+                 tasa_lentas: float = 0.0, latencia_lenta: float = 0.0):
+    """Arranca el stub en un hilo y devuelve (servidor, base_url)"""
+    handler = crear_handler(latencia, validadores, jitter, tasa_error, variacion, tasa_lentas, latencia_lenta)
+    servidor = StubServer(("127.0.0.1", puerto), handler)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}/estacion-esqui/"
+    return servidor, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local de infonieve.es")
+    parser.add_argument("--puerto", type=int, default=8100)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por petición")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Espera extra aleatoria máxima (s)")
+    parser.add_argument("--errores", type=float, default=0.0, help="Fracción de peticiones que responden 503")
+    parser.add_argument("--lentas", type=float, default=0.0, help="Fracción de peticiones lentas")
+    parser.add_argument("--latencia-lenta", type=float, default=0.0, help="Espera extra de las peticiones lentas (s)")
+    parser.add_argument("--variacion", type=float, default=0.0, help="Segundos entre cambios de los remontes abiertos")
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_stub(args.latencia, args.puerto, jitter=args.jitter,
+                                      tasa_error=args.errores, variacion=args.variacion,
+                                      tasa_lentas=args.lentas, latencia_lenta=args.latencia_lenta)
+    print(f"Stub escuchando en {base_url}")
+    print(f"Usar con: INFONIEVE_BASE_URL={base_url} python main.py")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
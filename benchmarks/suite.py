@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks offline del backend
+
+Mide contra el stub local (sin acceso a internet):
+- Parseo: páginas/segundo del extractor sobre el corpus de fixtures
+- /estaciones de extremo a extremo: percentiles de latencia para N estaciones
+  y varios niveles de concurrencia, en frío (slugs nuevos, siempre scrape) y
+  en caliente (servido desde caché)
+- Memoria: pico de memoria asignada por petición en frío (tracemalloc)
+
+Los resultados se guardan en JSON para poder comparar ejecuciones.
+
+Ejecutar: python benchmarks/suite.py --estaciones 5,20 --concurrencia 1,8,32
+          python benchmarks/suite.py --comparar benchmarks/resultados/anterior.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import requests
+
+from comun import RAIZ, iniciar_api, percentil
+from extractor import extraer_datos
+from stub_infonieve import PAGINAS, iniciar_stub
+
+RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+# Genera slugs que nunca se han pedido para forzar scrapes en frío
+_contador_slugs = itertools.count()
+
+
+def bench_parseo(duracion: float) -> dict:
+    """Páginas por segundo del extractor recorriendo el corpus en bucle"""
+    paginas = list(PAGINAS.values())
+    total_bytes = 0
+    n = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < duracion:
+        for contenido in paginas:
+            extraer_datos(contenido)
+            total_bytes += len(contenido)
+            n += 1
+    segundos = time.perf_counter() - inicio
+    return {
+        'paginas': n,
+        'paginas_por_segundo': round(n / segundos, 1),
+        'mb_por_segundo': round(total_bytes / segundos / 1e6, 2)
+    }
+
+
+def _slugs(n: int, frio: bool) -> str:
+    if frio:
+        return ','.join(f"bench-{next(_contador_slugs)}" for _ in range(n))
+    return ','.join(f"caliente-{i}" for i in range(n))
+
+
+def bench_estaciones(api_url: str, n: int, concurrencia: int, peticiones: int, frio: bool) -> dict:
+    """Latencia de /estaciones con n estaciones y `concurrencia` clientes"""
+    if not frio:
+        requests.get(f"{api_url}/estaciones", params={'estaciones': _slugs(n, False)}, timeout=60)
+
+    latencias = []
+    lock = threading.Lock()
+    pendientes = itertools.count()
+
+    def cliente():
+        sesion = requests.Session()
+        while next(pendientes) < peticiones:
+            inicio = time.perf_counter()
+            sesion.get(f"{api_url}/estaciones", params={'estaciones': _slugs(n, frio)}, timeout=60).raise_for_status()
+            with lock:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+    hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'modo': 'frio' if frio else 'caliente',
+        'estaciones': n,
+        'concurrencia': concurrencia,
+        'peticiones': len(latencias),
+        'peticiones_por_segundo': round(len(latencias) / segundos, 1),
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p90_ms': round(percentil(latencias, 90), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'max_ms': round(max(latencias), 2)
+    }
+
+
+def bench_memoria(api_url: str, n: int, concurrencia: int) -> dict:
+    """Pico de memoria asignada por petición con `concurrencia` peticiones en frío a la vez"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+
+    hilos = [threading.Thread(target=requests.get, args=(f"{api_url}/estaciones",),
+                              kwargs={'params': {'estaciones': _slugs(n, True)}, 'timeout': 60})
+             for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'estaciones': n,
+        'concurrencia': concurrencia,
+        'kb_por_peticion': round((pico - base) / concurrencia / 1024, 1)
+    }
+
+
+def comparar(actual: dict, ruta_anterior: str):
+    """Muestra la variación de las métricas principales respecto a otra ejecución"""
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+
+    def variacion(nuevo, viejo):
+        return f"{(nuevo - viejo) / viejo * 100:+.1f}%" if viejo else "n/a"
+
+    print(f"\nComparación con {ruta_anterior}")
+    print(f"  parseo páginas/s: {anterior['parseo']['paginas_por_segundo']} → "
+          f"{actual['parseo']['paginas_por_segundo']} ({variacion(actual['parseo']['paginas_por_segundo'], anterior['parseo']['paginas_por_segundo'])})")
+
+    previos = {(r['modo'], r['estaciones'], r['concurrencia']): r for r in anterior['estaciones']}
+    for r in actual['estaciones']:
+        previo = previos.get((r['modo'], r['estaciones'], r['concurrencia']))
+        if previo:
+            print(f"  {r['modo']:<8} N={r['estaciones']:<3} C={r['concurrencia']:<3} p99 "
+                  f"{previo['p99_ms']} → {r['p99_ms']} ms ({variacion(r['p99_ms'], previo['p99_ms'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estaciones", default="5,20", help="Valores de N separados por coma")
+    parser.add_argument("--concurrencia", default="1,8,32", help="Clientes simultáneos separados por coma")
+    parser.add_argument("--peticiones", type=int, default=100, help="Peticiones por combinación")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia del stub (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latencia extra aleatoria del stub (s)")
+    parser.add_argument("--errores", type=float, default=0.0, help="Fracción de errores 503 del stub")
+    parser.add_argument("--duracion-parseo", type=float, default=3.0, help="Segundos del benchmark de parseo")
+    parser.add_argument("--salida", help="Fichero JSON de resultados (por defecto en benchmarks/resultados/)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args()
+
+    ns = [int(v) for v in args.estaciones.split(',')]
+    concurrencias = [int(v) for v in args.concurrencia.split(',')]
+
+    _, base_url = iniciar_stub(latencia=args.latencia, jitter=args.jitter, tasa_error=args.errores)
+    _, api_url = iniciar_api(base_url, INTERVALO_REFRESCO=0, CACHE_MAX_ENTRADAS=100000)
+
+    resultados = {
+        'fecha': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'configuracion': vars(args),
+        'parseo': bench_parseo(args.duracion_parseo),
+        'estaciones': [],
+        'memoria': []
+    }
+    print(f"Parseo: {resultados['parseo']}")
+
+    for frio in (True, False):
+        for n in ns:
+            for c in concurrencias:
+                r = bench_estaciones(api_url, n, c, args.peticiones, frio)
+                resultados['estaciones'].append(r)
+                print(f"  {r['modo']:<8} N={n:<3} C={c:<3} {r['peticiones_por_segundo']:8.1f} req/s  "
+                      f"p50={r['p50_ms']:8.2f}  p90={r['p90_ms']:8.2f}  p99={r['p99_ms']:8.2f} ms")
+
+    for n in ns:
+        r = bench_memoria(api_url, n, max(concurrencias))
+        resultados['memoria'].append(r)
+        print(f"  memoria  N={n:<3} C={r['concurrencia']:<3} {r['kb_por_peticion']:8.1f} KB/petición")
+
+    salida = args.salida
+    if not salida:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        salida = os.path.join(RESULTADOS, f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Resultados guardados en {salida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de los datos de estaciones
+TTL por entrada, tamaño acotado con expulsión LRU y soporte para
+servir datos caducados mientras se refrescan en segundo plano
+
+Hay dos backends con la misma interfaz (BackendCache): en memoria del
+proceso (por defecto) y compartido entre procesos en un fichero SQLite, para
+que varios workers o réplicas compartan los registros y no scrapeen cada uno
+por su cuenta
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from modelos import RegistroEstacion
+
+
+class EntradaCache:
+    """Datos de una estación junto al instante en que se guardaron"""
+
+    __slots__ = ('datos', 'guardado')
+
+    def __init__(self, datos, guardado: float):
+        self.datos = datos
+        self.guardado = guardado
+
+    @property
+    def edad(self) -> float:
+        """Segundos desde que se guardó la entrada"""
+        return time.monotonic() - self.guardado
+
+
+class BackendCache:
+    """Interfaz de los backends de caché
+
+    Además de guardar y leer entradas, ofrece un bloqueo de refresco por
+    slug para que, entre todos los procesos que comparten la caché, solo uno
+    scrapee cada estación a la vez.
+    """
+
+    nombre = None
+    # True si las operaciones pueden bloquear (E/S o esperas a otros
+    # procesos): entonces no se llaman desde el event loop sino en un hilo
+    bloqueante = False
+    # True si otros procesos pueden guardar entradas en la misma caché
+    compartida = False
+
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _leer(self, slug: str):
+        """Entrada de un slug o None, sin contar como acceso"""
+        raise NotImplementedError
+
+    def guardar(self, slug: str, datos, edad: float = 0.0):
+        """Guarda los datos de una estación
+
+        `edad` permite guardar datos obtenidos hace un tiempo (p. ej. los
+        cargados del almacén persistente al arrancar).
+        """
+        raise NotImplementedError
+
+    def adquirir_refresco(self, slug: str, duracion: float) -> bool:
+        """Reserva el scrape de un slug durante `duracion` segundos como mucho"""
+        return True
+
+    def liberar_refresco(self, slug: str):
+        pass
+
+    def bloqueo_vigente(self, slug: str) -> bool:
+        """True si otro proceso tiene reservado el scrape del slug (solo lee)"""
+        return False
+
+    def guardadas_desde(self, desde: float) -> list:
+        """[(slug, datos, guardado)] de las entradas guardadas después de `desde` (epoch)
+
+        Solo tiene sentido en una caché compartida, para enterarse de lo que
+        han guardado otros procesos; en la de memoria lo guarda todo este.
+        """
+        return []
+
+    def cerrar(self):
+        pass
+
+    def obtener(self, slug: str):
+        """Devuelve (entrada, fresca) o (None, False) si no está en caché
+
+        Las entradas caducadas se devuelven igualmente para poder servirlas
+        mientras se refrescan; `fresca` indica si siguen dentro del TTL.
+        """
+        entrada = self._leer(slug)
+        if entrada is None:
+            self.misses += 1
+            return None, False
+
+        if entrada.edad < self.ttl:
+            self.hits += 1
+            return entrada, True
+
+        self.stale += 1
+        return entrada, False
+
+    def ver(self, slug: str):
+        """Datos guardados de un slug (None si no está), sin contar como acceso"""
+        entrada = self._leer(slug)
+        return entrada.datos if entrada is not None else None
+
+    def edad(self, slug: str):
+        """Edad en segundos de la entrada de un slug (None si no está), sin contar como acceso"""
+        entrada = self._leer(slug)
+        return entrada.edad if entrada is not None else None
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        servidas = self.hits + self.stale
+        total = servidas + self.misses
+        return {
+            'backend': self.nombre,
+            'entradas': len(self),
+            'max_entradas': self.max_entradas,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'ratio_aciertos': round(servidas / total, 4) if total else None
+        }
+
+
+class CacheEstaciones(BackendCache):
+    """Caché LRU por slug con TTL en la memoria del proceso"""
+
+    nombre = 'memoria'
+
+    def __init__(self, ttl: float, max_entradas: int):
+        super().__init__(ttl, max_entradas)
+        self._entradas = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _leer(self, slug: str):
+        return self._entradas.get(slug)
+
+    def obtener(self, slug: str):
+        entrada, fresca = super().obtener(slug)
+        if entrada is not None:
+            self._entradas.move_to_end(slug)
+        return entrada, fresca
+
+    def guardar(self, slug: str, datos, edad: float = 0.0):
+        """Guarda los datos de una estación expulsando la menos usada si hace falta"""
+        self._entradas[slug] = EntradaCache(datos, time.monotonic() - edad)
+        self._entradas.move_to_end(slug)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+
+class CacheCompartida(BackendCache):
+    """Caché compartida entre procesos en un fichero SQLite (modo WAL)
+
+    Los registros se guardan como JSON con el instante (epoch) en que se
+    obtuvieron. Cada proceso conserva el último registro que ha leído de
+    cada slug y solo vuelve a decodificar el JSON cuando otro proceso lo ha
+    actualizado, de modo que mientras no cambia se reutiliza el mismo objeto.
+    Al llenarse se expulsan las estaciones actualizadas hace más tiempo.
+
+    El bloqueo de refresco es una fila con dueño y caducidad: si el proceso
+    que lo tiene muere, caduca solo.
+    """
+
+    nombre = 'sqlite'
+    bloqueante = True
+    compartida = True
+
+    def __init__(self, ruta: str, ttl: float, max_entradas: int):
+        super().__init__(ttl, max_entradas)
+        self.ruta = ruta
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._dueno = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=5)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                slug TEXT PRIMARY KEY,
+                datos TEXT NOT NULL,
+                guardado REAL NOT NULL
+            )
+        """)
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS cache_guardado ON cache (guardado)")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS bloqueos (
+                slug TEXT PRIMARY KEY,
+                dueno TEXT NOT NULL,
+                expira REAL NOT NULL
+            )
+        """)
+        self._conexion.commit()
+        self.bloqueos_concedidos = 0
+        self.bloqueos_denegados = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _leer(self, slug: str):
+        with self._lock:
+            fila = self._conexion.execute("SELECT datos, guardado FROM cache WHERE slug = ?", (slug,)).fetchone()
+        if fila is None:
+            self._memo.pop(slug, None)
+            return None
+
+        datos, guardado = fila
+        return EntradaCache(self._registro(slug, datos, guardado), time.monotonic() - (time.time() - guardado))
+
+    def _registro(self, slug: str, datos: str, guardado: float) -> RegistroEstacion:
+        """Registro de una fila, decodificando el JSON solo si ha cambiado"""
+        memo = self._memo.get(slug)
+        if memo is None or memo[0] != guardado:
+            memo = self._memo[slug] = (guardado, RegistroEstacion.desde_dict(json.loads(datos)))
+        return memo[1]
+
+    def guardar(self, slug: str, datos, edad: float = 0.0):
+        """Guarda los datos si son más recientes que los que ya hay"""
+        guardado = time.time() - edad
+        with self._lock:
+            with self._conexion:
+                self._conexion.execute("""
+                    INSERT INTO cache (slug, datos, guardado) VALUES (?, ?, ?)
+                    ON CONFLICT(slug) DO UPDATE SET datos = excluded.datos, guardado = excluded.guardado
+                    WHERE excluded.guardado > cache.guardado
+                """, (slug, json.dumps(datos.a_dict(), ensure_ascii=False), guardado))
+                self._conexion.execute("""
+                    DELETE FROM cache WHERE slug IN (
+                        SELECT slug FROM cache ORDER BY guardado DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entradas,))
+        self._memo[slug] = (guardado, datos)
+
+    def adquirir_refresco(self, slug: str, duracion: float) -> bool:
+        ahora = time.time()
+        with self._lock:
+            with self._conexion:
+                cursor = self._conexion.execute("""
+                    INSERT INTO bloqueos (slug, dueno, expira) VALUES (?, ?, ?)
+                    ON CONFLICT(slug) DO UPDATE SET dueno = excluded.dueno, expira = excluded.expira
+                    WHERE bloqueos.expira < ?
+                """, (slug, self._dueno, ahora + duracion, ahora))
+            concedido = cursor.rowcount == 1
+        if concedido:
+            self.bloqueos_concedidos += 1
+        else:
+            self.bloqueos_denegados += 1
+        return concedido
+
+    def liberar_refresco(self, slug: str):
+        with self._lock:
+            with self._conexion:
+                self._conexion.execute("DELETE FROM bloqueos WHERE slug = ? AND dueno = ?", (slug, self._dueno))
+
+    def bloqueo_vigente(self, slug: str) -> bool:
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT dueno, expira FROM bloqueos WHERE slug = ?", (slug,)
+            ).fetchone()
+        return fila is not None and fila[0] != self._dueno and fila[1] >= time.time()
+
+    def guardadas_desde(self, desde: float) -> list:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT slug, datos, guardado FROM cache WHERE guardado > ? ORDER BY guardado", (desde,)
+            ).fetchall()
+        return [(slug, self._registro(slug, datos, guardado), guardado) for slug, datos, guardado in filas]
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+    def estadisticas(self) -> dict:
+        estadisticas = super().estadisticas()
+        estadisticas.update({
+            'ruta': self.ruta,
+            'bloqueos_concedidos': self.bloqueos_concedidos,
+            'bloqueos_denegados': self.bloqueos_denegados
+        })
+        return estadisticas
+
+
+def crear_cache(backend: str, ttl: float, max_entradas: int, ruta: str = None) -> BackendCache:
+    """Crea el backend de caché indicado ('memoria' o 'sqlite')"""
+    if backend == 'memoria':
+        return CacheEstaciones(ttl=ttl, max_entradas=max_entradas)
+    if backend == 'sqlite':
+        return CacheCompartida(ruta, ttl=ttl, max_entradas=max_entradas)
+    raise ValueError(f"Backend de caché desconocido: {backend!r} (se admite 'memoria' o 'sqlite')")
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de estaciones de infonieve.es
+Se obtiene del listado de estaciones del sitio (extractor.extraer_catalogo)
+y se indexa en memoria para buscar por prefijo o de forma aproximada y para
+saber, sin ir a la red, si un slug existe
+"""
+
+import bisect
+import json
+import os
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import asdict, dataclass
+from itertools import chain
+from typing import Optional
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) de las coincidencias aproximadas
+SIMILITUD_MINIMA = 0.35
+
+
+@dataclass(slots=True, frozen=True)
+class EstacionCatalogo:
+    """Entrada del catálogo"""
+
+    slug: str
+    nombre: str
+    region: Optional[str] = None
+    pais: Optional[str] = None
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con los guiones como espacios ("Boí-Taüll" -> "boi taull")"""
+    texto = unicodedata.normalize('NFKD', texto.lower().replace('-', ' '))
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def _trigramas(texto: str) -> set:
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class Catalogo:
+    """Índice en memoria de las estaciones conocidas
+
+    Para la búsqueda por prefijo se guarda una lista ordenada de claves
+    normalizadas (slug, nombre completo y cada palabra del nombre) y se busca
+    con bisección. Si no hay bastantes resultados se completan con
+    coincidencias aproximadas por trigramas, que toleran erratas. Los índices
+    se reconstruyen enteros al actualizar y se sustituyen todos de una vez
+    (una sola tupla), así que una búsqueda nunca mezcla dos versiones.
+    """
+
+    def __init__(self, ruta: str = None):
+        self.ruta = ruta
+        self.actualizado = None
+        # (slug -> estación, claves ordenadas, slug de cada clave,
+        #  trigrama -> slugs, slug -> nº de trigramas)
+        self._indice = ({}, [], [], {}, {})
+        self.busquedas = 0
+        self.actualizaciones = 0
+
+    @property
+    def _estaciones(self) -> dict:
+        return self._indice[0]
+
+    def __len__(self) -> int:
+        return len(self._estaciones)
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._estaciones
+
+    def get(self, slug: str) -> Optional[EstacionCatalogo]:
+        return self._estaciones.get(slug)
+
+    @property
+    def cargado(self) -> bool:
+        return bool(self._estaciones)
+
+    def actualizar(self, estaciones: list, actualizado: float = None):
+        """Sustituye el catálogo y sus índices"""
+        claves = []
+        trigramas = {}
+        num_trigramas = {}
+        for estacion in estaciones:
+            nombre = normalizar(estacion.nombre)
+            slug = normalizar(estacion.slug)
+            for clave in {slug, nombre, *nombre.split()}:
+                claves.append((clave, estacion.slug))
+            propios = _trigramas(nombre) | _trigramas(slug)
+            num_trigramas[estacion.slug] = len(propios)
+            for trigrama in propios:
+                trigramas.setdefault(trigrama, []).append(estacion.slug)
+        claves.sort()
+
+        self._indice = (
+            {estacion.slug: estacion for estacion in estaciones},
+            [clave for clave, _ in claves], [slug for _, slug in claves], trigramas, num_trigramas
+        )
+        self.actualizado = actualizado if actualizado is not None else time.time()
+        self.actualizaciones += 1
+
+    def buscar(self, consulta: str, limite: int = 10) -> list:
+        """Estaciones que coinciden con la consulta, las de prefijo primero
+
+        Devuelve una lista de (estacion, coincidencia) con coincidencia
+        'prefijo' o 'aproximada'.
+        """
+        self.busquedas += 1
+        consulta = normalizar(consulta)
+        if not consulta or limite <= 0:
+            return []
+
+        indice = self._indice
+        estaciones, claves, slugs_claves = indice[0], indice[1], indice[2]
+        resultados = []
+        vistos = set()
+        i = bisect.bisect_left(claves, consulta)
+        while i < len(claves) and claves[i].startswith(consulta) and len(resultados) < limite:
+            slug = slugs_claves[i]
+            if slug not in vistos:
+                vistos.add(slug)
+                resultados.append((estaciones[slug], 'prefijo'))
+            i += 1
+
+        if len(resultados) < limite:
+            for slug in self._aproximadas(consulta, indice):
+                if slug not in vistos:
+                    vistos.add(slug)
+                    resultados.append((estaciones[slug], 'aproximada'))
+                    if len(resultados) >= limite:
+                        break
+        return resultados
+
+    def _aproximadas(self, consulta: str, indice: tuple) -> list:
+        """Slugs ordenados por similitud de trigramas con la consulta"""
+        _, _, _, trigramas, num_trigramas = indice
+        propios = _trigramas(consulta)
+        comunes = Counter(chain.from_iterable(trigramas.get(trigrama, ()) for trigrama in propios))
+        # Con menos trigramas en común que esto no se llega a la similitud mínima
+        minimo = SIMILITUD_MINIMA * len(propios) / 2
+        puntuados = []
+        for slug, n in comunes.most_common():
+            if n < minimo:
+                break
+            similitud = 2 * n / (len(propios) + num_trigramas[slug])
+            if similitud >= SIMILITUD_MINIMA:
+                puntuados.append((-similitud, slug))
+        puntuados.sort()
+        return [slug for _, slug in puntuados]
+
+    def cargar(self) -> bool:
+        """Carga el catálogo guardado en `ruta`; False si no hay ninguno"""
+        if not self.ruta or not os.path.exists(self.ruta):
+            return False
+        with open(self.ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        self.actualizar([EstacionCatalogo(**estacion) for estacion in datos['estaciones']], datos['actualizado'])
+        return True
+
+    def guardar(self):
+        """Escribe el catálogo en `ruta` (en un fichero temporal que sustituye al anterior)"""
+        if not self.ruta:
+            return
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        datos = {
+            'actualizado': self.actualizado,
+            'estaciones': [asdict(estacion) for estacion in self._estaciones.values()]
+        }
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+    @property
+    def edad(self) -> Optional[float]:
+        """Segundos desde la última actualización (None si nunca se ha cargado)"""
+        return time.time() - self.actualizado if self.actualizado is not None else None
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'estaciones': len(self._estaciones),
+            'regiones': len({estacion.region for estacion in self._estaciones.values()}),
+            'paises': len({estacion.pais for estacion in self._estaciones.values()}),
+            'actualizado': self.actualizado and time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.actualizado)),
+            'actualizaciones': self.actualizaciones,
+            'busquedas': self.busquedas,
+            'ruta': self.ruta
+        }
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartido para descargar las páginas de infonieve.es
+Sesión con pool de conexiones keep-alive, compresión y peticiones
+condicionales (ETag / Last-Modified) por estación
+
+requests (y con él urllib3) se importa al crear la sesión, en la primera
+descarga: un proceso que solo sirve datos guardados no llega a cargarlo
+"""
+
+import threading
+from collections import OrderedDict, deque
+
+try:
+    import brotli  # noqa: F401 - urllib3 descomprime br si está instalado
+    ACCEPT_ENCODING = 'br, gzip, deflate'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class ClienteInfonieve:
+    """Sesión HTTP reutilizable entre hilos con validadores por estación
+
+    Tras cada descarga correcta se recuerdan el ETag / Last-Modified de la
+    página y el resultado ya parseado. La siguiente descarga de esa estación
+    envía If-None-Match / If-Modified-Since y, si el servidor responde 304,
+    se reutiliza el resultado anterior sin descargar ni parsear nada.
+    """
+
+    def __init__(self, pool_size: int, timeout: tuple, max_validadores: int = 256):
+        # timeout: (conexión, lectura) en segundos, como en requests
+        self.timeout = timeout
+        self.max_validadores = max_validadores
+
+        self.pool_size = pool_size
+
+        self._sesion = None
+        self._adaptador = None
+        self._lock = threading.Lock()
+        self._validadores = OrderedDict()
+        self.peticiones = 0
+        self.respuestas_304 = 0
+        self.bytes_descargados = 0
+        self.bytes_descomprimidos = 0
+
+    @property
+    def sesion(self):
+        """Sesión de requests, creada (e importado requests) en el primer uso"""
+        if self._sesion is None:
+            with self._lock:
+                if self._sesion is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    sesion = requests.Session()
+                    self._adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    sesion.mount('http://', self._adaptador)
+                    sesion.mount('https://', self._adaptador)
+                    sesion.headers.update({
+                        'User-Agent': USER_AGENT,
+                        'Accept-Encoding': ACCEPT_ENCODING
+                    })
+                    self._sesion = sesion
+        return self._sesion
+
+    def descargar(self, slug: str, url: str):
+        """Descarga la página de una estación
+
+        Devuelve (contenido, validadores, previo). Si la página no ha cambiado
+        desde la última descarga (304), contenido es None y previo es el
+        resultado parseado de entonces.
+        """
+        cabeceras = {}
+        with self._lock:
+            previo = self._validadores.get(slug)
+        if previo is not None:
+            etag, last_modified, _ = previo
+            if etag:
+                cabeceras['If-None-Match'] = etag
+            if last_modified:
+                cabeceras['If-Modified-Since'] = last_modified
+
+        response = self.sesion.get(url, headers=cabeceras, timeout=self.timeout)
+
+        with self._lock:
+            self.peticiones += 1
+            if response.status_code == 304 and previo is not None:
+                self.respuestas_304 += 1
+                return None, None, previo[2]
+
+        response.raise_for_status()
+        contenido = response.content
+
+        # Bytes en el cable (comprimidos) frente a bytes del documento
+        try:
+            en_cable = response.raw.tell() or len(contenido)
+        except Exception:
+            en_cable = len(contenido)
+        with self._lock:
+            self.bytes_descargados += en_cable
+            self.bytes_descomprimidos += len(contenido)
+
+        validadores = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return contenido, validadores, None
+
+    def recordar(self, slug: str, validadores, registro):
+        """Guarda los validadores y el resultado parseado de una estación"""
+        if not validadores or not any(validadores):
+            return
+        with self._lock:
+            self._validadores[slug] = (validadores[0], validadores[1], registro)
+            self._validadores.move_to_end(slug)
+            while len(self._validadores) > self.max_validadores:
+                self._validadores.popitem(last=False)
+
+    def _conexiones_abiertas(self) -> int:
+        """Conexiones TCP abiertas por los pools de urllib3 desde el arranque"""
+        if self._adaptador is None:
+            return 0
+        pools = self._adaptador.poolmanager.pools
+        total = 0
+        for clave in list(pools.keys()):
+            pool = pools.get(clave)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        conexiones = self._conexiones_abiertas()
+        with self._lock:
+            peticiones = self.peticiones
+            return {
+                'peticiones': peticiones,
+                'conexiones_abiertas': conexiones,
+                'ratio_reutilizacion': round(1 - conexiones / peticiones, 4) if peticiones else None,
+                'respuestas_304': self.respuestas_304,
+                'ratio_304': round(self.respuestas_304 / peticiones, 4) if peticiones else None,
+                'bytes_descargados': self.bytes_descargados,
+                'bytes_descomprimidos': self.bytes_descomprimidos
+            }
+
+
+def es_reintentable(error: 'requests.exceptions.RequestException') -> bool:
+    """Fallos transitorios que merece la pena reintentar: 5xx y errores de conexión
+
+    Incluye conexiones rechazadas o cortadas y timeouts al conectar (la
+    petición no llegó a enviarse), pero no los timeouts de lectura ni los 4xx.
+    """
+    import requests
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+class LatenciasRecientes:
+    """Ventana de las últimas latencias de descarga para calcular percentiles"""
+
+    def __init__(self, ventana: int = 200, min_muestras: int = 20):
+        self.min_muestras = min_muestras
+        self._muestras = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos: float):
+        with self._lock:
+            self._muestras.append(segundos)
+
+    def percentil(self, p: float):
+        """Percentil p (0-100) en segundos; None si aún no hay muestras suficientes"""
+        with self._lock:
+            if len(self._muestras) < self.min_muestras:
+                return None
+            ordenadas = sorted(self._muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Tabla en columnas con el último dato correcto de cada estación
+Las consultas de /estaciones (orden, mínimos, límite y campos) se resuelven
+sobre ella sin scrapear: los valores numéricos están en arrays, los órdenes
+se calculan una vez por versión de la tabla y el JSON de cada campo de cada
+fila ya está codificado, así que proyectar es concatenar bytes
+"""
+
+import json
+import math
+from array import array
+from typing import Optional
+
+from catalogo import normalizar
+from historico import COLUMNAS
+
+# Campos de la representación de la API que se pueden pedir en `campos`
+CAMPOS = ('slug', 'nombre', 'remontes', 'kilometros', 'nieve', 'timestamp', 'estado')
+
+# Criterios de orden: las columnas numéricas (de mayor a menor) y el nombre (alfabético)
+ORDENES = COLUMNAS + ('nombre',)
+
+
+def _fragmento(campo: str, valor) -> bytes:
+    """'"nieve":{"espesor":120,"unidad":"cm"}'"""
+    return json.dumps({campo: valor}, ensure_ascii=False, separators=(',', ':'))[1:-1].encode('utf-8')
+
+
+def leer_orden(orden: str) -> tuple:
+    """"nieve" -> ("nieve", True); "-nieve" invierte el orden por defecto del criterio
+
+    Devuelve (criterio, descendente). ValueError si el criterio no existe.
+    """
+    criterio = orden.lstrip('-')
+    if criterio not in ORDENES:
+        raise ValueError(f"Orden desconocido: {criterio!r} (válidos: {', '.join(ORDENES)})")
+    descendente = criterio != 'nombre'
+    return criterio, descendente != orden.startswith('-')
+
+
+def leer_campos(campos: str) -> tuple:
+    """"nombre,nieve" -> ("slug", "nombre", "nieve"); el slug va siempre
+
+    ValueError si algún campo no existe.
+    """
+    pedidos = [campo.strip() for campo in campos.split(',') if campo.strip()]
+    desconocidos = [campo for campo in pedidos if campo not in CAMPOS]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)} (válidos: {', '.join(CAMPOS)})")
+    return tuple(campo for campo in CAMPOS if campo == 'slug' or campo in pedidos)
+
+
+class TablaEstaciones:
+    """Últimos registros correctos en columnas, una fila por estación
+
+    Se usa desde el event loop (scrapes, carga de instantáneas y consultas),
+    así que no lleva bloqueos. Cada cambio incrementa `version`, que sirve
+    para invalidar los órdenes calculados y las respuestas precalculadas.
+    Con más de `max_filas` estaciones se descarta la de dato más antiguo.
+    """
+
+    def __init__(self, max_filas: int = 1000):
+        self.max_filas = max_filas
+        self.version = 0
+        self.consultas = 0
+        self._filas = {}
+        self._registros = []
+        self._columnas = {columna: array('d') for columna in COLUMNAS}
+        self._nombres = []
+        self._fragmentos = {campo: [] for campo in CAMPOS}
+        # (criterio, descendente) -> índices de las filas en ese orden
+        self._ordenes = {}
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._filas
+
+    def registro(self, slug: str):
+        """Último registro correcto de la estación, o None"""
+        i = self._filas.get(slug)
+        return self._registros[i] if i is not None else None
+
+    def actualizar(self, registro):
+        """Guarda el registro como último dato de su estación (los erróneos se ignoran)"""
+        if not registro.correcto:
+            return
+        i = self._filas.get(registro.slug)
+        if i is not None and self._registros[i] is registro:
+            return
+
+        datos = registro.a_dict()
+        if i is None:
+            if len(self._registros) >= self.max_filas:
+                self._quitar(min(range(len(self._registros)), key=lambda j: self._registros[j].timestamp))
+            i = self._filas[registro.slug] = len(self._registros)
+            self._registros.append(registro)
+            for columna, valor in zip(COLUMNAS, registro.valores()):
+                self._columnas[columna].append(valor)
+            self._nombres.append(normalizar(registro.nombre))
+            for campo in CAMPOS:
+                self._fragmentos[campo].append(_fragmento(campo, datos[campo]))
+        else:
+            self._registros[i] = registro
+            for columna, valor in zip(COLUMNAS, registro.valores()):
+                self._columnas[columna][i] = valor
+            self._nombres[i] = normalizar(registro.nombre)
+            for campo in CAMPOS:
+                self._fragmentos[campo][i] = _fragmento(campo, datos[campo])
+        self._cambiada()
+
+    def _quitar(self, i: int):
+        """Quita la fila i moviendo la última a su lugar"""
+        ultima = len(self._registros) - 1
+        del self._filas[self._registros[i].slug]
+        for lista in (self._registros, self._nombres, *self._columnas.values(), *self._fragmentos.values()):
+            lista[i] = lista[ultima]
+            lista.pop()
+        if i != ultima:
+            self._filas[self._registros[i].slug] = i
+        self._cambiada()
+
+    def _cambiada(self):
+        self.version += 1
+        self._ordenes.clear()
+
+    def _orden(self, criterio: str, descendente: bool) -> list:
+        """Índices de las filas ordenados por el criterio, sin dato al final"""
+        orden = self._ordenes.get((criterio, descendente))
+        if orden is None:
+            if criterio == 'nombre':
+                valores = self._nombres
+                orden = sorted(range(len(valores)), key=valores.__getitem__, reverse=descendente)
+            else:
+                valores = self._columnas[criterio]
+                # NaN (sin dato) no es comparable: esas filas se apartan y van al final
+                con_dato = [i for i in range(len(valores)) if not math.isnan(valores[i])]
+                con_dato.sort(key=valores.__getitem__, reverse=descendente)
+                orden = con_dato + [i for i in range(len(valores)) if math.isnan(valores[i])]
+            self._ordenes[(criterio, descendente)] = orden
+        return orden
+
+    def consultar(self, orden: str = None, minimos: dict = None, limite: int = None, slugs: list = None) -> tuple:
+        """Filas que cumplen los mínimos, en el orden pedido (por nombre si no hay)
+
+        `minimos` es {columna: valor mínimo}; las filas sin dato en una columna
+        con mínimo no lo cumplen. `slugs` limita la consulta a esas
+        estaciones. Devuelve (índices de las filas, hasta `limite`; número
+        total de filas que cumplen los mínimos).
+        """
+        self.consultas += 1
+        criterio, descendente = leer_orden(orden) if orden else ('nombre', False)
+        condiciones = [(self._columnas[columna], minimo) for columna, minimo in (minimos or {}).items()]
+        permitidas = None if slugs is None else {self._filas[slug] for slug in slugs if slug in self._filas}
+
+        seleccion = []
+        coincidencias = 0
+        for i in self._orden(criterio, descendente):
+            if permitidas is not None and i not in permitidas:
+                continue
+            for columna, minimo in condiciones:
+                if not columna[i] >= minimo:
+                    break
+            else:
+                coincidencias += 1
+                if limite is None or len(seleccion) < limite:
+                    seleccion.append(i)
+        return seleccion, coincidencias
+
+    def json_fila(self, i: int, campos: tuple = None) -> bytes:
+        """JSON de la fila i con los campos indicados (todos si es None)"""
+        if campos is None:
+            return self._registros[i].a_json()
+        return b'{' + b','.join(self._fragmentos[campo][i] for campo in campos) + b'}'
+
+    def ultima_actualizacion(self, filas: list) -> Optional[str]:
+        """La actualización más antigua de las filas indicadas"""
+        return min((self._registros[i].timestamp for i in filas), default=None)
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'estaciones': len(self._registros),
+            'max_estaciones': self.max_filas,
+            'version': self.version,
+            'consultas': self.consultas,
+            'ordenes_calculados': len(self._ordenes)
+        }
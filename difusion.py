@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Difusión de cambios de las estaciones a clientes suscritos (Server-Sent Events)
+
+Cada cambio se codifica una sola vez y se reparte a todos los suscriptores de
+la estación. Cada suscriptor tiene un buffer acotado: si un cliente lento lo
+llena se descartan sus eventos más antiguos y se le avisa con un evento
+`desfase` para que vuelva a pedir el estado completo.
+"""
+
+import asyncio
+import json
+from collections import deque
+
+# Campos que se comparan para detectar cambios
+CAMPOS_CAMBIO = ('remontes', 'kilometros', 'nieve')
+
+
+def calcular_cambios(anterior: dict, actual: dict) -> dict:
+    """Campos que han cambiado entre dos resultados (a_dict()): {campo: {'antes', 'ahora'}}"""
+    return {
+        campo: {'antes': anterior.get(campo), 'ahora': actual.get(campo)}
+        for campo in CAMPOS_CAMBIO
+        if anterior.get(campo) != actual.get(campo)
+    }
+
+
+class Suscripcion:
+    """Cola de eventos pendientes de un cliente"""
+
+    __slots__ = ('slugs', 'cola', 'aviso', 'descartados')
+
+    def __init__(self, slugs: frozenset, max_buffer: int):
+        self.slugs = slugs
+        self.cola = deque(maxlen=max_buffer)
+        self.aviso = asyncio.Event()
+        self.descartados = 0
+
+    def encolar(self, mensaje: bytes) -> bool:
+        """Añade un evento; devuelve False si se ha descartado otro por falta de sitio"""
+        lleno = len(self.cola) == self.cola.maxlen
+        if lleno:
+            self.descartados += 1
+        self.cola.append(mensaje)
+        self.aviso.set()
+        return not lleno
+
+
+class Difusor:
+    """Reparte los cambios de cada estación entre sus suscriptores"""
+
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self._por_slug = {}
+        self._globales = set()
+        self.suscriptores = 0
+        self.eventos_publicados = 0
+        self.mensajes_entregados = 0
+        self.mensajes_descartados = 0
+
+    def suscribir(self, slugs=None) -> Suscripcion:
+        """Crea una suscripción a las estaciones indicadas (todas si no se indica ninguna)"""
+        suscripcion = Suscripcion(frozenset(slugs or ()), self.max_buffer)
+        if suscripcion.slugs:
+            for slug in suscripcion.slugs:
+                self._por_slug.setdefault(slug, set()).add(suscripcion)
+        else:
+            self._globales.add(suscripcion)
+        self.suscriptores += 1
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        self.suscriptores -= 1
+        if not suscripcion.slugs:
+            self._globales.discard(suscripcion)
+            return
+        for slug in suscripcion.slugs:
+            subs = self._por_slug.get(slug)
+            if subs is not None:
+                subs.discard(suscripcion)
+                if not subs:
+                    del self._por_slug[slug]
+
+    def publicar(self, slug: str, cambios: dict, timestamp: str):
+        """Envía a los suscriptores de la estación los campos que han cambiado"""
+        destinos = self._por_slug.get(slug, ())
+        if not destinos and not self._globales:
+            return
+
+        evento = {'slug': slug, 'cambios': cambios, 'timestamp': timestamp}
+        mensaje = f"event: cambio\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n".encode('utf-8')
+        self.eventos_publicados += 1
+
+        for suscripcion in (*destinos, *self._globales):
+            if suscripcion.encolar(mensaje):
+                self.mensajes_entregados += 1
+            else:
+                self.mensajes_descartados += 1
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'suscriptores': self.suscriptores,
+            'eventos_publicados': self.eventos_publicados,
+            'mensajes_entregados': self.mensajes_entregados,
+            'mensajes_descartados': self.mensajes_descartados
+        }
+
+
+async def eventos_sse(difusor: Difusor, slugs, latido: float):
+    """Generador del flujo SSE de una suscripción a `slugs`
+
+    Envía los eventos pendientes en cuanto llegan y un comentario de latido
+    cada `latido` segundos para mantener viva la conexión. La suscripción se
+    crea al empezar a iterar y se cancela al terminar (p. ej. porque el
+    cliente se desconecta).
+    """
+    suscripcion = difusor.suscribir(slugs)
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                await asyncio.wait_for(suscripcion.aviso.wait(), timeout=latido)
+            except asyncio.TimeoutError:
+                yield b": latido\n\n"
+                continue
+
+            suscripcion.aviso.clear()
+            if suscripcion.descartados:
+                aviso = json.dumps({'descartados': suscripcion.descartados})
+                suscripcion.descartados = 0
+                yield f"event: desfase\ndata: {aviso}\n\n".encode('utf-8')
+            while suscripcion.cola:
+                yield suscripcion.cola.popleft()
+    finally:
+        difusor.cancelar(suscripcion)
@@ -59,7 +59,11 @@ def get_single_station(slug):
 # ============================================================
 
 def monitor_station(slug, interval_seconds=60):
-    """Monitorea una estación y notifica cambios"""
+    """Monitorea una estación y notifica cambios
+
+    Consulta la API en bucle; es preferible usar watch_station(), que recibe
+    los cambios por /stream sin hacer polling.
+    """
     
     import time
     
@@ -85,6 +89,22 @@ def monitor_station(slug, interval_seconds=60):
         
         time.sleep(interval_seconds)
 
+def watch_station(slug):
+    """Recibe los cambios de una estación en tiempo real (Server-Sent Events)"""
+    
+    with requests.get(f"{API_URL}/stream", params={"estaciones": slug}, stream=True) as response:
+        evento = None
+        for linea in response.iter_lines(decode_unicode=True):
+            if linea.startswith("event: "):
+                evento = linea[len("event: "):]
+            elif linea.startswith("data: ") and evento == "cambio":
+                data = json.loads(linea[len("data: "):])
+                for campo, cambio in data['cambios'].items():
+                    print(f"{datetime.now()} | {campo}: {cambio['antes']} → {cambio['ahora']}")
+            elif linea.startswith("data: ") and evento == "desfase":
+                print(f"{datetime.now()} | Se han perdido cambios, recargando estado...")
+                get_single_station(slug)
+
 # ============================================================
 # EJEMPLO 4: Comparar estaciones
 # ============================================================
@@ -119,22 +139,18 @@ def compare_stations(slugs):
 # ============================================================
 
 def find_best_snow():
-    """Encuentra la estación con más nieve"""
+    """Encuentra la estación con más nieve (la API ordena y filtra)"""
     
-    response = requests.get(f"{API_URL}/estaciones")
+    response = requests.get(f"{API_URL}/estaciones", params={
+        'orden': 'nieve',
+        'limite': 1,
+        'campos': 'nombre,nieve,remontes'
+    })
     data = response.json()
     
-    best = None
-    max_nieve = 0
-    
-    for estacion in data['estaciones']:
-        if estacion['estado'] == 'success':
-            nieve = int(estacion['nieve']['espesor'])
-            if nieve > max_nieve:
-                max_nieve = nieve
-                best = estacion
+    best = data['estaciones'][0] if data['estaciones'] else None
     
-    if best:
+    if best and best['nieve']:
         print(f"\n🏔️  MEJOR NIEVE: {best['nombre']}")
         print(f"   Nieve: {best['nieve']['espesor']} {best['nieve']['unidad']}")
         print(f"   Remontes: {best['remontes']['abiertos']}/{best['remontes']['total']}")
@@ -276,5 +292,6 @@ if __name__ == "__main__":
     print("\n\n" + "=" * 60)
     print("✓ Ejemplos completados")
     print("\nOtros ejemplos disponibles:")
-    print("  - monitor_station(): Monitorear cambios en tiempo real")
+    print("  - monitor_station(): Monitorear cambios consultando en bucle")
+    print("  - watch_station(): Recibir cambios en tiempo real (/stream)")
     print("  - get_discord_embed(): Formatear para Discord")
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Extracción de los datos de una estación a partir del HTML de infonieve.es
+
+Recorre el documento en streaming con html.parser (sin construir el árbol)
+y se detiene en cuanto tiene todos los campos. Reproduce el criterio del
+scraper original con BeautifulSoup: para cada <span> cuyo texto contiene la
+etiqueta del dato, se toman el primer <strong class="fuentemega"> y el
+primer <em> que contiene.
+
+Los campos se declaran en ESPECIFICACION. Todas las etiquetas se compilan al
+importar en una sola expresión regular, así que cada <span> se comprueba con
+una única búsqueda sea cual sea el número de campos.
+
+También se extrae de aquí el listado de estaciones del catálogo, para que
+html.parser solo se cargue en los procesos que descargan páginas.
+"""
+
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+from catalogo import EstacionCatalogo
+
+
+@dataclass(frozen=True, slots=True)
+class Campo:
+    """Regla de extracción de un campo
+
+    Lo aporta el <span> cuyo texto contiene alguna de las `etiquetas`, por
+    orden de preferencia: las siguientes a la primera son alternativas por si
+    la página cambia el texto y solo se usan si no aparece la principal. El
+    valor es `formato` con el texto del <strong> y el del <em> (sin los
+    caracteres de `quitar`).
+    """
+
+    nombre: str
+    etiquetas: tuple
+    formato: str = '{valor}/{em}'
+    quitar: str = '/'
+
+    def valor(self, strong: str, em: str) -> str:
+        for caracter in self.quitar:
+            em = em.replace(caracter, '')
+        return self.formato.format(valor=strong, em=em)
+
+
+class Especificacion:
+    """Campos que se extraen, con sus etiquetas compiladas
+
+    `version` identifica las reglas: hay que subirla al cambiarlas.
+    """
+
+    def __init__(self, version: int, campos: tuple):
+        self.version = version
+        self.campos = campos
+        self.nombres = tuple(campo.nombre for campo in campos)
+        # Etiqueta -> (índice del campo, preferencia dentro del campo)
+        self.etiquetas = {}
+        for i, campo in enumerate(campos):
+            for preferencia, etiqueta in enumerate(campo.etiquetas):
+                self.etiquetas.setdefault(etiqueta, (i, preferencia))
+        # Las más largas primero, para que una etiqueta no oculte a otra que la contiene
+        self.patron = re.compile('|'.join(
+            re.escape(etiqueta) for etiqueta in sorted(self.etiquetas, key=len, reverse=True)
+        ))
+
+
+# v1: las tres comprobaciones fijas del scraper original
+# v2: reglas declarativas con etiquetas alternativas
+ESPECIFICACION = Especificacion(version=2, campos=(
+    Campo('remontes', ('Remontes',)),
+    Campo('kilometros', ('Kilómetros', 'Kilometros')),
+    Campo('nieve', ('Nieve', 'Espesor'), formato='{valor} {em}', quitar=''),
+))
+
+
+class _Completo(Exception):
+    """Se lanza para cortar el parseo cuando ya se tienen todos los datos"""
+
+
+class _Marco:
+    """Estado de un <span> abierto"""
+
+    __slots__ = ('orden', 'texto', 'strong', 'em')
+
+    def __init__(self, orden: int):
+        self.orden = orden
+        self.texto = []
+        self.strong = None
+        self.em = None
+
+
+class _Captura:
+    """Texto de un <strong>/<em> que es el primero de alguno de los span abiertos"""
+
+    __slots__ = ('texto', 'profundidad', 'nivel')
+
+    def __init__(self, nivel: int):
+        self.texto = []
+        self.profundidad = 1
+        self.nivel = nivel
+
+
+class _ExtractorSpans(HTMLParser):
+    """Parser en streaming que evalúa cada <span> al cerrarse"""
+
+    def __init__(self, especificacion: Especificacion):
+        super().__init__(convert_charrefs=True)
+        self.especificacion = especificacion
+        self._pila = []
+        self._orden = 0
+        self._strong = None
+        self._em = None
+        # Índice del campo -> (preferencia de la etiqueta, orden del span, valor).
+        # Gana la etiqueta preferida y, como en el scraper original, entre
+        # varios span con la misma gana el último en orden de documento.
+        self.encontrados = {}
+        self._principales = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'span':
+            self._orden += 1
+            self._pila.append(_Marco(self._orden))
+        elif tag == 'strong':
+            if self._strong is not None:
+                self._strong.profundidad += 1
+                return
+            clases = next((valor for nombre, valor in attrs if nombre == 'class'), None) or ''
+            if 'fuentemega' not in clases.split():
+                return
+            destinos = [marco for marco in self._pila if marco.strong is None]
+            if destinos:
+                self._strong = _Captura(len(self._pila))
+                for marco in destinos:
+                    marco.strong = self._strong.texto
+        elif tag == 'em':
+            if self._em is not None:
+                self._em.profundidad += 1
+                return
+            destinos = [marco for marco in self._pila if marco.em is None]
+            if destinos:
+                self._em = _Captura(len(self._pila))
+                for marco in destinos:
+                    marco.em = self._em.texto
+
+    def handle_endtag(self, tag):
+        if tag == 'span':
+            if not self._pila:
+                return
+            # Un </span> cierra también los strong/em abiertos dentro de él
+            nivel = len(self._pila)
+            if self._strong is not None and self._strong.nivel >= nivel:
+                self._strong = None
+            if self._em is not None and self._em.nivel >= nivel:
+                self._em = None
+            self._evaluar(self._pila.pop())
+            # Sin span abiertos no puede haber otro que contenga a los ya vistos
+            # (si alguno se ha encontrado por una etiqueta alternativa se sigue
+            # buscando la principal)
+            if not self._pila and self._principales == len(self.especificacion.campos):
+                raise _Completo()
+        elif tag == 'strong' and self._strong is not None:
+            self._strong.profundidad -= 1
+            if self._strong.profundidad == 0:
+                self._strong = None
+        elif tag == 'em' and self._em is not None:
+            self._em.profundidad -= 1
+            if self._em.profundidad == 0:
+                self._em = None
+
+    def handle_data(self, data):
+        for marco in self._pila:
+            marco.texto.append(data)
+        if self._strong is not None:
+            self._strong.texto.append(data)
+        if self._em is not None:
+            self._em.texto.append(data)
+
+    def _evaluar(self, marco: _Marco):
+        if marco.strong is None or marco.em is None:
+            return
+        coincidencias = self.especificacion.patron.findall(''.join(marco.texto))
+        if not coincidencias:
+            return
+        # Como en el scraper original, el primer campo (en orden de la
+        # especificación) cuya etiqueta aparece en el texto del span
+        indice, preferencia = min(self.especificacion.etiquetas[etiqueta] for etiqueta in coincidencias)
+        previo = self.encontrados.get(indice)
+        if previo is not None and (previo[0], -previo[1]) < (preferencia, -marco.orden):
+            return
+
+        campo = self.especificacion.campos[indice]
+        valor = campo.valor(''.join(marco.strong).strip(), ''.join(marco.em).strip())
+        self.encontrados[indice] = (preferencia, marco.orden, valor)
+        if preferencia == 0 and (previo is None or previo[0] != 0):
+            self._principales += 1
+
+
+def decodificar(contenido: bytes) -> str:
+    """Decodifica el HTML descargado (UTF-8, o Windows-1252 si no lo es)"""
+    try:
+        return contenido.decode('utf-8')
+    except UnicodeDecodeError:
+        return contenido.decode('windows-1252', errors='replace')
+
+
+def extraer_datos(contenido: bytes, especificacion: Especificacion = ESPECIFICACION) -> dict:
+    """Extrae los campos de la especificación del HTML de una estación
+
+    Devuelve un dict con una clave por campo; los que no aparecen valen None.
+    """
+    parser = _ExtractorSpans(especificacion)
+    try:
+        parser.feed(decodificar(contenido))
+        parser.close()
+    except _Completo:
+        pass
+    return {nombre: (parser.encontrados[i][2] if i in parser.encontrados else None)
+            for i, nombre in enumerate(especificacion.nombres)}
+
+
+# Enlaces a la ficha de una estación: /estacion-esqui/<slug>/
+_ENLACE_ESTACION = re.compile(r'/estacion-esqui/([a-z0-9-]+)/?$')
+
+
+class _ExtractorListado(HTMLParser):
+    """Recorre el listado en streaming
+
+    Los elementos con clase `titulo-pais` y `titulo-region` fijan el país y la
+    región de los enlaces a estaciones que los siguen. Estas clases son las de
+    la copia de benchmarks/fixtures/catalogo, sin comprobar aún con la página
+    real (por eso CATALOGO_URL está vacío por defecto).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.estaciones = {}
+        self.pais = None
+        self.region = None
+        self._titulo = None
+        self._texto = None
+        self._slug = None
+        self._profundidad = 0
+
+    def handle_starttag(self, tag, attrs):
+        atributos = dict(attrs)
+        if self._texto is not None:
+            self._profundidad += 1
+            return
+
+        clases = (atributos.get('class') or '').split()
+        if 'titulo-pais' in clases or 'titulo-region' in clases:
+            self._titulo = 'pais' if 'titulo-pais' in clases else 'region'
+        elif tag == 'a':
+            coincidencia = _ENLACE_ESTACION.search(atributos.get('href') or '')
+            if coincidencia is None:
+                return
+            self._slug = coincidencia.group(1)
+        else:
+            return
+        self._texto = []
+        self._profundidad = 1
+
+    def handle_endtag(self, tag):
+        if self._texto is None:
+            return
+        self._profundidad -= 1
+        if self._profundidad:
+            return
+
+        texto = ' '.join(''.join(self._texto).split())
+        if self._titulo == 'pais':
+            self.pais, self.region = texto or None, None
+        elif self._titulo == 'region':
+            self.region = texto or None
+        elif self._slug not in self.estaciones:
+            self.estaciones[self._slug] = EstacionCatalogo(self._slug, texto or self._slug, self.region, self.pais)
+        self._titulo = self._texto = self._slug = None
+
+    def handle_data(self, data):
+        if self._texto is not None:
+            self._texto.append(data)
+
+
+def extraer_catalogo(contenido: bytes) -> list:
+    """Estaciones (EstacionCatalogo) del listado de infonieve.es, sin repetir slugs"""
+    parser = _ExtractorListado()
+    parser.feed(decodificar(contenido))
+    parser.close()
+    return list(parser.estaciones.values())
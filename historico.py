@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico de condiciones de las estaciones
+Serie temporal por estación guardada en columnas (array.array), con
+retención, compactación de los datos antiguos y consultas por rango
+mediante búsqueda binaria sobre los tiempos
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Columnas numéricas de cada punto, además del tiempo (epoch en segundos),
+# en el orden de RegistroEstacion.valores()
+COLUMNAS = ('remontes_abiertos', 'remontes_total', 'kilometros_abiertos', 'kilometros_total', 'nieve')
+
+# Columnas que se devuelven como enteros; en el resto los valores enteros
+# van como int y los demás como float, igual que en RegistroEstacion
+COLUMNAS_ENTERAS = ('remontes_abiertos', 'remontes_total')
+
+NAN = float('nan')
+
+
+class SerieEstacion:
+    """Puntos de una estación en columnas ordenadas por tiempo"""
+
+    __slots__ = ('tiempos', 'columnas', 'mantenida')
+
+    def __init__(self):
+        self.tiempos = array('d')
+        self.columnas = {columna: array('d') for columna in COLUMNAS}
+        self.mantenida = 0.0
+
+    def __len__(self) -> int:
+        return len(self.tiempos)
+
+    def agregar(self, tiempo: float, valores: tuple):
+        # Los puntos casi siempre llegan en orden; si no, se insertan en su sitio
+        if not self.tiempos or tiempo >= self.tiempos[-1]:
+            self.tiempos.append(tiempo)
+            for columna, valor in zip(COLUMNAS, valores):
+                self.columnas[columna].append(valor)
+        else:
+            i = bisect_right(self.tiempos, tiempo)
+            self.tiempos.insert(i, tiempo)
+            for columna, valor in zip(COLUMNAS, valores):
+                self.columnas[columna].insert(i, valor)
+
+    def recortar(self, hasta: int):
+        """Elimina los puntos anteriores a la posición `hasta`"""
+        del self.tiempos[:hasta]
+        for datos in self.columnas.values():
+            del datos[:hasta]
+
+    def indices_por_intervalo(self, inicio: int, fin: int, desde: float, resolucion: float) -> list:
+        """Índice del último punto de cada intervalo de `resolucion` segundos en [inicio, fin)"""
+        indices = []
+        i = inicio
+        while i < fin:
+            limite = desde + (math.floor((self.tiempos[i] - desde) / resolucion) + 1) * resolucion
+            siguiente = bisect_left(self.tiempos, limite, i, fin)
+            indices.append(siguiente - 1)
+            i = siguiente
+        return indices
+
+
+class Historico:
+    """Series de todas las estaciones con retención y compactación"""
+
+    def __init__(self, retencion: float, detalle: float, resolucion_antigua: float):
+        # Se conservan `retencion` segundos; los puntos más antiguos que
+        # `detalle` se compactan a uno por `resolucion_antigua` segundos
+        self.retencion = retencion
+        self.detalle = detalle
+        self.resolucion_antigua = resolucion_antigua
+        self._series = {}
+
+    def __len__(self) -> int:
+        return sum(len(serie) for serie in self._series.values())
+
+    def cargar(self, slug: str, filas: list, ahora: float):
+        """Carga de una vez los puntos persistidos de una estación
+
+        `filas` son tuplas (tiempo, *valores) ordenadas por tiempo.
+        """
+        serie = self._series[slug] = SerieEstacion()
+        serie.tiempos = array('d', (fila[0] for fila in filas))
+        for posicion, columna in enumerate(COLUMNAS, start=1):
+            serie.columnas[columna] = array('d', (NAN if fila[posicion] is None else fila[posicion] for fila in filas))
+        self._mantener(serie, ahora)
+
+    def registrar(self, slug: str, tiempo: float, valores: tuple):
+        """Añade un punto a la serie de una estación"""
+        serie = self._series.get(slug)
+        if serie is None:
+            serie = self._series[slug] = SerieEstacion()
+        serie.agregar(tiempo, valores)
+
+        # Mantenimiento como mucho una vez por hora y estación
+        if tiempo - serie.mantenida > 3600:
+            self._mantener(serie, tiempo)
+
+    def _mantener(self, serie: SerieEstacion, ahora: float):
+        serie.mantenida = ahora
+
+        # Retención
+        corte = bisect_left(serie.tiempos, ahora - self.retencion)
+        if corte:
+            serie.recortar(corte)
+
+        # Compactación: un punto (el último) por intervalo en la parte antigua
+        fin = bisect_left(serie.tiempos, ahora - self.detalle)
+        if fin < 2 or not self.resolucion_antigua:
+            return
+        origen = serie.tiempos[0] - serie.tiempos[0] % self.resolucion_antigua
+        indices = serie.indices_por_intervalo(0, fin, origen, self.resolucion_antigua)
+        if len(indices) == fin:
+            return
+
+        tiempos = array('d', (serie.tiempos[i] for i in indices))
+        tiempos.extend(serie.tiempos[fin:])
+        serie.tiempos = tiempos
+        for columna, datos in serie.columnas.items():
+            compactada = array('d', (datos[i] for i in indices))
+            compactada.extend(datos[fin:])
+            serie.columnas[columna] = compactada
+
+    def consultar(self, slug: str, desde: float = None, hasta: float = None, resolucion: float = None) -> dict:
+        """Puntos de una estación entre `desde` y `hasta` (epoch, inclusive)
+
+        Con `resolucion` (segundos) se devuelve solo el último punto de cada
+        intervalo. El resultado va en columnas: una lista por campo.
+        """
+        serie = self._series.get(slug)
+        resultado = {'tiempos': []}
+        resultado.update({columna: [] for columna in COLUMNAS})
+        if serie is None or not len(serie):
+            return resultado
+
+        inicio = 0 if desde is None else bisect_left(serie.tiempos, desde)
+        fin = len(serie) if hasta is None else bisect_right(serie.tiempos, hasta)
+        if inicio >= fin:
+            return resultado
+
+        if resolucion:
+            origen = desde if desde is not None else serie.tiempos[inicio]
+            indices = serie.indices_por_intervalo(inicio, fin, origen, resolucion)
+            resultado['tiempos'] = [int(serie.tiempos[i]) for i in indices]
+            for columna in COLUMNAS:
+                resultado[columna] = _a_lista(array('d', (serie.columnas[columna][i] for i in indices)), columna)
+        else:
+            resultado['tiempos'] = [int(t) for t in serie.tiempos[inicio:fin]]
+            for columna in COLUMNAS:
+                resultado[columna] = _a_lista(serie.columnas[columna][inicio:fin], columna)
+        return resultado
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        puntos = len(self)
+        return {
+            'estaciones': len(self._series),
+            'puntos': puntos,
+            'bytes': puntos * (len(COLUMNAS) + 1) * 8
+        }
+
+
+def _a_lista(datos: array, columna: str) -> list:
+    """Convierte una columna a lista JSON (NaN -> None, enteros donde toca)"""
+    if columna in COLUMNAS_ENTERAS:
+        return [None if v != v else int(v) for v in datos]
+    return [None if v != v else int(v) if v.is_integer() else v for v in datos]
+
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Huellas del bloque de datos de las páginas de estación
+Aunque el servidor no responda 304, la página suele ser la misma que la
+vez anterior, o solo cambia lo que rodea a los datos (previsión, anuncios,
+fechas). Se localiza el bloque de remontes, kilómetros y nieve con una
+búsqueda de bytes, se resume con blake2b y, si coincide con el de la última
+descarga de la estación, se reutiliza el registro de entonces sin parsear
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Los valores de los datos van en <strong class="fuentemega ...">. En el
+# <head> la clase aparece en la hoja de estilos, así que se busca en el <body>.
+_MARCA = b'fuentemega'
+# Bytes antes del primer valor y después del último que entran en el bloque
+# (la etiqueta del primer dato y la unidad, <em>, del último)
+_MARGEN = 256
+
+
+def huella(contenido: bytes) -> bytes:
+    """Resumen del bloque de datos de la página (de la página entera si no se encuentra)
+
+    El bloque va desde `_MARGEN` bytes antes del primer elemento con la
+    clase fuentemega hasta `_MARGEN` bytes después del último.
+    """
+    cuerpo = max(0, contenido.find(b'<body'))
+    primero = contenido.find(_MARCA, cuerpo)
+    if primero < 0:
+        return hashlib.blake2b(contenido, digest_size=16).digest()
+    ultimo = contenido.rfind(_MARCA)
+    return hashlib.blake2b(contenido[max(0, primero - _MARGEN):ultimo + _MARGEN], digest_size=16).digest()
+
+
+class HuellasPaginas:
+    """Última huella y registro parseado de cada estación (LRU)
+
+    Lleva también la cuenta de páginas comprobadas, las que no habían
+    cambiado y el tiempo medio de parseo, para estimar la CPU ahorrada.
+    """
+
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        self._huellas = OrderedDict()
+        self._lock = threading.Lock()
+        self.comprobadas = 0
+        self.sin_cambios = 0
+        self.segundos_huella = 0.0
+        self.parseos = 0
+        self.segundos_parseo = 0.0
+
+    def previo(self, slug: str, huella_actual: bytes, segundos: float):
+        """Registro anterior de la estación si su huella es la misma; si no, None"""
+        with self._lock:
+            self.comprobadas += 1
+            self.segundos_huella += segundos
+            guardada = self._huellas.get(slug)
+            if guardada is None or guardada[0] != huella_actual:
+                return None
+            self.sin_cambios += 1
+            self._huellas.move_to_end(slug)
+            return guardada[1]
+
+    def recordar(self, slug: str, huella_actual: bytes, registro, segundos_parseo: float = None):
+        """Guarda la huella y el registro de una estación (y el tiempo que costó parsearla)"""
+        with self._lock:
+            if segundos_parseo is not None:
+                self.parseos += 1
+                self.segundos_parseo += segundos_parseo
+            self._huellas[slug] = (huella_actual, registro)
+            self._huellas.move_to_end(slug)
+            while len(self._huellas) > self.max_entradas:
+                self._huellas.popitem(last=False)
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        with self._lock:
+            parseo_medio = self.segundos_parseo / self.parseos if self.parseos else None
+            return {
+                'comprobadas': self.comprobadas,
+                'sin_cambios': self.sin_cambios,
+                'ratio_sin_cambios': round(self.sin_cambios / self.comprobadas, 4) if self.comprobadas else None,
+                'parseo_medio_ms': round(parseo_medio * 1000, 3) if parseo_medio is not None else None,
+                'huella_media_ms': round(self.segundos_huella / self.comprobadas * 1000, 4) if self.comprobadas else None,
+                # Parseos evitados por su coste medio, menos lo que cuesta calcular las huellas
+                'cpu_ahorrada_ms': round((self.sin_cambios * parseo_medio - self.segundos_huella) * 1000, 1)
+                if parseo_medio is not None else None
+            }
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Logs estructurados de la API
+Cada mensaje lleva nivel y campos (slug, duración...) en texto clave=valor o
+en JSON. Los handlers solo encolan el registro y un hilo aparte lo formatea
+y lo escribe, de modo que loguear nunca bloquea el event loop
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime
+
+NOMBRE = 'esqui'
+
+# Atributos propios de logging.LogRecord; el resto son campos de `extra`
+_ATRIBUTOS_REGISTRO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def _campos(registro: logging.LogRecord) -> dict:
+    return {clave: valor for clave, valor in vars(registro).items() if clave not in _ATRIBUTOS_REGISTRO}
+
+
+class FormatoTexto(logging.Formatter):
+    """[fecha] NIVEL mensaje clave=valor ..."""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        linea = f"[{datetime.fromtimestamp(registro.created).isoformat()}] {registro.levelname} {registro.getMessage()}"
+        campos = ' '.join(f"{clave}={valor}" for clave, valor in _campos(registro).items())
+        if campos:
+            linea = f"{linea} {campos}"
+        if registro.exc_info:
+            linea = f"{linea}\n{self.formatException(registro.exc_info)}"
+        return linea
+
+
+class FormatoJSON(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        datos = {
+            'ts': datetime.fromtimestamp(registro.created).isoformat(),
+            'nivel': registro.levelname,
+            'mensaje': registro.getMessage(),
+            **_campos(registro)
+        }
+        if registro.exc_info:
+            datos['excepcion'] = self.formatException(registro.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _ManejadorCola(logging.handlers.QueueHandler):
+    """Encola el registro tal cual: el mensaje se formatea en el hilo de logs"""
+
+    def prepare(self, registro: logging.LogRecord) -> logging.LogRecord:
+        return registro
+
+
+def configurar_logs(nivel: str = 'INFO', formato: str = 'texto'):
+    """Configura el logger de la API y arranca el hilo que escribe los logs
+
+    `nivel` es un nivel de logging (DEBUG, INFO, WARNING...) u 'off' para
+    desactivarlos. Devuelve el QueueListener (hay que pararlo al terminar)
+    o None si están desactivados.
+    """
+    logger = logging.getLogger(NOMBRE)
+    logger.handlers.clear()
+    logger.propagate = False
+    if nivel.lower() == 'off':
+        logger.disabled = True
+        return None
+
+    logger.disabled = False
+    logger.setLevel(nivel.upper())
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(FormatoJSON() if formato == 'json' else FormatoTexto())
+
+    cola = queue.SimpleQueue()
+    logger.addHandler(_ManejadorCola(cola))
+    oyente = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    oyente.start()
+    return oyente
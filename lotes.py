@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Lotes de estaciones servidos a medida que terminan (POST /estaciones/lote)
+
+Un número fijo de trabajadores va tomando slugs de la lista y deja cada
+resultado en una cola acotada de la que lee la respuesta. Así no hay más de
+`concurrencia` estaciones en curso ni resultados esperando en memoria, sea
+cual sea el tamaño del lote, y si el cliente lee despacio los trabajadores
+esperan en lugar de acumular.
+"""
+
+import asyncio
+
+
+async def resultados_lote(slugs: list, obtener, concurrencia: int, plazo: float):
+    """Genera (slug, registro) según va terminando cada estación
+
+    `obtener(slug)` es una corrutina que devuelve el registro. Las estaciones
+    que no terminan dentro de `plazo` segundos (desde el principio del lote)
+    se generan al final con registro None. Los scrapes que se cortan así no
+    se cancelan: los que usan scrape_compartido terminan y quedan en caché.
+    """
+    pendientes = iter(slugs)
+    cola = asyncio.Queue(maxsize=concurrencia)
+    # Slug que está obteniendo cada trabajador (None si ninguno)
+    actuales = [None] * concurrencia
+
+    async def trabajador(k: int):
+        for slug in pendientes:
+            actuales[k] = slug
+            registro = await obtener(slug)
+            await cola.put((slug, registro))
+            actuales[k] = None
+
+    bucle = asyncio.get_running_loop()
+    fin = bucle.time() + plazo
+    trabajadores = [asyncio.create_task(trabajador(k)) for k in range(min(concurrencia, len(slugs)))]
+    entregados = 0
+    try:
+        while entregados < len(slugs):
+            if cola.empty():
+                try:
+                    resultado = await asyncio.wait_for(cola.get(), fin - bucle.time())
+                except asyncio.TimeoutError:
+                    break
+            else:
+                resultado = cola.get_nowait()
+            entregados += 1
+            yield resultado
+    finally:
+        for tarea in trabajadores:
+            tarea.cancel()
+        await asyncio.gather(*trabajadores, return_exceptions=True)
+
+    # Fuera de plazo: primero lo que ya había terminado, luego el resto sin registro
+    while not cola.empty():
+        yield cola.get_nowait()
+    for slug in actuales:
+        if slug is not None:
+            yield slug, None
+    for slug in pendientes:
+        yield slug, None
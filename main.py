@@ -6,111 +6,1055 @@ Desplegado en Railway
 """
 
 import os
-from fastapi import FastAPI
+import asyncio
+import logging
+import random
+import time
+from contextlib import aclosing, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from dataclasses import asdict
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlsplit
 import json
 
-# Configuración
-app = FastAPI(title="Esqui Scraping API", version="1.0.0")
+from admision import ControlAdmision, Saturado
+from almacen import AlmacenInstantaneas
+from cache import crear_cache
+from catalogo import Catalogo
+from consultas import TablaEstaciones, leer_campos, leer_orden
+from cliente_http import ClienteInfonieve, LatenciasRecientes, es_reintentable
+from difusion import Difusor, calcular_cambios, eventos_sse
+from historico import COLUMNAS as COLUMNAS_HISTORICO, Historico
+from huellas import HuellasPaginas, huella
+from lotes import resultados_lote
+from logs import NOMBRE as NOMBRE_LOGGER, configurar_logs
+from metricas import TIPO_CONTENIDO, EtiquetasAcotadas, Metricas, MiddlewareMetricas, endpoint_actual
+from modelos import RegistroEstacion
+from proteccion import OrigenNoDisponible, ProteccionHost
+from respuestas import CacheRespuestas
+# El scraping (requests, extractor con html.parser y el pool de parseo) se
+# importa dentro de las funciones que lo usan: no retrasa el arranque y en
+# modo solo lectura no se llega a cargar
 
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Modo solo lectura: sirve lo que hay en el almacén o en la caché compartida
+# (la que escribe otra instancia) sin scrapear, ni refrescar, ni descargar
+# el catálogo; una estación sin datos responde con error. Con la caché en
+# memoria relee el almacén cada INTERVALO_RECARGA segundos para servir lo que
+# va guardando la instancia que scrapea
+SOLO_LECTURA = os.getenv("SOLO_LECTURA", "0") == "1"
+INTERVALO_RECARGA = float(os.getenv("INTERVALO_RECARGA", 60))
 
-# Variables globales
-ultima_actualizacion = None
+# Logs: nivel (DEBUG, INFO, WARNING... u 'off') y formato ('texto' o 'json').
+# Con INFO no se escribe nada por cada petición ni por cada scrape.
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO")
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto")
+log = logging.getLogger(NOMBRE_LOGGER)
 
 # URL base para construir las URLs de las estaciones
-BASE_URL = 'https://www.infonieve.es/estacion-esqui/'
+BASE_URL = os.getenv('INFONIEVE_BASE_URL', 'https://www.infonieve.es/estacion-esqui/')
+
+# Límites del scraping multi-estación
+MAX_CONCURRENCIA = int(os.getenv("MAX_CONCURRENCIA", 8))
+TIMEOUT_ESTACION = float(os.getenv("TIMEOUT_ESTACION", 15))
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 16))
+
+# Lotes (POST /estaciones/lote): estaciones por lote y plazo total por
+# defecto y máximo (segundos). La concurrencia de un lote no pasa de MAX_CONCURRENCIA.
+LOTE_MAX_ESTACIONES = int(os.getenv("LOTE_MAX_ESTACIONES", 1000))
+LOTE_PLAZO = float(os.getenv("LOTE_PLAZO", 60))
+
+# Estaciones por defecto de /estaciones
+ESTACIONES_POR_DEFECTO = ['sierra-nevada', 'baqueira-beret', 'formigal', 'candanchu', 'jaca-astun']
+
+# Refresco programado: estaciones vigiladas, intervalo y jitter (segundos)
+ESTACIONES_VIGILADAS = [
+    slug.strip()
+    for slug in os.getenv("ESTACIONES_VIGILADAS", ','.join(ESTACIONES_POR_DEFECTO)).split(',')
+    if slug.strip()
+]
+INTERVALO_REFRESCO = float(os.getenv("INTERVALO_REFRESCO", 1800))
+JITTER_REFRESCO = float(os.getenv("JITTER_REFRESCO", 60))
+CONCURRENCIA_REFRESCO = int(os.getenv("CONCURRENCIA_REFRESCO", 4))
+
+# Catálogo de estaciones: el listado de CATALOGO_URL se descarga cada
+# CATALOGO_INTERVALO segundos y se guarda en CATALOGO_RUTA. Un listado con
+# menos de CATALOGO_MIN_ESTACIONES estaciones, o con menos de la mitad que el
+# anterior, se descarta. Con el catálogo cargado, los slugs que no están en él
+# se rechazan sin ir a la red (salvo con CATALOGO_RECHAZAR=0).
+# Por defecto CATALOGO_URL está vacío: no hay catálogo y se acepta cualquier
+# slug. El extractor del listado (extractor.extraer_catalogo) se ha hecho
+# sobre una copia de prueba; hay que comprobarlo con la página real antes
+# de configurar la URL.
+CATALOGO_URL = os.getenv("CATALOGO_URL", "")
+CATALOGO_RUTA = os.getenv("CATALOGO_RUTA", "datos/catalogo.json")
+CATALOGO_INTERVALO = float(os.getenv("CATALOGO_INTERVALO", 86400))
+CATALOGO_MIN_ESTACIONES = int(os.getenv("CATALOGO_MIN_ESTACIONES", 20))
+CATALOGO_RECHAZAR = os.getenv("CATALOGO_RECHAZAR", "1") == "1"
+catalogo = Catalogo(CATALOGO_RUTA or None)
+slugs_rechazados = 0
+
+# Cliente HTTP compartido (conexiones keep-alive reutilizadas entre scrapes)
+POOL_HTTP = int(os.getenv("POOL_HTTP", SCRAPE_WORKERS))
+
+# Protección de infonieve.es: peticiones por segundo (se reducen solas si el
+# origen falla), ráfaga y cola máxima de espera; el circuito se abre tras
+# FALLOS_CIRCUITO fallos seguidos y prueba de nuevo tras ESPERA_CIRCUITO
+# segundos, doblando la espera en cada prueba fallida hasta ESPERA_CIRCUITO_MAX
+LIMITE_PETICIONES = float(os.getenv("LIMITE_PETICIONES", 5))
+RAFAGA_PETICIONES = float(os.getenv("RAFAGA_PETICIONES", 10))
+COLA_PETICIONES = int(os.getenv("COLA_PETICIONES", 200))
+FALLOS_CIRCUITO = int(os.getenv("FALLOS_CIRCUITO", 5))
+ESPERA_CIRCUITO = float(os.getenv("ESPERA_CIRCUITO", 30))
+ESPERA_CIRCUITO_MAX = float(os.getenv("ESPERA_CIRCUITO_MAX", 600))
+_protecciones = {}
+
+# Pool acotado donde se ejecuta el scraping bloqueante (descarga + parseo),
+# para que las esperas de red nunca bloqueen el event loop de uvicorn
+_executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix="scrape")
+# Pool aparte para la E/S de la caché compartida, el almacén y el catálogo
+# guardado: con el de scraping lleno, una lectura de la caché no espera a que
+# terminen descargas lentas. Las operaciones de cada fichero SQLite van por
+# una única conexión, así que no hacen falta más hilos
+_executor_io = ThreadPoolExecutor(max_workers=2, thread_name_prefix="io")
+
+# Procesos para el parseo del HTML (0 = se parsea en los hilos de scraping).
+# Con varios núcleos evita que la extracción quede serializada por el GIL.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 0))
+pool_parseo = None
+
+# Caché de estaciones (por defecto 30 minutos, como las actualizaciones de infonieve)
+CACHE_TTL = float(os.getenv("CACHE_TTL", 1800))
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", 256))
+# Backend: 'memoria' (propia de cada proceso) o 'sqlite' (compartida en
+# CACHE_RUTA entre workers y réplicas, que así scrapean cada estación una vez)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_RUTA = os.getenv("CACHE_RUTA", "datos/cache.db")
+# Con caché compartida, cada CACHE_SONDEO segundos se leen los registros que
+# han guardado otros procesos para difundir sus cambios en /stream y añadirlos
+# al histórico de este
+CACHE_SONDEO = float(os.getenv("CACHE_SONDEO", 2))
+cache = crear_cache(CACHE_BACKEND, ttl=CACHE_TTL, max_entradas=CACHE_MAX_ENTRADAS, ruta=CACHE_RUTA)
+# Último dato correcto de cada estación en columnas, para las consultas de
+# /estaciones (orden, mínimos, límite y campos), que no scrapean
+tabla = TablaEstaciones(max_filas=CACHE_MAX_ENTRADAS)
+
+# Plazos de cada descarga: conectar y esperar datos (el total por estación es TIMEOUT_ESTACION)
+TIMEOUT_CONEXION = float(os.getenv("TIMEOUT_CONEXION", 3.05))
+TIMEOUT_LECTURA = float(os.getenv("TIMEOUT_LECTURA", 10))
+cliente = ClienteInfonieve(pool_size=POOL_HTTP, timeout=(TIMEOUT_CONEXION, TIMEOUT_LECTURA),
+                           max_validadores=CACHE_MAX_ENTRADAS)
+# Huella del bloque de datos de la última página descargada de cada estación:
+# si el servidor no responde 304 pero los datos son los mismos, no se parsea
+huellas = HuellasPaginas(max_entradas=CACHE_MAX_ENTRADAS)
+
+# Reintentos de fallos transitorios con espera exponencial y jitter (segundos)
+REINTENTOS = int(os.getenv("REINTENTOS", 2))
+BACKOFF_BASE = float(os.getenv("BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("BACKOFF_MAX", 4))
+
+# Cobertura (hedging): segundo intento si el primero supera este percentil de
+# la latencia de las descargas recientes (0 = desactivada)
+COBERTURA_PERCENTIL = float(os.getenv("COBERTURA_PERCENTIL", 95))
+latencias_descarga = LatenciasRecientes(ventana=200, min_muestras=20)
+
+# Reintentos y coberturas por estación
+contadores_scrape = {}
+
+# Refrescos en segundo plano de entradas caducadas (uno por slug como máximo)
+_refrescos_en_curso = {}
+
+# Scrapes en vuelo por slug: las peticiones concurrentes del mismo slug
+# esperan al mismo scrape en lugar de lanzar uno nuevo
+_scrapes_en_vuelo = {}
+peticiones_coalescidas = 0
+# Esperas de hueco en el control de admisión por (slug, forzar): las
+# peticiones del mismo slug que llegan mientras otra espera se unen a esa espera
+_admisiones_pendientes = {}
+
+# Scrapes que otro proceso tenía en curso y cuyo resultado se ha esperado
+esperas_compartidas = 0
+
+# Control de admisión de los scrapes que piden las peticiones: como mucho
+# ADMISION_MAX_SCRAPES en curso y ADMISION_COLA esperando hueco, cada uno
+# hasta ADMISION_ESPERA segundos. Sin sitio se sirve el último dato de la
+# estación aunque esté caducado y, si no lo hay, /estacion/{slug} responde
+# 503 con Retry-After (en /estaciones, los lotes y POST /refresh, error en
+# esa estación). El refresco programado no pasa por aquí.
+ADMISION_MAX_SCRAPES = int(os.getenv("ADMISION_MAX_SCRAPES", SCRAPE_WORKERS))
+ADMISION_COLA = int(os.getenv("ADMISION_COLA", 64))
+ADMISION_ESPERA = float(os.getenv("ADMISION_ESPERA", 5))
+admision = ControlAdmision(ADMISION_MAX_SCRAPES, ADMISION_COLA, ADMISION_ESPERA)
+# Peticiones servidas con el último dato por no haber sitio para scrapear, y
+# refrescos de entradas caducadas que no se han hecho por lo mismo
+servidas_sin_admision = 0
+refrescos_sin_admision = 0
+
+# Lotes servidos por POST /estaciones/lote
+estadisticas_lotes = {'atendidos': 0, 'en_curso': 0, 'estaciones': 0, 'fuera_de_plazo': 0}
+
+# Último scrape correcto de cada estación (ISO 8601)
+ultimo_exito = {}
+
+# Almacén persistente (SQLite) para arrancar en caliente tras un reinicio.
+# Los resultados se acumulan en memoria y se escriben por lotes en segundo plano.
+ALMACEN_RUTA = os.getenv("ALMACEN_RUTA", "datos/estaciones.db")
+INTERVALO_GUARDADO = float(os.getenv("INTERVALO_GUARDADO", 5))
+almacen = None
+instantaneas_cargadas = 0
+_pendientes_guardar = {}
+
+# Histórico de cada estación: se guardan HISTORICO_RETENCION_DIAS días y los
+# puntos con más de HISTORICO_DETALLE_DIAS se compactan a uno por hora
+HISTORICO_RETENCION_DIAS = float(os.getenv("HISTORICO_RETENCION_DIAS", 180))
+HISTORICO_DETALLE_DIAS = float(os.getenv("HISTORICO_DETALLE_DIAS", 7))
+historico = Historico(
+    retencion=HISTORICO_RETENCION_DIAS * 86400,
+    detalle=HISTORICO_DETALLE_DIAS * 86400,
+    resolucion_antigua=3600
+)
+_pendientes_historico = []
 
-def scrape_estacion(slug: str) -> dict:
-    """Extrae datos de una estación de esquí"""
+# Flujo de cambios (SSE): eventos por suscriptor en buffer y segundos entre latidos
+STREAM_BUFFER = int(os.getenv("STREAM_BUFFER", 64))
+STREAM_LATIDO = float(os.getenv("STREAM_LATIDO", 15))
+difusor = Difusor(max_buffer=STREAM_BUFFER)
+
+# Cuerpos JSON ya codificados y comprimidos de /estaciones y /estacion/{slug},
+# uno por conjunto de slugs, que se regeneran solo cuando cambia algún registro
+RESPUESTAS_MAX_ENTRADAS = int(os.getenv("RESPUESTAS_MAX_ENTRADAS", 64))
+respuestas = CacheRespuestas(max_entradas=RESPUESTAS_MAX_ENTRADAS)
+
+# Métricas de /metrics, por endpoint y slug. Como se acepta cualquier slug,
+# a partir de METRICAS_MAX_SLUGS distintos los nuevos se agrupan en "otros".
+# Los scrapes del refresco programado llevan el endpoint "refresco_programado".
+METRICAS_MAX_SLUGS = int(os.getenv("METRICAS_MAX_SLUGS", 500))
+etiqueta_slug = EtiquetasAcotadas(METRICAS_MAX_SLUGS)
+metricas = Metricas(prefijo='esqui_')
+_ETIQUETAS = ('endpoint', 'slug')
+duracion_descarga = metricas.histograma(
+    'descarga_segundos', 'Descarga de la página de una estación', _ETIQUETAS)
+duracion_parseo = metricas.histograma(
+    'parseo_segundos', 'Parseo del HTML hasta obtener los textos de remontes, km y nieve', _ETIQUETAS)
+duracion_extraccion = metricas.histograma(
+    'extraccion_segundos', 'Conversión de los textos extraídos en el registro tipado', _ETIQUETAS)
+duracion_serializacion = metricas.histograma(
+    'serializacion_segundos', 'Codificación y compresión del cuerpo de una respuesta', _ETIQUETAS)
+duracion_peticion = metricas.histograma(
+    'peticion_segundos', 'Latencia de las peticiones a la API hasta enviar la respuesta', _ETIQUETAS)
+errores_scrape = metricas.contador(
+    'errores_total', 'Scrapes fallidos por tipo de error', ('tipo',) + _ETIQUETAS)
+metricas.calculada(
+    'cache_consultas_total', 'Consultas a la caché de estaciones por resultado', 'counter', ('resultado',),
+    lambda: {('hit',): cache.hits, ('stale',): cache.stale, ('miss',): cache.misses})
+metricas.calculada(
+    'descarga_bytes_total', 'Bytes descargados de infonieve.es (en el cable y descomprimidos)', 'counter', ('tipo',),
+    lambda: {('cable',): cliente.bytes_descargados, ('descomprimidos',): cliente.bytes_descomprimidos})
+metricas.calculada(
+    'descarga_peticiones_total', 'Peticiones hechas a infonieve.es (304 = página sin cambios)', 'counter',
+    ('resultado',),
+    lambda: {('completa',): cliente.peticiones - cliente.respuestas_304, ('304',): cliente.respuestas_304})
+metricas.calculada(
+    'paginas_sin_cambios_total', 'Páginas descargadas con el bloque de datos sin cambios (no se parsean)', 'counter',
+    (), lambda: {(): huellas.sin_cambios})
+metricas.calculada(
+    'slugs_rechazados_total', 'Slugs rechazados sin ir a la red por no estar en el catálogo', 'counter', (),
+    lambda: {(): slugs_rechazados})
+metricas.calculada(
+    'scrapes_en_vuelo', 'Scrapes en curso', 'gauge', (), lambda: {(): len(_scrapes_en_vuelo)})
+metricas.calculada(
+    'admision_cola', 'Scrapes esperando hueco en el control de admisión', 'gauge', (),
+    lambda: {(): admision.en_cola})
+metricas.calculada(
+    'admision_rechazos_total', 'Scrapes no admitidos (sin hueco ni sitio en la cola)', 'counter', (),
+    lambda: {(): admision.rechazadas})
+metricas.calculada(
+    'circuito_abierto', 'Circuito del host abierto (1) o no (0)', 'gauge', ('host',),
+    lambda: {(host,): int(p.circuito.estado != 'cerrado') for host, p in _protecciones.items()})
+
+def _etiquetas_metricas(slug: str) -> tuple:
+    """(endpoint, slug) con los que se etiquetan las métricas de un scrape"""
+    return endpoint_actual('refresco_programado'), etiqueta_slug(slug)
+
+def _tipo_error(error: Exception) -> str:
+    """Tipo de error para la métrica errores_total"""
+    import requests
+
+    if isinstance(error, OrigenNoDisponible):
+        return 'origen'
+    if isinstance(error, requests.exceptions.HTTPError):
+        return 'http'
+    if isinstance(error, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.RequestException):
+        return 'conexion'
+    return 'interno'
+
+def _error_estacion(slug: str, mensaje: str) -> RegistroEstacion:
+    """Construye el registro de error de una estación"""
+    return RegistroEstacion.con_error(slug, mensaje, datetime.now().isoformat())
+
+def slug_conocido(slug: str) -> bool:
+    """True si se puede scrapear el slug
+    
+    Sin catálogo cargado (o con CATALOGO_RECHAZAR=0) se acepta cualquiera. Con
+    catálogo se aceptan sus estaciones, las configuradas y las que ya se han
+    scrapeado bien alguna vez, que pueden no aparecer en el listado.
+    """
+    if not CATALOGO_RECHAZAR or not catalogo.cargado or slug in catalogo:
+        return True
+    return slug in ESTACIONES_VIGILADAS or slug in ESTACIONES_POR_DEFECTO or slug in ultimo_exito
+
+def _estacion_desconocida(slug: str) -> RegistroEstacion:
+    """Registro de error de un slug que no está en el catálogo"""
+    global slugs_rechazados
+    slugs_rechazados += 1
+    return _error_estacion(slug, f'Estación desconocida: {slug} (ver /buscar)')
+
+def proteccion_para(url: str) -> ProteccionHost:
+    """Limitador y circuito del host de una URL"""
+    host = urlsplit(url).netloc
+    proteccion = _protecciones.get(host)
+    if proteccion is None:
+        proteccion = _protecciones[host] = ProteccionHost(
+            host, tasa=LIMITE_PETICIONES, rafaga=RAFAGA_PETICIONES, max_cola=COLA_PETICIONES,
+            max_fallos=FALLOS_CIRCUITO, espera=ESPERA_CIRCUITO, espera_max=ESPERA_CIRCUITO_MAX
+        )
+    return proteccion
+
+def _es_fallo_origen(error: 'requests.exceptions.RequestException') -> bool:
+    """Errores que indican que el origen no está sano (y no, p. ej., un 404)"""
+    import requests
+
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+def scrape_estacion(slug: str, etiquetas: tuple = ('', '')) -> RegistroEstacion:
+    """Descarga y extrae los datos de una estación de esquí (un solo intento)
+    
+    Si la descarga falla se informa al circuito del host y se relanza la
+    excepción. `etiquetas` son el endpoint y el slug de las métricas.
+    """
+    import requests
+    from extractor import extraer_datos
     
     # Construir la URL completa
     url = f"{BASE_URL}{slug}/"
+    proteccion = proteccion_para(url)
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    inicio = time.perf_counter()
+    try:
+        contenido, validadores, previo = cliente.descargar(slug, url)
+    except requests.exceptions.RequestException as e:
+        if _es_fallo_origen(e):
+            proteccion.registrar_fallo()
+        else:
+            proteccion.registrar_exito()
+        raise
+    proteccion.registrar_exito()
+    duracion = time.perf_counter() - inicio
+    latencias_descarga.registrar(duracion)
+    duracion_descarga.observar(duracion, *etiquetas)
+    
+    # Página sin cambios (304): se reutiliza el último resultado parseado
+    if contenido is None:
+        return previo.con_timestamp(datetime.now().isoformat())
+    
+    # Página descargada con el mismo bloque de datos que la última vez: tampoco se parsea
+    inicio = time.perf_counter()
+    huella_actual = huella(contenido)
+    previo = huellas.previo(slug, huella_actual, time.perf_counter() - inicio)
+    if previo is not None:
+        registro = previo.con_timestamp(datetime.now().isoformat())
+        cliente.recordar(slug, validadores, registro)
+        return registro
+    
+    inicio = time.perf_counter()
+    extraidos = pool_parseo.extraer(contenido) if pool_parseo is not None else extraer_datos(contenido)
+    parseado = time.perf_counter()
+    registro = RegistroEstacion.desde_extraccion(slug, extraidos, datetime.now().isoformat())
+    fin = time.perf_counter()
+    duracion_parseo.observar(parseado - inicio, *etiquetas)
+    duracion_extraccion.observar(fin - parseado, *etiquetas)
+    huellas.recordar(slug, huella_actual, registro, fin - inicio)
+    
+    # Página descargada pero sin ninguno de los datos: probablemente ha cambiado el HTML
+    if not any(extraidos.values()):
+        errores_scrape.inc('parseo', *etiquetas)
+        log.warning("Página sin datos de remontes, km ni nieve", extra={'slug': slug})
+    
+    cliente.recordar(slug, validadores, registro)
+    return registro
+
+def _contar(slug: str, contador: str):
+    """Suma uno a un contador de reintentos / coberturas de la estación"""
+    contadores = contadores_scrape.get(slug)
+    if contadores is None:
+        contadores = contadores_scrape[slug] = {'reintentos': 0, 'coberturas': 0, 'coberturas_ganadas': 0}
+    contadores[contador] += 1
+
+async def _intento(slug: str, proteccion: ProteccionHost) -> RegistroEstacion:
+    """Un intento de scrape con turno del limitador, en el pool de hilos
+    
+    Con el circuito abierto se falla al instante, sin esperar ni descargar.
+    """
+    if not proteccion.circuito.permitir():
+        raise OrigenNoDisponible(
+            f'{proteccion.host} no disponible (circuito abierto, '
+            f'reintento en {proteccion.circuito.segundos_para_reintento:.0f} s)'
+        )
+    if not await proteccion.limitador.adquirir():
+        raise OrigenNoDisponible(f'Demasiadas peticiones pendientes hacia {proteccion.host}')
     
+    log.debug("Scrapeando estación", extra={'slug': slug})
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, scrape_estacion, slug, _etiquetas_metricas(slug))
+
+async def _intento_cubierto(slug: str, proteccion: ProteccionHost) -> RegistroEstacion:
+    """Intento con cobertura: si tarda más que el percentil COBERTURA_PERCENTIL
+    de las descargas recientes se lanza un segundo intento y gana el primero
+    que termine bien
+    """
+    umbral = latencias_descarga.percentil(COBERTURA_PERCENTIL) if COBERTURA_PERCENTIL else None
+    primero = asyncio.ensure_future(_intento(slug, proteccion))
+    if umbral is None:
+        return await primero
+    
+    tareas = [primero]
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        hechas, _ = await asyncio.wait(tareas, timeout=umbral)
+        if not hechas:
+            _contar(slug, 'coberturas')
+            tareas.append(asyncio.ensure_future(_intento(slug, proteccion)))
         
-        datos = {
-            'slug': slug,
-            'nombre': slug.replace('-', ' ').title(),
-            'remontes': None,
-            'kilometros': None,
-            'nieve': None,
-            'timestamp': datetime.now().isoformat(),
-            'estado': 'success'
-        }
-        
-        # Extraer datos usando el método que funciona (buscar en todos los spans)
-        spans = soup.find_all('span')
-        
-        for span in spans:
-            # Buscar remontes
-            if 'Remontes' in span.text:
-                strong = span.find('strong', class_='fuentemega')
-                em = span.find('em')
-                if strong and em:
-                    valor = strong.text.strip()
-                    max_val = em.text.strip().replace('/', '')
-                    datos['remontes'] = f"{valor}/{max_val}"
-            
-            # Buscar kilómetros
-            elif 'Kilómetros' in span.text:
-                strong = span.find('strong', class_='fuentemega')
-                em = span.find('em')
-                if strong and em:
-                    valor = strong.text.strip()
-                    max_val = em.text.strip().replace('/', '')
-                    datos['kilometros'] = f"{valor}/{max_val}"
-            
-            # Buscar nieve
-            elif 'Nieve' in span.text:
-                strong = span.find('strong', class_='fuentemega')
-                em = span.find('em')
-                if strong and em:
-                    valor = strong.text.strip()
-                    unidad = em.text.strip()
-                    datos['nieve'] = f"{valor} {unidad}"
-        
-        return datos
+        pendientes = set(tareas)
+        while pendientes:
+            hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in hechas:
+                if tarea.exception() is None:
+                    if tarea is not primero:
+                        _contar(slug, 'coberturas_ganadas')
+                    return tarea.result()
+        # Han fallado todos: cuenta el error del primer intento
+        return primero.result()
+    finally:
+        for tarea in tareas:
+            if tarea.done():
+                tarea.cancelled() or tarea.exception()
+            else:
+                tarea.cancel()
+
+def _fallo_scrape(slug: str, error: Exception, mensaje: str) -> RegistroEstacion:
+    """Cuenta y loguea un scrape fallido y construye su registro de error"""
+    tipo = _tipo_error(error)
+    errores_scrape.inc(tipo, *_etiquetas_metricas(slug))
+    log.warning("Scrape fallido", extra={'slug': slug, 'tipo': tipo, 'error': mensaje})
+    return _error_estacion(slug, mensaje)
+
+async def _scrape_con_reintentos(slug: str) -> RegistroEstacion:
+    """Scrapea una estación reintentando los fallos transitorios
+    
+    Solo se reintentan 5xx y errores de conexión, hasta REINTENTOS veces, con
+    esperas exponenciales con jitter (BACKOFF_BASE * 2^n, como mucho BACKOFF_MAX).
+    """
+    import requests
+
+    proteccion = proteccion_para(f"{BASE_URL}{slug}/")
+    intento = 0
+    while True:
+        try:
+            return await _intento_cubierto(slug, proteccion)
+        except requests.exceptions.RequestException as e:
+            if intento >= REINTENTOS or not es_reintentable(e):
+                return _fallo_scrape(slug, e, f'Error de conexión: {str(e)}')
+        except OrigenNoDisponible as e:
+            return _fallo_scrape(slug, e, str(e))
+        except Exception as e:
+            return _fallo_scrape(slug, e, f'Error: {str(e)}')
         
+        _contar(slug, 'reintentos')
+        await asyncio.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** intento)))
+        intento += 1
+
+async def scrape_estacion_async(slug: str) -> RegistroEstacion:
+    """Scrapea una estación sin bloquear el event loop
+    
+    TIMEOUT_ESTACION es el plazo total: esperas en cola y reintentos incluidos.
+    """
+    try:
+        return await asyncio.wait_for(_scrape_con_reintentos(slug), timeout=TIMEOUT_ESTACION)
+    except asyncio.TimeoutError as e:
+        return _fallo_scrape(slug, e, f'Tiempo de espera agotado ({TIMEOUT_ESTACION:g} s)')
+
+async def _en_cache(operacion, *args):
+    """Ejecuta una operación de la caché sin bloquear el event loop
+
+    La caché compartida (SQLite) puede esperar a que otro proceso suelte la
+    base, así que sus operaciones van al pool de E/S (no al de scraping);
+    las de la caché en memoria se hacen directamente.
+    """
+    if not cache.bloqueante:
+        return operacion(*args)
+    return await asyncio.get_running_loop().run_in_executor(_executor_io, operacion, *args)
+
+async def _esperar_otro_proceso(slug: str, plazo: float, desde: float):
+    """Espera a que el proceso que está scrapeando un slug guarde el resultado
+    
+    Devuelve el registro guardado después de `desde` (epoch), o None si el
+    otro proceso ha terminado sin guardar nada (y el bloqueo pasa a este) o
+    si no termina a tiempo. Se sondea solo con lecturas; el bloqueo (una
+    escritura) se intenta tomar cuando el del otro proceso ya no está vigente.
+    """
+    inicio = time.monotonic()
+    while time.monotonic() - inicio < TIMEOUT_ESTACION:
+        await asyncio.sleep(0.1)
+        edad = await _en_cache(cache.edad, slug)
+        if edad is not None and edad <= time.time() - desde:
+            return await _en_cache(cache.ver, slug)
+        if not await _en_cache(cache.bloqueo_vigente, slug) and await _en_cache(cache.adquirir_refresco, slug, plazo):
+            return None
+    return None
+
+async def _scrape_y_cachear(slug: str) -> RegistroEstacion:
+    """Scrapea una estación y guarda el resultado en caché si es correcto
+    
+    Con una caché compartida, si otro proceso ya está scrapeando el slug se
+    espera a su resultado en lugar de scrapearlo otra vez.
+    """
+    global esperas_compartidas
+    
+    plazo = TIMEOUT_ESTACION + 5
+    # Antes de pedir el bloqueo: lo que el otro proceso guarde mientras llega
+    # la respuesta ya es su resultado
+    desde = time.time()
+    if not await _en_cache(cache.adquirir_refresco, slug, plazo):
+        esperas_compartidas += 1
+        registro = await _esperar_otro_proceso(slug, plazo, desde)
+        if registro is not None:
+            _registro_de_otro_proceso(slug, registro, time.time())
+            return registro
+    
+    try:
+        registro = await scrape_estacion_async(slug)
+        if registro.correcto:
+            anterior = await _en_cache(cache.ver, slug)
+            await _en_cache(cache.guardar, slug, registro)
+    finally:
+        # Se libera después de guardar para que quien espera encuentre el resultado
+        await _en_cache(cache.liberar_refresco, slug)
+    
+    if registro.correcto:
+        ultimo_exito[slug] = registro.timestamp
+        tabla.actualizar(registro)
+        # Con los mismos datos (304 o huella igual) no hay cambios que calcular ni difundir
+        if anterior is not None and not registro.mismos_datos(anterior):
+            cambios = calcular_cambios(anterior.a_dict(), registro.a_dict())
+            if cambios:
+                difusor.publicar(slug, cambios, registro.timestamp)
+        ahora = time.time()
+        valores = registro.valores()
+        historico.registrar(slug, ahora, valores)
+        if almacen is not None:
+            _pendientes_guardar[slug] = (registro.a_dict(), ahora)
+            _pendientes_historico.append((slug, ahora) + valores)
+    return registro
+
+def _registro_de_otro_proceso(slug: str, registro: RegistroEstacion, guardado: float):
+    """Incorpora un registro que ha obtenido otro proceso (caché compartida o almacén)
+
+    Si es más reciente que el último que conoce este proceso, se difunden sus
+    cambios a los clientes de /stream y se añade al histórico (con el instante
+    en que se guardó), igual que si lo hubiera scrapeado este proceso. Al
+    almacén no se escribe: ya lo hace el proceso que lo ha scrapeado.
+    """
+    previo = tabla.registro(slug)
+    if previo is registro or (previo is not None and registro.timestamp <= previo.timestamp):
+        return
+    ultimo_exito[slug] = registro.timestamp
+    tabla.actualizar(registro)
+    if previo is not None and not registro.mismos_datos(previo):
+        cambios = calcular_cambios(previo.a_dict(), registro.a_dict())
+        if cambios:
+            difusor.publicar(slug, cambios, registro.timestamp)
+    historico.registrar(slug, guardado, registro.valores())
+
+async def _bucle_compartida():
+    """Sigue los registros que guardan otros procesos en la caché compartida
+
+    Los scrapes en vuelo de este proceso se saltan: su resultado lo
+    incorpora el propio scrape.
+    """
+    desde = time.time()
+    while True:
+        await asyncio.sleep(CACHE_SONDEO)
+        try:
+            for slug, registro, guardado in await _en_cache(cache.guardadas_desde, desde):
+                desde = max(desde, guardado)
+                if slug not in _scrapes_en_vuelo:
+                    _registro_de_otro_proceso(slug, registro, guardado)
+        except Exception as e:
+            log.error("Error leyendo la caché compartida", extra={'error': str(e)})
+
+async def scrape_compartido(slug: str) -> RegistroEstacion:
+    """Scrapea una estación compartiendo el resultado con las peticiones simultáneas
+
+    Si ya hay un scrape en vuelo para el slug, se espera a ese en lugar de
+    lanzar otro. El scrape compartido no se cancela aunque lo haga quien espera.
+    """
+    global peticiones_coalescidas
+
+    if not slug_conocido(slug):
+        return _estacion_desconocida(slug)
+    if SOLO_LECTURA:
+        return _error_estacion(slug, f'Sin datos de {slug} (modo solo lectura)')
+
+    tarea = _scrapes_en_vuelo.get(slug)
+    if tarea is None:
+        tarea = _lanzar_scrape(slug)
+    else:
+        peticiones_coalescidas += 1
+
+    return await asyncio.shield(tarea)
+
+def _lanzar_scrape(slug: str) -> asyncio.Task:
+    """Lanza el scrape de un slug y lo registra como en vuelo"""
+    tarea = asyncio.create_task(_scrape_y_cachear(slug))
+    _scrapes_en_vuelo[slug] = tarea
+    tarea.add_done_callback(lambda _: _scrapes_en_vuelo.pop(slug, None))
+    return tarea
+
+async def scrape_admitido(slug: str, esperar: bool = True, forzar: bool = False) -> RegistroEstacion:
+    """scrape_compartido pasando por el control de admisión
+
+    Unirse a un scrape que ya está en vuelo, o a la espera de hueco de otra
+    petición del mismo slug, no ocupa hueco ni sitio en la cola. El hueco se
+    libera cuando termina el scrape, aunque quien lo pidió ya no espere.
+    Sin `esperar` no se entra en la cola; con `forzar` se scrapea aunque el
+    dato esté fresco en caché. Lanza Saturado si no se admite.
+    """
+    global peticiones_coalescidas
+
+    if SOLO_LECTURA or slug in _scrapes_en_vuelo or not slug_conocido(slug):
+        return await scrape_compartido(slug)
+
+    clave = (slug, forzar)
+    pendiente = _admisiones_pendientes.get(clave)
+    if pendiente is None:
+        pendiente = asyncio.create_task(_admitir_y_scrapear(slug, esperar, forzar))
+        _admisiones_pendientes[clave] = pendiente
+        pendiente.add_done_callback(lambda tarea: _fin_admision(clave, tarea))
+    else:
+        peticiones_coalescidas += 1
+    return await asyncio.shield(pendiente)
+
+def _fin_admision(clave: tuple, tarea: asyncio.Task):
+    """Quita la espera de hueco terminada de las pendientes"""
+    if _admisiones_pendientes.get(clave) is tarea:
+        del _admisiones_pendientes[clave]
+    # Saturado se entrega a quien espera; si ya no espera nadie, se descarta
+    if not tarea.cancelled():
+        tarea.exception()
+
+async def _admitir_y_scrapear(slug: str, esperar: bool, forzar: bool) -> RegistroEstacion:
+    """Espera hueco y scrapea el slug
+
+    Mientras se esperaba en la cola, otra vía (el refresco, /refresh u otro
+    proceso con caché compartida) ha podido lanzar el scrape o, salvo que se
+    fuerce, dejar el dato fresco en caché: entonces se aprovecha y el hueco
+    se devuelve sin scrapear.
+    """
+    if not await admision.entrar(esperar):
+        raise Saturado(admision.reintentar_en())
+    entrada = None
+    if not forzar:
+        try:
+            entrada, fresca = await _en_cache(cache.obtener, slug)
+        except BaseException:
+            admision.salir()
+            raise
+    if entrada is not None and fresca:
+        admision.salir()
+        return entrada.datos
+    if slug in _scrapes_en_vuelo:
+        admision.salir()
+        return await scrape_compartido(slug)
+
+    inicio = time.monotonic()
+    tarea = _lanzar_scrape(slug)
+    tarea.add_done_callback(lambda _: admision.salir(time.monotonic() - inicio))
+    return await asyncio.shield(tarea)
+
+async def _refrescar_entrada(slug: str):
+    """Vuelve a scrapear una entrada caducada; si falla se conserva la anterior
+
+    Sin hueco libre no se hace: la entrada caducada sigue sirviéndose.
+    """
+    global refrescos_sin_admision
+    try:
+        await scrape_admitido(slug, esperar=False)
+    except Saturado:
+        refrescos_sin_admision += 1
+
+def _programar_refresco(slug: str):
+    """Lanza el refresco en segundo plano de un slug si no hay ya uno en curso"""
+    if SOLO_LECTURA or slug in _refrescos_en_curso:
+        return
+    tarea = asyncio.create_task(_refrescar_entrada(slug))
+    _refrescos_en_curso[slug] = tarea
+    tarea.add_done_callback(lambda _: _refrescos_en_curso.pop(slug, None))
+
+async def obtener_estacion(slug: str, semaforo: asyncio.Semaphore = None) -> tuple:
+    """Obtiene los datos de una estación pasando por la caché
+
+    Devuelve (registro, estado_cache, edad) donde estado_cache es HIT, STALE o MISS.
+    Las entradas caducadas se sirven tal cual mientras se refrescan en segundo plano.
+    Solo se guardan en caché los scrapes correctos. Si el control de admisión
+    no deja scrapear se sirve (STALE) el último dato correcto de la estación
+    aunque ya no esté en caché; si no lo hay se propaga Saturado.
+    """
+    global servidas_sin_admision
+
+    entrada, fresca = await _en_cache(cache.obtener, slug)
+    if entrada is not None:
+        if not cache.compartida:
+            tabla.actualizar(entrada.datos)
+        elif slug not in _scrapes_en_vuelo:
+            # La entrada puede venir de otro proceso
+            _registro_de_otro_proceso(slug, entrada.datos, time.time() - entrada.edad)
+        if fresca:
+            return entrada.datos, 'HIT', entrada.edad
+        _programar_refresco(slug)
+        return entrada.datos, 'STALE', entrada.edad
+
+    try:
+        if semaforo is None:
+            registro = await scrape_admitido(slug)
+        else:
+            async with semaforo:
+                registro = await scrape_admitido(slug)
+    except Saturado:
+        ultimo = tabla.registro(slug)
+        if ultimo is None:
+            raise
+        servidas_sin_admision += 1
+        return ultimo, 'STALE', max(0.0, (datetime.now() - datetime.fromisoformat(ultimo.timestamp)).total_seconds())
+    return registro, 'MISS', 0.0
+
+def _saturado(error: Saturado) -> HTTPException:
+    """503 con Retry-After para una petición que no se ha podido atender"""
+    return HTTPException(status_code=503, detail=str(error), headers={'Retry-After': str(error.reintentar_en)})
+
+async def obtener_estaciones(slugs: list) -> list:
+    """Obtiene varias estaciones en paralelo manteniendo el orden de la petición
+
+    Una estación que el control de admisión no deja scrapear (y sin dato
+    anterior) sale con "estado": "error"; el resto se sirve igual.
+    """
+    semaforo = asyncio.Semaphore(MAX_CONCURRENCIA)
+
+    async def obtener(slug):
+        try:
+            return await obtener_estacion(slug, semaforo)
+        except Saturado as e:
+            return _error_estacion(slug, str(e)), 'MISS', 0.0
+
+    return await asyncio.gather(*(obtener(slug) for slug in slugs))
+
+def _cabeceras_cache(response: Response, resultados: list):
+    """Expone el estado de la caché (X-Cache) y la edad de los datos (Age)"""
+    response.headers['X-Cache'] = ', '.join(estado for _, estado, _ in resultados)
+    response.headers['Age'] = str(int(max((edad for _, _, edad in resultados), default=0)))
+
+def _responder(request: Request, clave, version: tuple, construir, resultados: list = None) -> Response:
+    """Sirve la respuesta precalculada de `clave` (304 si el cliente ya la tiene)
+    
+    Sin `resultados` (respuestas que no pasan por la caché) no se añaden X-Cache ni Age.
+    """
+    def construir_medido():
+        slug = request.path_params.get('slug', '')
+        with duracion_serializacion.cronometro(endpoint_actual(), etiqueta_slug(slug) if slug else ''):
+            return construir()
+    
+    entrada = respuestas.obtener(clave, version, construir_medido)
+    cuerpo, etag, codificacion = respuestas.variante(entrada, request.headers.get('accept-encoding'))
+    if respuestas.no_modificada(entrada, request.headers.get('if-none-match')):
+        respuestas.contabilizar(entrada, 0)
+        response = Response(status_code=304, headers={'ETag': etag, 'Vary': 'Accept-Encoding'})
+    else:
+        respuestas.contabilizar(entrada, len(cuerpo))
+        response = Response(content=cuerpo, media_type="application/json",
+                            headers={'ETag': etag, 'Vary': 'Accept-Encoding'})
+        if codificacion:
+            response.headers['Content-Encoding'] = codificacion
+    if resultados is not None:
+        _cabeceras_cache(response, resultados)
+    return response
+
+async def refrescar_estaciones(slugs: list, admitir: bool = False) -> list:
+    """Fuerza el scrape de las estaciones indicadas y devuelve el tiempo de cada una
+
+    Con `admitir` los scrapes pasan por el control de admisión (POST
+    /refresh), y los que no se admiten salen con "estado": "error".
+    """
+    semaforo = asyncio.Semaphore(CONCURRENCIA_REFRESCO)
+
+    async def refrescar(slug):
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                registro = await (scrape_admitido(slug, forzar=True) if admitir else scrape_compartido(slug))
+            except Saturado as e:
+                registro = _error_estacion(slug, str(e))
+            resultado = {
+                'slug': slug,
+                'estado': registro.estado,
+                'duracion_ms': round((time.perf_counter() - inicio) * 1000, 1)
+            }
+            if not registro.correcto:
+                resultado['error'] = registro.error
+            return resultado
+
+    return await asyncio.gather(*(refrescar(slug) for slug in slugs))
+
+def _por_refrescar(minima: float) -> list:
+    """Estaciones vigiladas sin dato en caché o con uno de al menos `minima` segundos"""
+    edades = ((slug, cache.edad(slug)) for slug in ESTACIONES_VIGILADAS)
+    return [slug for slug, edad in edades if edad is None or edad >= minima]
+
+async def _bucle_refresco():
+    """Refresca periódicamente las estaciones vigiladas
+
+    El primer refresco se hace al arrancar, solo de las estaciones que no se
+    han cargado frescas del almacén; los siguientes se adelantan un tiempo
+    aleatorio de hasta JITTER_REFRESCO segundos para no sincronizar las
+    peticiones con las de otras instancias. En cada pasada se saltan las
+    estaciones que otro proceso (con caché compartida) o una petición han
+    actualizado hace menos de medio intervalo.
+    """
+    minima = INTERVALO_REFRESCO
+    while True:
+        try:
+            slugs = await _en_cache(_por_refrescar, minima)
+            if slugs:
+                resultados = await refrescar_estaciones(slugs)
+                correctas = sum(1 for r in resultados if r['estado'] == 'success')
+                log.info("Refresco programado", extra={'correctas': correctas, 'total': len(resultados)})
+        except Exception as e:
+            log.error("Error en el refresco programado", extra={'error': str(e)})
+        minima = INTERVALO_REFRESCO / 2
+
+        espera = max(1.0, INTERVALO_REFRESCO - random.uniform(0, JITTER_REFRESCO))
+        await asyncio.sleep(espera)
+
+def _descargar_catalogo() -> list:
+    """Descarga y extrae el listado de estaciones (bloqueante, en el pool de hilos)"""
+    from extractor import extraer_catalogo
+
+    response = cliente.sesion.get(CATALOGO_URL, timeout=cliente.timeout)
+    response.raise_for_status()
+    return extraer_catalogo(response.content)
+
+async def actualizar_catalogo() -> int:
+    """Descarga el listado, sustituye el catálogo y lo guarda
+    
+    Pasa por el limitador y el circuito del host como los scrapes. Un listado
+    con menos de CATALOGO_MIN_ESTACIONES estaciones o con menos de la mitad
+    que el catálogo actual (p. ej. si ha cambiado el HTML) no lo sustituye.
+    """
+    import requests
+
+    proteccion = proteccion_para(CATALOGO_URL)
+    if not proteccion.circuito.permitir() or not await proteccion.limitador.adquirir():
+        raise OrigenNoDisponible(f'{proteccion.host} no disponible')
+    
+    loop = asyncio.get_running_loop()
+    try:
+        estaciones = await loop.run_in_executor(_executor, _descargar_catalogo)
     except requests.exceptions.RequestException as e:
-        return {
-            'slug': slug,
-            'nombre': slug.replace('-', ' ').title(),
-            'error': f'Error de conexión: {str(e)}',
-            'timestamp': datetime.now().isoformat(),
-            'estado': 'error'
-        }
-    except Exception as e:
-        return {
-            'slug': slug,
-            'nombre': slug.replace('-', ' ').title(),
-            'error': f'Error: {str(e)}',
-            'timestamp': datetime.now().isoformat(),
-            'estado': 'error'
-        }
+        if _es_fallo_origen(e):
+            proteccion.registrar_fallo()
+        else:
+            proteccion.registrar_exito()
+        raise
+    proteccion.registrar_exito()
+    
+    if len(estaciones) < CATALOGO_MIN_ESTACIONES:
+        raise ValueError(f'El listado solo contiene {len(estaciones)} estaciones '
+                         f'(mínimo {CATALOGO_MIN_ESTACIONES})')
+    if len(estaciones) < len(catalogo) / 2:
+        raise ValueError(f'El listado contiene {len(estaciones)} estaciones, '
+                         f'menos de la mitad que el catálogo actual ({len(catalogo)})')
+    catalogo.actualizar(estaciones)
+    await loop.run_in_executor(_executor_io, catalogo.guardar)
+    return len(estaciones)
+
+async def _bucle_catalogo():
+    """Mantiene el catálogo al día
+    
+    Si el guardado tiene menos de CATALOGO_INTERVALO segundos se espera a que
+    caduque. Si la actualización falla se sigue usando el anterior y se
+    vuelve a intentar al cabo de un minuto, duplicando la espera con cada
+    fallo seguido hasta CATALOGO_INTERVALO.
+    """
+    espera = min(60.0, CATALOGO_INTERVALO)
+    while True:
+        edad = catalogo.edad
+        if edad is not None and edad < CATALOGO_INTERVALO:
+            await asyncio.sleep(CATALOGO_INTERVALO - edad)
+        try:
+            estaciones = await actualizar_catalogo()
+            log.info("Catálogo actualizado", extra={'estaciones': estaciones})
+            espera = min(60.0, CATALOGO_INTERVALO)
+        except Exception as e:
+            log.warning("Error actualizando el catálogo", extra={'error': str(e), 'reintento_en': espera})
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, CATALOGO_INTERVALO)
+
+def _cargar_instantaneas() -> int:
+    """Carga en caché, con su edad real, las instantáneas del almacén, y el histórico"""
+    ahora = time.time()
+    filas = almacen.cargar()
+    for slug, datos, guardado in filas:
+        registro = RegistroEstacion.desde_dict(datos)
+        cache.guardar(slug, registro, edad=max(0.0, ahora - guardado))
+        ultimo_exito[slug] = registro.timestamp
+        tabla.actualizar(registro)
+
+    for slug, puntos in almacen.cargar_historico(ahora - historico.retencion).items():
+        historico.cargar(slug, puntos, ahora)
+    return len(filas)
+
+async def _bucle_recarga():
+    """Modo solo lectura: sigue las instantáneas que guarda en el almacén la instancia que scrapea
+
+    Cada INTERVALO_RECARGA segundos se leen las guardadas desde la última
+    lectura. Las más recientes que las que hay se ponen en caché con su edad
+    real, se difunden sus cambios y se añaden al histórico.
+    """
+    desde = None
+    while True:
+        await asyncio.sleep(INTERVALO_RECARGA)
+        try:
+            filas = await asyncio.get_running_loop().run_in_executor(_executor_io, almacen.cargar, desde)
+            ahora = time.time()
+            for slug, datos, guardado in filas:
+                desde = guardado
+                registro = RegistroEstacion.desde_dict(datos)
+                previo = tabla.registro(slug)
+                if previo is None or registro.timestamp > previo.timestamp:
+                    cache.guardar(slug, registro, edad=max(0.0, ahora - guardado))
+                    _registro_de_otro_proceso(slug, registro, guardado)
+        except Exception as e:
+            log.error("Error recargando el almacén", extra={'error': str(e)})
+
+async def _volcar_pendientes():
+    """Escribe en el almacén, en un único lote, los resultados acumulados"""
+    global _pendientes_guardar, _pendientes_historico
+    if not _pendientes_guardar and not _pendientes_historico:
+        return
+    lote, _pendientes_guardar = _pendientes_guardar, {}
+    puntos, _pendientes_historico = _pendientes_historico, []
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        _executor_io, almacen.guardar_lote, lote, puntos, time.time() - historico.retencion
+    )
+
+async def _bucle_guardado():
+    """Vuelca periódicamente los resultados nuevos al almacén"""
+    while True:
+        await asyncio.sleep(INTERVALO_GUARDADO)
+        try:
+            await _volcar_pendientes()
+        except Exception as e:
+            log.error("Error guardando instantáneas", extra={'error': str(e)})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y parada del servidor"""
+    global almacen, instantaneas_cargadas, pool_parseo
+
+    oyente_logs = configurar_logs(LOG_NIVEL, LOG_FORMATO)
+
+    if PARSE_WORKERS > 0 and not SOLO_LECTURA:
+        from parseo import PoolParseo
+        pool_parseo = PoolParseo(PARSE_WORKERS)
+        await asyncio.get_running_loop().run_in_executor(_executor, pool_parseo.arrancar)
+        log.info("Procesos de parseo listos", extra={'procesos': PARSE_WORKERS, 'arranque_ms': pool_parseo.arranque_ms})
+
+    tarea_guardado = tarea_recarga = None
+    if ALMACEN_RUTA:
+        almacen = AlmacenInstantaneas(ALMACEN_RUTA)
+        loop = asyncio.get_running_loop()
+        instantaneas_cargadas = await loop.run_in_executor(_executor_io, _cargar_instantaneas)
+        tarea_guardado = asyncio.create_task(_bucle_guardado())
+        if SOLO_LECTURA and not cache.compartida and INTERVALO_RECARGA > 0:
+            tarea_recarga = asyncio.create_task(_bucle_recarga())
+        log.info("Estaciones cargadas del almacén", extra={'estaciones': instantaneas_cargadas, 'ruta': ALMACEN_RUTA})
+
+    tarea_catalogo = None
+    if CATALOGO_URL:
+        try:
+            if await asyncio.get_running_loop().run_in_executor(_executor_io, catalogo.cargar):
+                log.info("Catálogo cargado", extra={'estaciones': len(catalogo), 'ruta': CATALOGO_RUTA})
+        except Exception as e:
+            log.warning("Error cargando el catálogo guardado", extra={'error': str(e)})
+        if not SOLO_LECTURA:
+            tarea_catalogo = asyncio.create_task(_bucle_catalogo())
+
+    tarea_compartida = None
+    if cache.compartida and CACHE_SONDEO > 0:
+        tarea_compartida = asyncio.create_task(_bucle_compartida())
+
+    tarea_refresco = None
+    if SOLO_LECTURA:
+        log.info("Servidor iniciado - solo lectura", extra={'estaciones': len(tabla)})
+    elif ESTACIONES_VIGILADAS and INTERVALO_REFRESCO > 0:
+        tarea_refresco = asyncio.create_task(_bucle_refresco())
+        log.info("Servidor iniciado - refresco programado",
+                 extra={'estaciones': len(ESTACIONES_VIGILADAS), 'intervalo': INTERVALO_REFRESCO})
+    else:
+        log.info("Servidor iniciado - scraping bajo demanda")
+
+    yield
+
+    if tarea_refresco is not None:
+        tarea_refresco.cancel()
+    if tarea_compartida is not None:
+        tarea_compartida.cancel()
+    if tarea_catalogo is not None:
+        tarea_catalogo.cancel()
+    if tarea_recarga is not None:
+        tarea_recarga.cancel()
+    if tarea_guardado is not None:
+        tarea_guardado.cancel()
+        almacen.guardar_lote(_pendientes_guardar, _pendientes_historico)
+        almacen.cerrar()
+    cache.cerrar()
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _executor_io.shutdown(wait=False, cancel_futures=True)
+    if pool_parseo is not None:
+        pool_parseo.cerrar()
+    if oyente_logs is not None:
+        oyente_logs.stop()
+
+# Configuración
+app = FastAPI(title="Esqui Scraping API", version="1.0.0", lifespan=lifespan)
+
+# CORS configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
-@app.on_event("startup")
-async def startup_event():
-    """Evento de inicio del servidor"""
-    print(f"[{datetime.now()}] Servidor iniciado - scraping se realizará bajo demanda")
+# Latencia de cada petición por endpoint y slug (/metrics)
+app.add_middleware(MiddlewareMetricas, histograma=duracion_peticion, etiqueta_slug=etiqueta_slug)
 
 # Rutas de la API
 @app.get("/")
@@ -122,66 +1066,347 @@ async def root():
         "descripcion": "API para obtener información de estaciones de esquí españolas",
         "endpoints": {
             "todas": "/estaciones",
+            "consulta": "/estaciones?orden=nieve&min_remontes_abiertos=&limite=&campos=",
+            "lote": "POST /estaciones/lote",
             "por_slug": "/estacion/{slug}",
-            "status": "/status"
+            "historico": "/estacion/{slug}/historico?desde=&hasta=&resolucion=",
+            "stream": "/stream?estaciones=",
+            "buscar": "/buscar?q=",
+            "status": "/status",
+            "metrics": "/metrics",
+            "refresh": "POST /refresh"
         }
     }
 
+def consultar_estaciones(request: Request, slugs: list, orden: str, minimos: dict, limite: int,
+                         campos: str) -> Response:
+    """Consulta sobre el último dato correcto de cada estación, sin scrapear
+    
+    - orden: nieve, remontes_abiertos, remontes_total, kilometros_abiertos,
+      kilometros_total (de mayor a menor) o nombre (alfabético); con "-"
+      delante se invierte. Las estaciones sin el dato van al final.
+    - minimos: {columna: valor}; las estaciones sin el dato no los cumplen
+    - limite: número máximo de estaciones devueltas
+    - campos: campos de cada estación separados por coma (el slug va siempre)
+    - slugs: si se indican, solo se consideran esas estaciones
+    
+    Solo incluye las estaciones que la API ya tiene (scrapeadas, vigiladas o
+    cargadas del almacén). "coincidencias" es el número de estaciones que
+    cumplen los mínimos antes de aplicar el límite.
+    """
+    try:
+        if orden:
+            leer_orden(orden)
+        proyeccion = leer_campos(campos) if campos else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # La respuesta solo depende de la versión de la tabla, así que mientras
+    # no cambie ni se evalúa la consulta: se sirve la precalculada
+    def construir():
+        filas, coincidencias = tabla.consultar(orden, minimos, limite, slugs)
+        return b''.join((
+            b'{"estaciones":[',
+            b','.join(tabla.json_fila(i, proyeccion) for i in filas),
+            b'],"total":', str(len(filas)).encode(),
+            b',"coincidencias":', str(coincidencias).encode(),
+            b',"ultima_actualizacion":', json.dumps(tabla.ultima_actualizacion(filas)).encode(),
+            b'}'
+        ))
+    
+    clave = ('consulta', tuple(slugs) if slugs else None, orden, tuple(sorted(minimos.items())), limite, proyeccion)
+    return _responder(request, clave, (tabla.version,), construir)
+
 @app.get("/estaciones")
-async def get_all_estaciones(estaciones: str = None):
-    """Obtiene datos de múltiples estaciones (scraping en tiempo real)
+async def get_all_estaciones(request: Request, estaciones: str = None, orden: str = None,
+                             min_remontes_abiertos: float = None, min_kilometros_abiertos: float = None,
+                             min_nieve: float = None, limite: int = Query(None, gt=0), campos: str = None):
+    """Obtiene datos de múltiples estaciones (con caché)
     
     Parámetros:
     - estaciones: Lista de slugs separados por coma (ej: sierra-nevada,candanchu)
+    - orden, min_remontes_abiertos, min_kilometros_abiertos, min_nieve, limite, campos:
+      consulta sobre el último dato de cada estación (ver consultar_estaciones)
+    
+    La respuesta lleva ETag y se sirve comprimida (gzip/br) si el cliente lo acepta.
+    Una estación sin datos que el control de admisión no deja scrapear sale
+    con "estado": "error", como las que fallan.
     """
-    global ultima_actualizacion
+    minimos = {
+        columna: minimo for columna, minimo in (
+            ('remontes_abiertos', min_remontes_abiertos),
+            ('kilometros_abiertos', min_kilometros_abiertos),
+            ('nieve', min_nieve)
+        ) if minimo is not None
+    }
+    if orden or minimos or limite or campos:
+        slugs = [slug.strip() for slug in estaciones.split(',')] if estaciones else None
+        return consultar_estaciones(request, slugs, orden, minimos, limite, campos)
     
     if estaciones:
         # Si se proporcionan estaciones específicas
         slugs = [slug.strip() for slug in estaciones.split(',')]
     else:
         # Estaciones por defecto si no se especifica ninguna
-        slugs = ['sierra-nevada', 'baqueira-beret', 'formigal', 'candanchu', 'jaca-astun']
+        slugs = ESTACIONES_POR_DEFECTO
     
-    print(f"[{datetime.now()}] Scrapeando estaciones: {', '.join(slugs)}...")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Consultando estaciones", extra={'estaciones': ','.join(slugs)})
     
-    resultados = []
-    for slug in slugs:
-        datos = scrape_estacion(slug)
-        resultados.append(datos)
+    resultados = await obtener_estaciones(slugs)
     
-    ultima_actualizacion = datetime.now().isoformat()
+    # La actualización más antigua de las estaciones devueltas (de los
+    # registros, que con caché compartida pueden venir de otro proceso)
+    registros = tuple(registro for registro, _, _ in resultados)
+    exitos = [registro.timestamp for registro in registros if registro.correcto]
+    ultima_actualizacion = min(exitos) if exitos else None
     
-    return {
-        "estaciones": resultados,
-        "total": len(resultados),
-        "ultima_actualizacion": ultima_actualizacion
-    }
+    # Cada registro aporta su JSON ya codificado; solo se compone la envoltura
+    def construir():
+        return b''.join((
+            b'{"estaciones":[',
+            b','.join(registro.a_json() for registro in registros),
+            b'],"total":', str(len(registros)).encode(),
+            b',"ultima_actualizacion":', json.dumps(ultima_actualizacion).encode(),
+            b'}'
+        ))
+    
+    return _responder(request, ('estaciones', *slugs), (*registros, ultima_actualizacion), construir, resultados)
+
+class PeticionLote(BaseModel):
+    """Cuerpo de POST /estaciones/lote"""
+    estaciones: list[str] = Field(..., min_length=1, max_length=LOTE_MAX_ESTACIONES)
+    concurrencia: int = Field(MAX_CONCURRENCIA, gt=0, le=MAX_CONCURRENCIA)
+    plazo: float = Field(LOTE_PLAZO, gt=0, le=LOTE_PLAZO)
+
+async def _obtener_registro(slug: str) -> RegistroEstacion:
+    try:
+        registro, _, _ = await obtener_estacion(slug)
+    except Saturado as e:
+        return _error_estacion(slug, str(e))
+    return registro
+
+async def _lineas_lote(slugs: list, concurrencia: int, plazo: float):
+    """Una línea JSON por estación, en el orden en que terminan"""
+    estadisticas_lotes['atendidos'] += 1
+    estadisticas_lotes['en_curso'] += 1
+    try:
+        # aclosing: si el cliente se va, los trabajadores del lote se paran
+        async with aclosing(resultados_lote(slugs, _obtener_registro, concurrencia, plazo)) as resultados:
+            async for slug, registro in resultados:
+                if registro is None:
+                    estadisticas_lotes['fuera_de_plazo'] += 1
+                    registro = _error_estacion(slug, f'Fuera del plazo del lote ({plazo:g} s)')
+                estadisticas_lotes['estaciones'] += 1
+                yield registro.a_json() + b'\n'
+    finally:
+        estadisticas_lotes['en_curso'] -= 1
+
+@app.post("/estaciones/lote")
+async def lote_estaciones(peticion: PeticionLote):
+    """Obtiene muchas estaciones y las envía según terminan (NDJSON)
+    
+    Cuerpo: {"estaciones": [slugs], "concurrencia": n, "plazo": segundos}
+    
+    Cada línea es una estación, con la misma forma que en /estaciones, en
+    el orden en que termina (las de caché primero). Hay como mucho
+    `concurrencia` estaciones en curso a la vez; las que no terminan dentro
+    del `plazo` del lote salen al final con "estado": "error".
+    """
+    slugs = [slug.strip() for slug in peticion.estaciones if slug.strip()]
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Lote de estaciones", extra={'estaciones': len(slugs), 'concurrencia': peticion.concurrencia})
+    return StreamingResponse(
+        _lineas_lote(slugs, peticion.concurrencia, peticion.plazo),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/estacion/{slug}")
-async def get_estacion(slug: str):
-    """Obtiene datos de una estación específica (scraping en tiempo real)
+async def get_estacion(slug: str, request: Request):
+    """Obtiene datos de una estación específica (con caché)
     
     El slug debe corresponder con el nombre de la URL en infonieve.es
     Ejemplo: sierra-nevada, candanchu, valdelinares, boi-taull, etc.
+    
+    Con el catálogo cargado, un slug desconocido responde 404 al momento con
+    las estaciones más parecidas en `sugerencias`. Si hay que scrapearla y
+    el control de admisión no la admite ni hay un dato anterior, responde
+    503 con Retry-After.
+    """
+    if not slug_conocido(slug):
+        contenido = _estacion_desconocida(slug).a_dict()
+        contenido['sugerencias'] = [estacion.slug for estacion, _ in catalogo.buscar(slug, 5)]
+        return JSONResponse(status_code=404, content=contenido)
+    
+    try:
+        resultado = await obtener_estacion(slug)
+    except Saturado as e:
+        raise _saturado(e)
+    registro = resultado[0]
+    return _responder(request, ('estacion', slug), (registro,), registro.a_json, [resultado])
+
+@app.get("/estacion/{slug}/historico")
+async def get_historico(slug: str, desde: datetime = None, hasta: datetime = None,
+                        resolucion: int = Query(None, gt=0)):
+    """Histórico de condiciones de una estación
+    
+    Parámetros:
+    - desde, hasta: Rango de fechas ISO 8601 (por defecto todo el histórico)
+    - resolucion: Segundos por punto; se devuelve el último valor de cada intervalo
+    
+    Los datos van en columnas: `tiempos` (epoch en segundos) y una lista por
+    campo, con null donde el dato no estaba disponible.
+    """
+    serie = historico.consultar(
+        slug,
+        desde=desde.timestamp() if desde else None,
+        hasta=hasta.timestamp() if hasta else None,
+        resolucion=resolucion
+    )
+    return {
+        "slug": slug,
+        "desde": desde.isoformat() if desde else None,
+        "hasta": hasta.isoformat() if hasta else None,
+        "resolucion": resolucion,
+        "puntos": len(serie['tiempos']),
+        "campos": ['tiempos', *COLUMNAS_HISTORICO],
+        **serie
+    }
+
+@app.get("/buscar")
+async def buscar(q: str = Query(..., min_length=1), limite: int = Query(10, gt=0, le=100)):
+    """Busca estaciones en el catálogo
+    
+    Parámetros:
+    - q: Texto a buscar en el nombre o el slug (sin distinguir tildes ni mayúsculas)
+    - limite: Número máximo de resultados
+    
+    Primero van las estaciones cuyo nombre, alguna de sus palabras o el slug
+    empiezan por `q` y después las aproximadas, que toleran erratas.
+    """
+    resultados = catalogo.buscar(q, limite)
+    return {
+        "consulta": q,
+        "resultados": [{**asdict(estacion), "coincidencia": coincidencia} for estacion, coincidencia in resultados],
+        "total": len(resultados),
+        "estaciones_catalogo": len(catalogo)
+    }
+
+@app.get("/stream")
+async def stream(estaciones: str = None):
+    """Flujo de cambios de estaciones (Server-Sent Events)
+    
+    Parámetros:
+    - estaciones: Lista de slugs separados por coma (por defecto todas)
+    
+    Cada vez que un refresco detecta un cambio se envía un evento `cambio`
+    con solo los campos modificados. Si el cliente no lee a tiempo y se
+    pierden eventos recibe un evento `desfase`.
+    """
+    slugs = [slug.strip() for slug in estaciones.split(',') if slug.strip()] if estaciones else None
+    return StreamingResponse(
+        eventos_sse(difusor, slugs, STREAM_LATIDO),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/refresh")
+async def refresh(estaciones: str = None):
+    """Fuerza la actualización del caché
+    
+    Parámetros:
+    - estaciones: Lista de slugs separados por coma (por defecto las vigiladas)
+    
+    Los scrapes pasan por el control de admisión como los de las peticiones.
+    En modo solo lectura no se scrapea y responde 403.
     """
+    if SOLO_LECTURA:
+        raise HTTPException(status_code=403, detail="Modo solo lectura: no se refresca")
+    
+    if estaciones:
+        slugs = [slug.strip() for slug in estaciones.split(',') if slug.strip()]
+    else:
+        slugs = ESTACIONES_VIGILADAS
     
-    print(f"[{datetime.now()}] Scrapeando {slug}...")
-    return scrape_estacion(slug)
+    resultados = await refrescar_estaciones(slugs, admitir=True)
+    
+    return {
+        "mensaje": "Caché actualizado",
+        "estaciones": resultados,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 1)
+
+def _estado_parseo() -> dict:
+    from extractor import ESPECIFICACION
+    return {
+        "version_extraccion": ESPECIFICACION.version,
+        **(pool_parseo.estadisticas() if pool_parseo else {"workers": 0})
+    }
 
 @app.get("/status")
 async def get_status():
     """Estado de la API"""
     return {
         "status": "ok",
+        "modo": "solo_lectura" if SOLO_LECTURA else "completo",
         "base_url": BASE_URL,
-        "descripcion": "Acepta cualquier slug de estación de infonieve.es",
+        "descripcion": (
+            "Acepta los slugs del catálogo de infonieve.es (ver /buscar)" if CATALOGO_RECHAZAR and catalogo.cargado
+            else "Acepta cualquier slug de estación de infonieve.es"
+        ),
         "ejemplos": ["sierra-nevada", "candanchu", "valdelinares", "boi-taull", "baqueira-beret"],
-        "ultima_actualizacion": ultima_actualizacion,
+        "estaciones_vigiladas": ESTACIONES_VIGILADAS,
+        "intervalo_refresco": INTERVALO_REFRESCO,
+        "ultimas_actualizaciones": ultimo_exito,
+        "cache": await _en_cache(cache.estadisticas),
+        "tabla": tabla.estadisticas(),
+        "admision": {
+            **admision.estadisticas(),
+            "servidas_sin_admision": servidas_sin_admision,
+            "refrescos_sin_admision": refrescos_sin_admision
+        },
+        "lotes": {**estadisticas_lotes, "max_estaciones": LOTE_MAX_ESTACIONES, "plazo": LOTE_PLAZO},
+        "catalogo": {**catalogo.estadisticas(), "url": CATALOGO_URL or None, "rechazadas": slugs_rechazados},
+        "http": cliente.estadisticas(),
+        "huellas": huellas.estadisticas(),
+        "historico": historico.estadisticas(),
+        "stream": difusor.estadisticas(),
+        "respuestas": respuestas.estadisticas(),
+        # En solo lectura no se parsea (ni se importa el extractor)
+        "parseo": None if SOLO_LECTURA else _estado_parseo(),
+        "origen": {host: proteccion.estadisticas() for host, proteccion in _protecciones.items()},
+        "almacen": {
+            "ruta": ALMACEN_RUTA or None,
+            "cargadas_al_arrancar": instantaneas_cargadas,
+            "pendientes": len(_pendientes_guardar) + len(_pendientes_historico),
+            "lotes_escritos": almacen.lotes_escritos if almacen else 0,
+            "filas_escritas": almacen.filas_escritas if almacen else 0
+        },
+        "scrapes": {
+            "en_vuelo": len(_scrapes_en_vuelo),
+            "coalescidos": peticiones_coalescidas,
+            "esperados_de_otro_proceso": esperas_compartidas,
+            "latencia_p95_ms": _ms(latencias_descarga.percentil(95)),
+            "por_estacion": contadores_scrape
+        },
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas en el formato de texto de Prometheus
+    
+    Histogramas de descarga, parseo, extracción, serialización y latencia de
+    las peticiones por endpoint y slug; errores de scrape por tipo; consultas
+    a la caché y bytes descargados.
+    """
+    return Response(content=metricas.exponer(), headers={'Content-Type': TIPO_CONTENIDO})
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas en el formato de texto de Prometheus
+Contadores e histogramas con etiquetas, seguros entre hilos, y métricas
+calculadas al exponerlas a partir de los contadores que ya llevan otros
+módulos (caché, cliente HTTP...), sin coste en el camino de cada petición
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+# Límites de los cubos de los histogramas de tiempos (segundos)
+CUBOS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres: tuple, valores: tuple, extra: str = '') -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monótono con etiquetas"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad: float = 1):
+        """Suma `cantidad` a la serie de las etiquetas indicadas (en orden)"""
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0)
+
+    def lineas(self):
+        with self._lock:
+            series = list(self._valores.items())
+        for valores, total in series:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(total)}"
+
+
+class Histograma:
+    """Histograma acumulativo con etiquetas (cubos, suma y número de observaciones)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), cubos: tuple = CUBOS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.cubos = tuple(sorted(cubos))
+        # Etiquetas -> [cuenta por cubo (no acumulada)..., suma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores):
+        """Registra una observación en la serie de las etiquetas indicadas"""
+        indice = bisect.bisect_left(self.cubos, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.cubos) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def cronometro(self, *valores):
+        """Context manager que observa los segundos transcurridos dentro del bloque"""
+        return _Cronometro(self, valores)
+
+    def lineas(self):
+        with self._lock:
+            series = [(valores, list(serie)) for valores, serie in self._series.items()]
+        for valores, serie in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.cubos + (float('inf'),), serie):
+                acumulado += cuenta
+                le = f'le="{_numero(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(serie[-2])}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {serie[-1]}"
+
+
+class _Cronometro:
+    __slots__ = ('_histograma', '_valores', '_inicio')
+
+    def __init__(self, histograma: Histograma, valores: tuple):
+        self._histograma = histograma
+        self._valores = valores
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._histograma.observar(time.perf_counter() - self._inicio, *self._valores)
+
+
+class MetricaCalculada:
+    """Métrica cuyo valor se lee al exponerla
+
+    `funcion` devuelve un dict {tupla de valores de etiquetas: valor}.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str, etiquetas: tuple, funcion):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.etiquetas = etiquetas
+        self.funcion = funcion
+
+    def lineas(self):
+        for valores, valor in self.funcion().items():
+            if valor is not None:
+                yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(valor)}"
+
+
+class Metricas:
+    """Registro de métricas de la aplicación"""
+
+    def __init__(self, prefijo: str = ''):
+        self.prefijo = prefijo
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Contador:
+        return self._registrar(Contador(self.prefijo + nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: tuple = (), cubos: tuple = CUBOS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(self.prefijo + nombre, ayuda, etiquetas, cubos))
+
+    def calculada(self, nombre: str, ayuda: str, tipo: str, etiquetas: tuple, funcion) -> MetricaCalculada:
+        return self._registrar(MetricaCalculada(self.prefijo + nombre, ayuda, tipo, etiquetas, funcion))
+
+    def exponer(self) -> bytes:
+        """Todas las métricas en el formato de texto de Prometheus (0.0.4)"""
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        lineas.append('')
+        return '\n'.join(lineas).encode('utf-8')
+
+
+class EtiquetasAcotadas:
+    """Limita los valores distintos de una etiqueta (p. ej. el slug)
+
+    La API acepta cualquier slug, así que sin límite cada slug inventado
+    crearía series nuevas. A partir de `maximo` valores distintos, los nuevos
+    se agrupan en `resto`.
+    """
+
+    def __init__(self, maximo: int, resto: str = 'otros'):
+        self.maximo = maximo
+        self.resto = resto
+        self._conocidos = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, valor: str) -> str:
+        if valor in self._conocidos:
+            return valor
+        with self._lock:
+            if len(self._conocidos) < self.maximo:
+                self._conocidos.add(valor)
+                return valor
+        return self.resto
+
+
+# Scope ASGI de la petición en curso. Las tareas creadas al atenderla heredan
+# el contexto, así que un scrape sabe qué endpoint lo ha provocado.
+_peticion_actual = contextvars.ContextVar('peticion_actual', default=None)
+
+
+def endpoint_actual(defecto: str = '') -> str:
+    """Ruta (plantilla, p. ej. /estacion/{slug}) de la petición en curso"""
+    scope = _peticion_actual.get()
+    if scope is None:
+        return defecto
+    ruta = scope.get('route')
+    return getattr(ruta, 'path', None) or 'sin_ruta'
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mide la latencia de cada petición hasta la respuesta
+
+    Se mide hasta que se envían las cabeceras, que en las respuestas
+    precalculadas es el tiempo total y en /stream el de establecer el flujo.
+    Las etiquetas son la ruta y el slug de la URL (vacío si no tiene).
+    """
+
+    def __init__(self, app, histograma: Histograma, etiqueta_slug):
+        self.app = app
+        self.histograma = histograma
+        self.etiqueta_slug = etiqueta_slug
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        inicio = time.perf_counter()
+        token = _peticion_actual.set(scope)
+
+        async def enviar(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                slug = scope.get('path_params', {}).get('slug', '')
+                self.histograma.observar(time.perf_counter() - inicio, endpoint_actual(),
+                                         self.etiqueta_slug(slug) if slug else '')
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion_actual.reset(token)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo de datos de una estación
+Los valores se parsean una sola vez al scrapear y cada registro guarda su
+propia representación JSON ya codificada
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+_NUMERO = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+NAN = float('nan')
+
+
+def _numero(texto: str):
+    """Primer número de un texto como int (si es entero) o float; None si no hay"""
+    if not texto:
+        return None
+    coincidencia = _NUMERO.search(texto)
+    if coincidencia is None:
+        return None
+    valor = float(coincidencia.group().replace(',', '.'))
+    return int(valor) if valor.is_integer() else valor
+
+
+def _fraccion(texto: str) -> tuple:
+    """"17/22" -> (17, 22); (None, None) si no hay dato"""
+    if not texto or '/' not in texto:
+        return None, None
+    abiertos, total = texto.split('/', 1)
+    return _numero(abiertos), _numero(total)
+
+
+def _espesor(texto: str) -> tuple:
+    """"120 cm" -> (120, "cm"); (None, None) si no hay dato"""
+    if not texto:
+        return None, None
+    coincidencia = _NUMERO.search(texto)
+    if coincidencia is None:
+        return None, None
+    return _numero(coincidencia.group()), texto[coincidencia.end():].strip() or None
+
+
+@lru_cache(maxsize=1024)
+def nombre_desde_slug(slug: str) -> str:
+    """sierra-nevada -> Sierra Nevada"""
+    return slug.replace('-', ' ').title()
+
+
+@dataclass(slots=True, eq=False)
+class RegistroEstacion:
+    """Resultado de scrapear una estación
+
+    Es inmutable por convención: un scrape nuevo crea un registro nuevo, de
+    modo que el JSON codificado se calcula una vez y se reutiliza en todas
+    las respuestas mientras el registro siga en caché.
+    """
+
+    slug: str
+    nombre: str
+    timestamp: str
+    estado: str = 'success'
+    remontes_abiertos: Optional[int] = None
+    remontes_total: Optional[int] = None
+    kilometros_abiertos: Optional[float] = None
+    kilometros_total: Optional[float] = None
+    nieve_espesor: Optional[float] = None
+    nieve_unidad: Optional[str] = None
+    error: Optional[str] = None
+    _json: Optional[bytes] = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def desde_extraccion(cls, slug: str, extraidos: dict, timestamp: str) -> 'RegistroEstacion':
+        """Crea el registro a partir del texto extraído ("17/22", "120 cm"...)"""
+        remontes_abiertos, remontes_total = _fraccion(extraidos.get('remontes'))
+        kilometros_abiertos, kilometros_total = _fraccion(extraidos.get('kilometros'))
+        nieve_espesor, nieve_unidad = _espesor(extraidos.get('nieve'))
+        return cls(
+            slug=slug,
+            nombre=nombre_desde_slug(slug),
+            timestamp=timestamp,
+            remontes_abiertos=remontes_abiertos,
+            remontes_total=remontes_total,
+            kilometros_abiertos=kilometros_abiertos,
+            kilometros_total=kilometros_total,
+            nieve_espesor=nieve_espesor,
+            nieve_unidad=nieve_unidad
+        )
+
+    @classmethod
+    def con_error(cls, slug: str, mensaje: str, timestamp: str) -> 'RegistroEstacion':
+        return cls(slug=slug, nombre=nombre_desde_slug(slug), timestamp=timestamp, estado='error', error=mensaje)
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> 'RegistroEstacion':
+        """Reconstruye un registro a partir de a_dict() (o del formato antiguo con textos)"""
+        if datos.get('estado') == 'error':
+            return cls.con_error(datos['slug'], datos.get('error'), datos['timestamp'])
+
+        remontes = datos.get('remontes')
+        kilometros = datos.get('kilometros')
+        nieve = datos.get('nieve')
+        if isinstance(remontes, str) or isinstance(kilometros, str) or isinstance(nieve, str):
+            return cls.desde_extraccion(datos['slug'], datos, datos['timestamp'])
+
+        remontes = remontes or {}
+        kilometros = kilometros or {}
+        nieve = nieve or {}
+        return cls(
+            slug=datos['slug'],
+            nombre=datos.get('nombre') or nombre_desde_slug(datos['slug']),
+            timestamp=datos['timestamp'],
+            remontes_abiertos=remontes.get('abiertos'),
+            remontes_total=remontes.get('total'),
+            kilometros_abiertos=kilometros.get('abiertos'),
+            kilometros_total=kilometros.get('total'),
+            nieve_espesor=nieve.get('espesor'),
+            nieve_unidad=nieve.get('unidad')
+        )
+
+    @property
+    def correcto(self) -> bool:
+        return self.estado == 'success'
+
+    def con_timestamp(self, timestamp: str) -> 'RegistroEstacion':
+        """Copia del registro con otro timestamp (p. ej. tras un 304)"""
+        return RegistroEstacion(
+            slug=self.slug, nombre=self.nombre, timestamp=timestamp, estado=self.estado,
+            remontes_abiertos=self.remontes_abiertos, remontes_total=self.remontes_total,
+            kilometros_abiertos=self.kilometros_abiertos, kilometros_total=self.kilometros_total,
+            nieve_espesor=self.nieve_espesor, nieve_unidad=self.nieve_unidad, error=self.error
+        )
+
+    def mismos_datos(self, otro: 'RegistroEstacion') -> bool:
+        """Si dos registros tienen los mismos datos, sin contar el timestamp"""
+        return (
+            self.slug, self.nombre, self.estado, self.remontes_abiertos, self.remontes_total,
+            self.kilometros_abiertos, self.kilometros_total, self.nieve_espesor, self.nieve_unidad, self.error
+        ) == (
+            otro.slug, otro.nombre, otro.estado, otro.remontes_abiertos, otro.remontes_total,
+            otro.kilometros_abiertos, otro.kilometros_total, otro.nieve_espesor, otro.nieve_unidad, otro.error
+        )
+
+    def a_dict(self) -> dict:
+        """Representación de la API"""
+        if not self.correcto:
+            return {
+                'slug': self.slug,
+                'nombre': self.nombre,
+                'error': self.error,
+                'timestamp': self.timestamp,
+                'estado': self.estado
+            }
+
+        return {
+            'slug': self.slug,
+            'nombre': self.nombre,
+            'remontes': None if self.remontes_abiertos is None else {
+                'abiertos': self.remontes_abiertos, 'total': self.remontes_total
+            },
+            'kilometros': None if self.kilometros_abiertos is None else {
+                'abiertos': self.kilometros_abiertos, 'total': self.kilometros_total
+            },
+            'nieve': None if self.nieve_espesor is None else {
+                'espesor': self.nieve_espesor, 'unidad': self.nieve_unidad
+            },
+            'timestamp': self.timestamp,
+            'estado': self.estado
+        }
+
+    def a_json(self) -> bytes:
+        """JSON de a_dict() codificado una sola vez por registro"""
+        if self._json is None:
+            self._json = json.dumps(self.a_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return self._json
+
+    def valores(self) -> tuple:
+        """Valores numéricos para el histórico (NaN donde no hay dato)"""
+        return tuple(
+            NAN if valor is None else valor
+            for valor in (self.remontes_abiertos, self.remontes_total,
+                          self.kilometros_abiertos, self.kilometros_total, self.nieve_espesor)
+        )
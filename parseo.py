@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Etapa de parseo en procesos
+El HTML descargado se reparte entre varios procesos para que la extracción,
+que es CPU pura en Python, no quede serializada por el GIL del servidor
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from extractor import ESPECIFICACION, extraer_datos
+from logs import NOMBRE as NOMBRE_LOGGER
+
+log = logging.getLogger(NOMBRE_LOGGER)
+
+# Página mínima con los tres datos para calentar cada proceso
+_PAGINA_CALENTAMIENTO = (
+    '<span>Remontes <strong class="fuentemega">1</strong><em>/2</em></span>'
+    '<span>Kilómetros <strong class="fuentemega">1</strong><em>/2</em></span>'
+    '<span>Nieve <strong class="fuentemega">1</strong><em>cm</em></span>'
+).encode('utf-8')
+
+
+def _extraer_valores(contenido: bytes) -> tuple:
+    """En el proceso: valores extraídos en el orden de los campos de ESPECIFICACION"""
+    datos = extraer_datos(contenido)
+    return tuple(datos[campo] for campo in ESPECIFICACION.nombres)
+
+
+def _calentar():
+    """Inicialización de cada proceso: importa el extractor y hace un primer parseo"""
+    _extraer_valores(_PAGINA_CALENTAMIENTO)
+
+
+def _pid() -> int:
+    return multiprocessing.current_process().pid
+
+
+class PoolParseo:
+    """Pool de procesos que extrae los datos del HTML
+
+    Se usa `spawn` para que los procesos no hereden los hilos ni los locks del
+    servidor. `extraer` es bloqueante y se llama desde los hilos de scraping.
+
+    Si muere un proceso (p. ej. por falta de memoria) el pool queda roto para
+    siempre: se sustituye por otro, que se calienta en segundo plano, y la
+    página que ha fallado se parsea en el propio hilo.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = self._crear_pool()
+        self._lock = threading.Lock()
+        self.paginas = 0
+        self.segundos = 0.0
+        self.arranque_ms = None
+        self.caidas = 0
+        self.paginas_en_hilo = 0
+
+    def _crear_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_calentar
+        )
+
+    def arrancar(self):
+        """Lanza y calienta todos los procesos antes de recibir trabajo"""
+        inicio = time.perf_counter()
+        # Sin procesos libres, cada envío arranca uno nuevo hasta llegar a `workers`
+        futuros = [self._pool.submit(_pid) for _ in range(self.workers)]
+        wait(futuros)
+        for futuro in futuros:
+            futuro.result()
+        self.arranque_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def extraer(self, contenido: bytes) -> dict:
+        """Extrae remontes, kilómetros y nieve en uno de los procesos"""
+        inicio = time.perf_counter()
+        pool = self._pool
+        try:
+            valores = pool.submit(_extraer_valores, contenido).result()
+        except BrokenProcessPool:
+            self._reponer(pool)
+            with self._lock:
+                self.paginas_en_hilo += 1
+            return extraer_datos(contenido)
+        with self._lock:
+            self.paginas += 1
+            self.segundos += time.perf_counter() - inicio
+        return dict(zip(ESPECIFICACION.nombres, valores))
+
+    def _reponer(self, roto: ProcessPoolExecutor):
+        """Sustituye el pool roto (una sola vez aunque fallen varios hilos a la vez)"""
+        with self._lock:
+            if self._pool is not roto:
+                return
+            self.caidas += 1
+            self._pool = self._crear_pool()
+        log.warning("Pool de parseo roto: se sustituye", extra={'caidas': self.caidas, 'procesos': self.workers})
+        roto.shutdown(wait=False, cancel_futures=True)
+        threading.Thread(target=self._calentar_pool, name="parseo-arranque", daemon=True).start()
+
+    def _calentar_pool(self):
+        try:
+            self.arrancar()
+        except Exception as e:
+            log.error("Error arrancando el pool de parseo", extra={'error': str(e)})
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'workers': self.workers,
+            'arranque_ms': self.arranque_ms,
+            'paginas': self.paginas,
+            'caidas': self.caidas,
+            'paginas_en_hilo': self.paginas_en_hilo,
+            'ms_medio': round(self.segundos / self.paginas * 1000, 2) if self.paginas else None
+        }
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Protección de los servidores de origen (infonieve.es)
+Limitador de peticiones por token bucket con tasa adaptativa y circuito
+que corta las peticiones a un host tras varios fallos seguidos
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+
+class OrigenNoDisponible(Exception):
+    """La petición no se hace: circuito abierto o cola del limitador llena"""
+
+
+class LimitadorTokens:
+    """Token bucket asíncrono con cola FIFO acotada
+
+    La tasa baja a la mitad con cada fallo del origen y se recupera poco a
+    poco con cada respuesta correcta (AIMD), sin pasar de `tasa_max`.
+    """
+
+    def __init__(self, tasa: float, rafaga: float, max_cola: int):
+        self.tasa_max = tasa
+        self.tasa_min = tasa / 10
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.max_cola = max_cola
+        self._tokens = rafaga
+        self._repuesto = time.monotonic()
+        self._turno = asyncio.Lock()
+        self.en_cola = 0
+        self.concedidas = 0
+        self.rechazadas = 0
+
+    def _reponer(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._repuesto) * self.tasa)
+        self._repuesto = ahora
+
+    async def adquirir(self) -> bool:
+        """Espera turno para una petición; False si la cola está llena"""
+        if self.en_cola >= self.max_cola:
+            self.rechazadas += 1
+            return False
+
+        self.en_cola += 1
+        try:
+            async with self._turno:
+                self._reponer()
+                while self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.tasa)
+                    self._reponer()
+                self._tokens -= 1
+        finally:
+            self.en_cola -= 1
+        self.concedidas += 1
+        return True
+
+    def reducir(self):
+        self.tasa = max(self.tasa_min, self.tasa / 2)
+
+    def aumentar(self):
+        self.tasa = min(self.tasa_max, self.tasa + self.tasa_max / 20)
+
+    def estadisticas(self) -> dict:
+        self._reponer()
+        return {
+            'tasa': round(self.tasa, 2),
+            'tasa_max': self.tasa_max,
+            'tokens': round(self._tokens, 2),
+            'en_cola': self.en_cola,
+            'max_cola': self.max_cola,
+            'concedidas': self.concedidas,
+            'rechazadas': self.rechazadas
+        }
+
+
+class Circuito:
+    """Circuito de un host: se abre tras `max_fallos` fallos consecutivos
+
+    Abierto, rechaza las peticiones al instante. Pasada la espera deja pasar
+    una sola petición de prueba (semiabierto): si va bien se cierra y si no
+    se vuelve a abrir con el doble de espera, hasta `espera_max`. Si la
+    prueba no informa de su resultado en `espera` segundos se deja pasar otra.
+    """
+
+    def __init__(self, max_fallos: int, espera: float, espera_max: float):
+        self.max_fallos = max_fallos
+        self.espera_inicial = espera
+        self.espera_max = espera_max
+        self.espera = espera
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.reintento = 0.0
+        self.aperturas = 0
+        self.rechazadas = 0
+        self._prueba_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """True si se puede hacer una petición al host ahora"""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            ahora = time.monotonic()
+            if self.estado == ABIERTO and ahora >= self.reintento:
+                self.estado = SEMIABIERTO
+            if self.estado == SEMIABIERTO and ahora >= self._prueba_hasta:
+                self._prueba_hasta = ahora + self.espera
+                return True
+            self.rechazadas += 1
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos_consecutivos = 0
+            if self.estado != CERRADO:
+                self.estado = CERRADO
+                self.espera = self.espera_inicial
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos_consecutivos += 1
+            if self.estado == SEMIABIERTO:
+                self.espera = min(self.espera_max, self.espera * 2)
+                self._abrir()
+            elif self.estado == CERRADO and self.fallos_consecutivos >= self.max_fallos:
+                self._abrir()
+
+    def _abrir(self):
+        # Jitter para que varias instancias no prueben todas a la vez
+        self.estado = ABIERTO
+        self.aperturas += 1
+        self.reintento = time.monotonic() + self.espera * random.uniform(0.8, 1.2)
+
+    @property
+    def segundos_para_reintento(self) -> float:
+        return max(0.0, self.reintento - time.monotonic()) if self.estado == ABIERTO else 0.0
+
+    def estadisticas(self) -> dict:
+        return {
+            'estado': self.estado,
+            'fallos_consecutivos': self.fallos_consecutivos,
+            'aperturas': self.aperturas,
+            'rechazadas': self.rechazadas,
+            'reintento_en': round(self.segundos_para_reintento, 1)
+        }
+
+
+class ProteccionHost:
+    """Limitador y circuito de un host de origen"""
+
+    def __init__(self, host: str, tasa: float, rafaga: float, max_cola: int,
+                 max_fallos: int, espera: float, espera_max: float):
+        self.host = host
+        self.limitador = LimitadorTokens(tasa, rafaga, max_cola)
+        self.circuito = Circuito(max_fallos, espera, espera_max)
+
+    def registrar_exito(self):
+        """El host ha respondido (aunque sea con un 4xx)"""
+        self.circuito.registrar_exito()
+        self.limitador.aumentar()
+
+    def registrar_fallo(self):
+        """Timeout, error de conexión, 5xx o 429"""
+        self.circuito.registrar_fallo()
+        self.limitador.reducir()
+
+    def estadisticas(self) -> dict:
+        return {
+            'limitador': self.limitador.estadisticas(),
+            'circuito': self.circuito.estadisticas()
+        }
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Respuestas precalculadas de los endpoints de lectura
+Cada cuerpo JSON se codifica y comprime una sola vez por versión de los
+registros que contiene y se sirve tal cual (con ETag fuerte) hasta que
+alguno de ellos cambia
+"""
+
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Por debajo de este tamaño no compensa comprimir (como GZipMiddleware)
+MIN_COMPRESION = 500
+
+# Sufijo del ETag de cada variante comprimida
+_SUFIJOS = {'gzip': '-gz', 'br': '-br'}
+
+
+def elegir_codificacion(accept_encoding: str) -> str:
+    """Mejor codificación aceptada por el cliente: 'br', 'gzip' o None"""
+    if not accept_encoding:
+        return None
+    aceptadas = set()
+    for parte in accept_encoding.lower().split(','):
+        nombre, _, parametros = parte.partition(';')
+        parametros = parametros.replace(' ', '')
+        if parametros.startswith('q=') and parametros[2:].strip('0.') == '':
+            continue  # q=0: rechazada expresamente
+        aceptadas.add(nombre.strip())
+    if brotli is not None and 'br' in aceptadas:
+        return 'br'
+    if 'gzip' in aceptadas:
+        return 'gzip'
+    return None
+
+
+class RespuestaPrecalculada:
+    """Cuerpo de una respuesta y sus variantes comprimidas"""
+
+    __slots__ = ('version', 'cuerpo', 'etag', 'variantes')
+
+    def __init__(self, version: tuple, cuerpo: bytes):
+        self.version = version
+        self.cuerpo = cuerpo
+        self.etag = '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+        # Codificación -> (bytes, etag); se comprimen la primera vez que se piden
+        self.variantes = {}
+
+    def etags(self) -> set:
+        return {self.etag, *(etag for _, etag in self.variantes.values())}
+
+
+class CacheRespuestas:
+    """Respuestas precalculadas por clave (p. ej. conjunto de slugs), con LRU
+
+    La versión de una respuesta es la tupla de registros (y demás valores)
+    con que se construyó. Los registros no se modifican nunca: un scrape
+    nuevo crea uno nuevo, así que basta compararlos por identidad para saber
+    si hay que regenerar el cuerpo.
+    """
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self.servidas = 0
+        self.regeneradas = 0
+        self.compresiones = 0
+        self.respuestas_304 = 0
+        self.bytes_enviados = 0
+        self.bytes_sin_comprimir = 0
+        self.segundos_codificacion = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, clave, version: tuple, construir) -> RespuestaPrecalculada:
+        """Respuesta de `clave` para `version`; si ha cambiado se reconstruye con construir()"""
+        self.servidas += 1
+        entrada = self._entradas.get(clave)
+        if entrada is not None and _misma_version(entrada.version, version):
+            self._entradas.move_to_end(clave)
+            return entrada
+
+        inicio = time.perf_counter()
+        entrada = RespuestaPrecalculada(version, construir())
+        self.segundos_codificacion += time.perf_counter() - inicio
+        self.regeneradas += 1
+
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+        return entrada
+
+    def variante(self, entrada: RespuestaPrecalculada, accept_encoding: str) -> tuple:
+        """(cuerpo, etag, codificación) a enviar según Accept-Encoding"""
+        codificacion = elegir_codificacion(accept_encoding) if len(entrada.cuerpo) >= MIN_COMPRESION else None
+        if codificacion is None:
+            return entrada.cuerpo, entrada.etag, None
+
+        variante = entrada.variantes.get(codificacion)
+        if variante is None:
+            inicio = time.perf_counter()
+            if codificacion == 'br':
+                comprimido = brotli.compress(entrada.cuerpo, quality=11)
+            else:
+                comprimido = gzip.compress(entrada.cuerpo, compresslevel=9, mtime=0)
+            self.segundos_codificacion += time.perf_counter() - inicio
+            self.compresiones += 1
+            variante = entrada.variantes[codificacion] = (comprimido, entrada.etag[:-1] + _SUFIJOS[codificacion] + '"')
+        return variante[0], variante[1], codificacion
+
+    def no_modificada(self, entrada: RespuestaPrecalculada, if_none_match: str) -> bool:
+        """True si el cliente ya tiene esta versión (If-None-Match)"""
+        if not if_none_match:
+            return False
+        etags = entrada.etags()
+        for etag in if_none_match.split(','):
+            etag = etag.strip()
+            if etag == '*' or etag.removeprefix('W/') in etags:
+                self.respuestas_304 += 1
+                return True
+        return False
+
+    def contabilizar(self, entrada: RespuestaPrecalculada, enviados: int):
+        self.bytes_enviados += enviados
+        self.bytes_sin_comprimir += len(entrada.cuerpo)
+
+    def estadisticas(self) -> dict:
+        """Resumen para el endpoint /status"""
+        return {
+            'entradas': len(self._entradas),
+            'max_entradas': self.max_entradas,
+            'servidas': self.servidas,
+            'regeneradas': self.regeneradas,
+            'compresiones': self.compresiones,
+            'respuestas_304': self.respuestas_304,
+            'bytes_enviados': self.bytes_enviados,
+            'bytes_sin_comprimir': self.bytes_sin_comprimir,
+            'ms_codificacion': round(self.segundos_codificacion * 1000, 1),
+            'brotli': brotli is not None
+        }
+
+
+def _misma_version(anterior: tuple, actual: tuple) -> bool:
+    return len(anterior) == len(actual) and all(a is b or a == b for a, b in zip(anterior, actual))
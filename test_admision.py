@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del control de admisión contra el stub local de infonieve.es
+Cuentan las peticiones que llegan al origen.
+Ejecutar: python -m pytest -q test_admision.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from comun import iniciar_api
+from stub_infonieve import iniciar_stub
+
+_api = {}
+
+
+def arrancar():
+    """Stub con 0,5 s de latencia y la API con un único hueco de scrape (una vez por proceso)"""
+    if not _api:
+        stub, base_url = iniciar_stub(latencia=0.5, validadores=False)
+        _, url = iniciar_api(base_url, INTERVALO_REFRESCO=0, ADMISION_MAX_SCRAPES=1, LOG_NIVEL='off')
+        _api.update(stub=stub, url=url)
+    return _api['stub'], _api['url']
+
+
+def test_cola_mismo_slug():
+    """Las peticiones de un slug en cola comparten una espera y un único scrape"""
+    stub, url = arrancar()
+    stub.reiniciar_contadores()
+    encoladas = requests.get(f"{url}/status").json()['admision']['encoladas']
+
+    ocupa = threading.Thread(target=requests.get, args=(f"{url}/estacion/cola-aaa",))
+    ocupa.start()
+    time.sleep(0.1)
+    respuestas = [None] * 5
+
+    def pedir(i):
+        respuestas[i] = requests.get(f"{url}/estacion/cola-bbb", timeout=30)
+
+    hilos = [threading.Thread(target=pedir, args=(i,)) for i in range(len(respuestas))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos + [ocupa]:
+        hilo.join()
+
+    assert [r.status_code for r in respuestas] == [200] * 5
+    assert {r.json()['estado'] for r in respuestas} == {'success'}
+    assert stub.peticiones == 2
+    assert requests.get(f"{url}/status").json()['admision']['encoladas'] == encoladas + 1
+
+
+def test_cola_dato_en_cache():
+    """Si el dato llega a la caché mientras se espera hueco, no se vuelve a scrapear"""
+    stub, url = arrancar()
+    import main
+
+    ocupa = threading.Thread(target=requests.get, args=(f"{url}/estacion/cola-ccc",))
+    ocupa.start()
+    time.sleep(0.1)
+    respuesta = []
+    espera = threading.Thread(target=lambda: respuesta.append(requests.get(f"{url}/estacion/cola-ddd", timeout=30)))
+    espera.start()
+    time.sleep(0.1)
+    # Otro proceso con caché compartida deja el dato mientras cola-ddd espera hueco
+    main.cache.guardar('cola-ddd', main.RegistroEstacion.desde_dict({
+        'slug': 'cola-ddd', 'nombre': 'Cola Ddd', 'remontes': None, 'kilometros': None, 'nieve': None,
+        'timestamp': '2024-11-22T10:30:00', 'estado': 'success'
+    }))
+    stub.reiniciar_contadores()
+    ocupa.join()
+    espera.join()
+
+    assert respuesta[0].status_code == 200
+    assert respuesta[0].json()['timestamp'] == '2024-11-22T10:30:00'
+    assert stub.peticiones == 0
+
+
+def test_estaciones_saturado():
+    """Sin hueco, /estaciones sirve las demás y marca con error la no admitida; /estacion responde 503"""
+    stub, url = arrancar()
+    import main
+
+    requests.get(f"{url}/estacion/sat-aaa")
+    ocupa = threading.Thread(target=requests.get, args=(f"{url}/estacion/sat-bbb",))
+    ocupa.start()
+    time.sleep(0.1)
+    cola, main.admision.max_cola = main.admision.max_cola, 0
+    try:
+        varias = requests.get(f"{url}/estaciones", params={'estaciones': 'sat-aaa,sat-ccc'})
+        una = requests.get(f"{url}/estacion/sat-ccc")
+    finally:
+        main.admision.max_cola = cola
+    ocupa.join()
+
+    assert varias.status_code == 200
+    assert [e['estado'] for e in varias.json()['estaciones']] == ['success', 'error']
+    assert una.status_code == 503
+    assert 'Retry-After' in una.headers
+
+
+def test_refresh_pasa_por_admision():
+    """POST /refresh ocupa hueco: sin sitio en la cola, la estación sale con error"""
+    stub, url = arrancar()
+    import main
+
+    ocupa = threading.Thread(target=requests.post, args=(f"{url}/refresh",), kwargs={'params': {'estaciones': 'ref-aaa'}})
+    ocupa.start()
+    time.sleep(0.1)
+    cola, main.admision.max_cola = main.admision.max_cola, 0
+    try:
+        respuesta = requests.post(f"{url}/refresh", params={'estaciones': 'ref-bbb'})
+    finally:
+        main.admision.max_cola = cola
+    ocupa.join()
+
+    assert respuesta.status_code == 200
+    assert [e['estado'] for e in respuesta.json()['estaciones']] == ['error']